@@ -0,0 +1,301 @@
+import atexit
+import queue
+import threading
+import time
+from collections import deque
+import logging
+import requests
+from settings import get_settings
+from rate_limiter import TokenBucket
+from transport import get_transport
+import metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Telegram rejects messages longer than this
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+MESSAGE_SEPARATOR = "\n\n"
+# Number of recent deliveries kept for latency percentiles
+LATENCY_SAMPLES = 1024
+
+_STOP = object()
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def batch_messages(messages, max_length=TELEGRAM_MAX_MESSAGE_LENGTH):
+    """
+    Group alert texts so each group fits in one Telegram message.
+    Args:
+    - messages: list - Alert texts, in order.
+    - max_length: int - Maximum length of one message; longer alerts are truncated.
+    Returns:
+    - list: Lists of alert texts, one list per message.
+    """
+    batches = []
+    current = []
+    length = 0
+    for message in messages:
+        if len(message) > max_length:
+            message = message[:max_length - 3] + "..."
+        added = len(message) + (len(MESSAGE_SEPARATOR) if current else 0)
+        if current and length + added > max_length:
+            batches.append(current)
+            current, added = [], len(message)
+            length = 0
+        current.append(message)
+        length += added
+    if current:
+        batches.append(current)
+    return batches
+
+
+class AlertDispatcher:
+    """
+    Background Telegram alert sender so analysis never blocks on alert network I/O.
+    Alerts are queued; a worker thread collects them for a coalescing window, keeps only the latest alert per
+    contract, packs them into as few messages as possible and sends them paced to the per-chat rate limit,
+    retrying 429 responses after Telegram's retry_after. Options left as None take their setting.
+    Args:
+    - bot_token: str - Telegram bot token.
+    - chat_id: str - Chat receiving the alerts.
+    - enabled: bool - Whether alerts are sent at all.
+    - coalesce_window: float - Seconds to collect alerts before sending.
+    - max_queue: int - Maximum pending alerts; further alerts are dropped.
+    - min_interval: float - Minimum seconds between messages to the chat.
+    - max_retries: int - Send attempts beyond the first for one message.
+    """
+
+    def __init__(self, bot_token=None, chat_id=None, enabled=None, coalesce_window=None, max_queue=None,
+                 min_interval=None, max_retries=None):
+        settings = get_settings()
+        self.bot_token = bot_token = settings.bot_token if bot_token is None else bot_token
+        self.chat_id = chat_id = settings.chat_id if chat_id is None else chat_id
+        self.enabled = (settings.send_alerts if enabled is None else enabled) and bool(chat_id)
+        self.coalesce_window = settings.alert_coalesce_window if coalesce_window is None else coalesce_window
+        self.max_retries = settings.http_max_retries if max_retries is None else max_retries
+        self.backoff_max = settings.http_backoff_max
+        min_interval = settings.alert_min_interval if min_interval is None else min_interval
+        self._queue = queue.Queue(maxsize=settings.alert_queue_size if max_queue is None else max_queue)
+        self._limiter = TokenBucket(1.0 / min_interval, capacity=1) if min_interval > 0 else None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counters = {'submitted': 0, 'dropped': 0, 'coalesced': 0, 'messages_sent': 0, 'alerts_sent': 0,
+                          'failed': 0, 'rate_limited': 0}
+        self._delivery_latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._send_latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def _count(self, name, value=1):
+        with self._stats_lock:
+            self._counters[name] += value
+        metrics.count('alerts_total', value, outcome=name)
+
+    def start(self):
+        """Start the worker thread if it is not running yet."""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name='alert-dispatcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, message, contract_address=None):
+        """
+        Queue an alert without blocking.
+        Args:
+        - message: str - Alert text.
+        - contract_address: str - Contract the alert is about; newer alerts for it replace queued ones.
+        Returns:
+        - bool: True if the alert was queued.
+        """
+        if not self.enabled:
+            logger.warning("Telegram alerts are not enabled or CHAT_ID is missing.")
+            return False
+        self.start()
+        try:
+            self._queue.put_nowait((time.monotonic(), contract_address, message))
+        except queue.Full:
+            self._count('dropped')
+            logger.error(f"Alert queue is full; dropping alert for {contract_address or 'unknown contract'}")
+            return False
+        self._count('submitted')
+        return True
+
+    def _collect(self, first):
+        """Gather alerts arriving within the coalescing window after the first one."""
+        items = [first]
+        deadline = time.monotonic() + self.coalesce_window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.task_done()
+                # Put the stop marker back so the worker exits after this batch
+                self._queue.put(_STOP)
+                break
+            items.append(item)
+        return items
+
+    def _worker(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                return
+            items = self._collect(first)
+            try:
+                self._deliver(items)
+            except Exception as e:
+                logger.error(f"Alert delivery failed: {e}")
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def _deliver(self, items):
+        # Latest alert per contract wins; alerts without a contract are all kept
+        latest = {}
+        for index, (queued_at, contract_address, message) in enumerate(items):
+            key = contract_address if contract_address is not None else ('', index)
+            first_queued = latest[key][0] if key in latest else queued_at
+            latest[key] = (first_queued, message)
+        self._count('coalesced', len(items) - len(latest))
+
+        pending = list(latest.values())
+        position = 0
+        for batch in batch_messages([message for _, message in pending]):
+            queued = [queued_at for queued_at, _ in pending[position:position + len(batch)]]
+            position += len(batch)
+            if self._send(MESSAGE_SEPARATOR.join(batch)):
+                now = time.monotonic()
+                with self._stats_lock:
+                    self._counters['messages_sent'] += 1
+                    self._counters['alerts_sent'] += len(batch)
+                    self._delivery_latencies.extend(now - queued_at for queued_at in queued)
+                metrics.count('alerts_total', len(batch), outcome='sent')
+                for queued_at in queued:
+                    metrics.observe('alert_delivery_seconds', now - queued_at)
+            else:
+                self._count('failed')
+
+    def _send(self, text):
+        """Send one message, honouring retry_after on 429. Returns True on success."""
+        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+        payload = {'chat_id': self.chat_id, 'text': text}
+        for attempt in range(self.max_retries + 1):
+            if self._limiter is not None:
+                self._limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = get_transport().post(url, data=payload, endpoint='telegram.sendMessage', max_retries=0)
+            except requests.RequestException as e:
+                logger.warning(f"Error sending Telegram alert: {e}")
+                time.sleep(min(self.backoff_max, 2 ** attempt))
+                continue
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._stats_lock:
+                    self._send_latencies.append(elapsed)
+                metrics.observe('telegram_send_duration_seconds', elapsed)
+
+            if response.status_code == 200:
+                logger.info(f"Alert sent to Telegram chat {self.chat_id}")
+                return True
+            if response.status_code == 429:
+                self._count('rate_limited')
+                try:
+                    retry_after = float(response.json()['parameters']['retry_after'])
+                except (ValueError, KeyError, TypeError):
+                    retry_after = float(response.headers.get('Retry-After', 2 ** attempt))
+                logger.warning(f"Telegram rate limit hit; retrying in {retry_after:.0f}s")
+                time.sleep(retry_after)
+                continue
+            if response.status_code >= 500:
+                time.sleep(min(self.backoff_max, 2 ** attempt))
+                continue
+            logger.error(f"Failed to send alert. Response: {response.text}")
+            return False
+        logger.error("Giving up on Telegram alert after retries.")
+        return False
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued alert has been handled.
+        Args:
+        - timeout: float - Maximum seconds to wait (None waits indefinitely).
+        Returns:
+        - bool: True if the queue drained in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout=None):
+        """
+        Send what is queued and stop the worker.
+        Args:
+        - timeout: float - Maximum seconds to wait for the worker.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def stats(self):
+        """
+        Snapshot of dispatcher counters.
+        Returns:
+        - dict: Queue depth, counters, and p50/p95/max of delivery latency (queued to sent) and send latency.
+        """
+        with self._stats_lock:
+            stats = dict(self._counters)
+            delivery = sorted(self._delivery_latencies)
+            send = sorted(self._send_latencies)
+        stats['queue_depth'] = self._queue.qsize()
+        for name, ordered in (('delivery', delivery), ('send', send)):
+            stats[f'{name}_latency_p50'] = _percentile(ordered, 0.5)
+            stats[f'{name}_latency_p95'] = _percentile(ordered, 0.95)
+            stats[f'{name}_latency_max'] = ordered[-1] if ordered else 0.0
+        return stats
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_alert_dispatcher():
+    """
+    Return the process-wide alert dispatcher, creating it on first use.
+    Pending alerts are flushed at interpreter exit.
+    Returns:
+    - AlertDispatcher: The shared dispatcher.
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = AlertDispatcher()
+                atexit.register(_dispatcher.close, _dispatcher.coalesce_window + 10)
+    return _dispatcher
+
+
+def set_alert_dispatcher(dispatcher):
+    """
+    Replace the process-wide dispatcher, e.g. with one forwarding alerts to another process.
+    Args:
+    - dispatcher: object - Object exposing submit(message, contract_address) and stats().
+    Returns:
+    - object: The previous dispatcher, or None if none was created yet.
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        previous, _dispatcher = _dispatcher, dispatcher
+    return previous
@@ -1,28 +1,33 @@
-import numpy as np
 from utils import process_token_data
+from support_resistance import support_resistance_levels
 import logging
+import numpy as np
+import metrics
+import signal_journal
+from contract_state import ContractState
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-def find_support_resistance(prices):
+def find_support_resistance(prices, volumes=None):
     """
     Find potential support and resistance levels based on the price history.
     Args:
     - prices: list - Historical price data.
+    - volumes: list - Optional volume per price, used to weight levels.
     Returns:
-    - dict: Contains support and resistance levels.
+    - dict: Contains the nearest support and resistance levels, plus all detected levels on each side.
     """
-    support = np.min(prices)
-    resistance = np.max(prices)
-    
-    return {'support': support, 'resistance': resistance}
+    return support_resistance_levels(prices, volumes)
 
-def analyze_token_data(contract_data):
+@metrics.timed('analyze_token')
+def analyze_token_data(contract_data, tracker=None):
     """
     Analyze token contract data and determine entry/exit points.
     Args:
-    - contract_data: list - Raw contract data.
+    - contract_data: ContractState - Loaded contract state (raw contract data is also accepted).
+    - tracker: SupportResistanceTracker - Optional streaming tracker; prices are treated as an append-only tick
+      history and only the ticks it has not seen yet are fed to it.
     Returns:
     - dict: Analysis results containing entry, exit points, support, and resistance.
     """
@@ -33,7 +38,12 @@ def analyze_token_data(contract_data):
         return None
     
     # Find support and resistance levels
-    support_resistance = find_support_resistance(prices)
+    if tracker is not None:
+        for price in prices[tracker.count:]:
+            tracker.update(float(price))
+        support_resistance = tracker.snapshot()
+    else:
+        support_resistance = find_support_resistance(prices)
     
     # Determine entry and exit points based on thresholds
     entry_point = support_resistance['support'] * 1.05  # Example: 5% above support for entry
@@ -43,8 +53,43 @@ def analyze_token_data(contract_data):
         'entry_point': entry_point,
         'exit_point': exit_point,
         'support': support_resistance['support'],
-        'resistance': support_resistance['resistance']
+        'resistance': support_resistance['resistance'],
+        'supports': support_resistance['supports'],
+        'resistances': support_resistance['resistances']
     }
     
+    if isinstance(contract_data, ContractState):
+        signal_journal.record(signal_journal.KIND_LEVELS, contract_data.address,
+                              (entry_point, exit_point, analysis['support'], analysis['resistance']))
+    
     logger.info(f"Analysis complete. Entry: {entry_point}, Exit: {exit_point}")
     return analysis
+
+def analyze_price_history(state):
+    """
+    Determine entry/exit points from a contract's price history, weighting levels by traded volume.
+    Args:
+    - state: ContractState - Contract state with ingested price bars.
+    Returns:
+    - dict: Entry, exit, support and resistance levels, or None if fewer than two bars have a price.
+    """
+    prices = state.prices.view()
+    volumes = state.volumes.view()
+    priced = np.isfinite(prices)
+    if priced.sum() < 2:
+        logger.warning(f"Not enough price history for {state.address} to find levels.")
+        return None
+    volumes = volumes[priced]
+    levels = find_support_resistance(prices[priced], volumes if np.isfinite(volumes).all() else None)
+    analysis = {
+        'entry_point': levels['support'] * 1.05,
+        'exit_point': levels['resistance'] * 0.95,
+        'support': levels['support'],
+        'resistance': levels['resistance'],
+        'supports': levels['supports'],
+        'resistances': levels['resistances']
+    }
+    signal_journal.record(signal_journal.KIND_LEVELS, state.address,
+                          (analysis['entry_point'], analysis['exit_point'], analysis['support'],
+                           analysis['resistance']))
+    return analysis
@@ -0,0 +1,217 @@
+import asyncio
+import inspect
+import itertools
+import json
+import logging
+from settings import get_settings
+from rpc_batch import TOKEN_PROGRAM_ID, fetch_token_accounts_batch
+from snapshot_diff import SnapshotDiffer
+
+try:
+    import websockets
+except ImportError:  # Subscriptions are optional; the monitor falls back to polling
+    websockets = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Offset of the owner field in an SPL token account, and the account size
+TOKEN_ACCOUNT_OWNER_OFFSET = 32
+TOKEN_ACCOUNT_SIZE = 165
+
+
+def build_program_subscribe(request_id, owner_address, program_id=TOKEN_PROGRAM_ID):
+    """
+    Build a programSubscribe request matching every token account held by an owner.
+    Args:
+    - request_id: int - JSON-RPC id used to match the subscription confirmation.
+    - owner_address: str - Address whose token accounts are watched.
+    - program_id: str - Token program the accounts belong to.
+    Returns:
+    - dict: The JSON-RPC request object.
+    """
+    return {
+        'jsonrpc': '2.0',
+        'id': request_id,
+        'method': 'programSubscribe',
+        'params': [program_id, {
+            'encoding': 'jsonParsed',
+            'commitment': 'confirmed',
+            'filters': [
+                {'dataSize': TOKEN_ACCOUNT_SIZE},
+                {'memcmp': {'offset': TOKEN_ACCOUNT_OWNER_OFFSET, 'bytes': owner_address}},
+            ],
+        }],
+    }
+
+
+class AsyncContractMonitor:
+    """
+    Watch many contracts over a single websocket connection, with adaptive polling as a fallback.
+    Each contract's accounts are kept as compact fingerprints (see snapshot_diff), and updates are delivered as
+    lists of typed Delta records.
+    Args:
+    - contract_addresses: list - Contracts (token account owners) to watch.
+    - on_update: callable - Called as on_update(contract_address, deltas); may be a coroutine function.
+    - ws_url: str - Websocket endpoint (can point at a local fake server; SOLANA_WS_URL by default).
+    - rpc_url: str - HTTP JSON-RPC endpoint used for snapshots and polling (routed across RPC_ENDPOINTS when omitted).
+    - min_poll_interval: float - Fastest polling interval, used while changes keep arriving.
+    - max_poll_interval: float - Slowest polling interval, reached when nothing changes.
+    - max_reconnect_delay: float - Upper bound of the reconnect backoff.
+    """
+
+    def __init__(self, contract_addresses, on_update, ws_url=None, rpc_url=None,
+                 min_poll_interval=2.0, max_poll_interval=60.0, max_reconnect_delay=60.0):
+        self.contract_addresses = list(dict.fromkeys(contract_addresses))
+        self.on_update = on_update
+        self.ws_url = ws_url or get_settings().solana_ws_url
+        self.rpc_url = rpc_url
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_reconnect_delay = max_reconnect_delay
+        self.poll_interval = min_poll_interval
+        self.connected = False
+        self._subscribed = False
+        self._snapshots = {address: SnapshotDiffer() for address in self.contract_addresses}
+        self._request_ids = itertools.count(1)
+        self._stopped = asyncio.Event()
+
+    def stop(self):
+        """Ask run() to return at the next opportunity."""
+        self._stopped.set()
+
+    def snapshot(self, contract_address):
+        """
+        Return the differ holding a contract's current fingerprints.
+        Args:
+        - contract_address: str - A watched contract.
+        Returns:
+        - SnapshotDiffer: The contract's snapshot.
+        """
+        return self._snapshots[contract_address]
+
+    async def _dispatch(self, contract_address, deltas):
+        try:
+            result = self.on_update(contract_address, deltas)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error(f"Update handler failed for {contract_address}: {e}")
+
+    async def poll_once(self):
+        """
+        Fetch every watched contract in batched RPC calls and dispatch the differences.
+        Returns:
+        - int: Number of contracts that changed.
+        """
+        results = await asyncio.to_thread(fetch_token_accounts_batch, self.contract_addresses, rpc_url=self.rpc_url)
+        changed_contracts = 0
+        for contract_address, entry in results.items():
+            if entry['error'] is not None:
+                logger.warning(f"Polling {contract_address} failed: {entry['error']}")
+                continue
+            # An empty reply is not every holder leaving; keep the snapshot until real data comes back
+            if not entry['data']:
+                logger.warning(f"No data found for contract {contract_address}.")
+                continue
+            deltas = self._snapshots[contract_address].diff(entry['data'])
+            if deltas:
+                changed_contracts += 1
+                await self._dispatch(contract_address, deltas)
+        return changed_contracts
+
+    async def _poll_for(self, duration):
+        """Poll adaptively for roughly `duration` seconds (or until stopped)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration
+        while not self._stopped.is_set() and loop.time() < deadline:
+            try:
+                changed = await self.poll_once()
+            except Exception as e:
+                logger.error(f"Polling cycle failed: {e}")
+                changed = 0
+            # Speed up while contracts are active, back off while they are quiet
+            if changed:
+                self.poll_interval = max(self.min_poll_interval, self.poll_interval / 2)
+            else:
+                self.poll_interval = min(self.max_poll_interval, self.poll_interval * 1.5)
+            wait = min(self.poll_interval, max(0.0, deadline - loop.time()))
+            try:
+                await asyncio.wait_for(self._stopped.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _handle_notification(self, contract_address, value):
+        deltas = self._snapshots[contract_address].apply([value])
+        if deltas:
+            await self._dispatch(contract_address, deltas)
+
+    async def _run_subscriptions(self):
+        """Subscribe to every contract on one connection and process notifications until it drops."""
+        async with websockets.connect(self.ws_url, ping_interval=20, max_size=None) as ws:
+            pending = {}
+            for contract_address in self.contract_addresses:
+                request_id = next(self._request_ids)
+                pending[request_id] = contract_address
+                await ws.send(json.dumps(build_program_subscribe(request_id, contract_address)))
+
+            subscriptions = {}
+            stop_task = asyncio.ensure_future(self._stopped.wait())
+            try:
+                while not self._stopped.is_set():
+                    receive_task = asyncio.ensure_future(ws.recv())
+                    done, _ = await asyncio.wait({receive_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+                    if receive_task not in done:
+                        receive_task.cancel()
+                        return
+                    message = json.loads(receive_task.result())
+
+                    if 'id' in message and message['id'] in pending:
+                        contract_address = pending.pop(message['id'])
+                        if 'error' in message:
+                            logger.error(f"Subscription for {contract_address} rejected: {message['error']}")
+                        else:
+                            subscriptions[message['result']] = contract_address
+                        if not pending:
+                            self.connected = self._subscribed = True
+                            logger.info(f"Subscribed to {len(subscriptions)} contracts on {self.ws_url}")
+                            # Catch up on anything that changed while we were not subscribed
+                            await self.poll_once()
+                    elif message.get('method') == 'programNotification':
+                        params = message['params']
+                        contract_address = subscriptions.get(params['subscription'])
+                        if contract_address is not None:
+                            await self._handle_notification(contract_address, params['result']['value'])
+            finally:
+                stop_task.cancel()
+                self.connected = False
+
+    async def run(self):
+        """
+        Run until stop() is called: subscribe over websocket, polling adaptively whenever the connection is down.
+        """
+        try:
+            await self.poll_once()
+        except Exception as e:
+            logger.error(f"Initial snapshot failed: {e}")
+
+        if websockets is None:
+            logger.warning("websockets is not installed; monitoring by adaptive polling only.")
+            while not self._stopped.is_set():
+                await self._poll_for(self.max_poll_interval)
+            return
+
+        reconnect_delay = 1.0
+        while not self._stopped.is_set():
+            self._subscribed = False
+            try:
+                await self._run_subscriptions()
+            except Exception as e:
+                # A connection that got as far as subscribing resets the backoff
+                if self._subscribed:
+                    reconnect_delay = 1.0
+                logger.warning(f"Websocket connection to {self.ws_url} lost ({e}); polling for {reconnect_delay:.0f}s")
+            if self._stopped.is_set():
+                break
+            await self._poll_for(reconnect_delay)
+            reconnect_delay = min(self.max_reconnect_delay, reconnect_delay * 2)
@@ -1,38 +1,137 @@
-import pandas as pd
-from strategy import strategy_analysis
+import numpy as np
+from indicators import sma_series, macd_series
 import logging
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-def backtest_strategy(contract_address, historical_data):
+def sma_macd_strategy(prices, sma_window=14, fast=12, slow=26, signal=9):
+    """
+    Built-in strategy mirroring strategy_analysis: enter on sma_entry, exit on macd_entry.
+    Signals are computed from prices up to the previous bar and filled at the current bar's price.
+    Args:
+    - prices: np.ndarray - Price series.
+    - sma_window: int - SMA window for the entry signal.
+    - fast: int - MACD fast EMA span.
+    - slow: int - MACD slow EMA span.
+    - signal: int - MACD signal EMA span.
+    Returns:
+    - tuple: (entries, exits) boolean arrays aligned with prices.
+    """
+    sma = sma_series(prices, sma_window)
+    macd_values = macd_series(prices, fast, slow, signal)
+    with np.errstate(invalid='ignore'):
+        sma_entry = prices > sma
+        macd_entry = macd_values['macd'] > macd_values['signal']
+
+    # Shift by one bar so the decision at bar i only sees prices[:i]
+    entries = np.zeros(len(prices), dtype=bool)
+    exits = np.zeros(len(prices), dtype=bool)
+    entries[1:] = sma_entry[:-1]
+    exits[1:] = macd_entry[:-1] & ~sma_entry[:-1]
+    return entries, exits
+
+def summarize_equity(equity, initial_balance, trades):
+    """
+    Compute PnL and drawdown statistics from an equity curve.
+    Args:
+    - equity: np.ndarray - Mark-to-market account value per bar.
+    - initial_balance: float - Starting balance.
+    - trades: list - Closed trades from the ledger.
+    Returns:
+    - dict: Summary statistics.
+    """
+    final_equity = float(equity[-1]) if len(equity) else float(initial_balance)
+    if len(equity):
+        running_peak = np.maximum.accumulate(equity)
+        drawdown = 1.0 - equity / running_peak
+        max_drawdown = float(drawdown.max())
+    else:
+        max_drawdown = 0.0
+    wins = sum(1 for trade in trades if trade['pnl'] > 0)
+    return {
+        'initial_balance': float(initial_balance),
+        'final_equity': final_equity,
+        'pnl': final_equity - initial_balance,
+        'total_return': final_equity / initial_balance - 1.0,
+        'max_drawdown': max_drawdown,
+        'num_trades': len(trades),
+        'win_rate': wins / len(trades) if trades else 0.0,
+    }
+
+def backtest_strategy(contract_address, historical_data, strategy=sma_macd_strategy, initial_balance=1000,
+                      fee_rate=0.0, **strategy_params):
     """
     Backtest a trading strategy using historical data.
+    Indicators are computed once over the whole series and fills are simulated in a single pass, so the run is O(n).
     Args:
     - contract_address: str - Contract address for the backtest.
     - historical_data: pd.DataFrame - DataFrame containing historical price data.
+    - strategy: callable - Maps a price array to (entries, exits) boolean arrays.
+    - initial_balance: float - Starting balance for backtest.
+    - fee_rate: float - Proportional fee charged on every fill.
+    - strategy_params: Extra keyword arguments passed to the strategy (e.g. sma_window, fast, slow, signal).
     Returns:
-    - dict: Backtest results (profit/loss, entry/exit points).
+    - dict: Backtest results (trade ledger, fills, equity curve and PnL/drawdown summary).
     """
-    results = []
-    initial_balance = 1000  # Starting balance for backtest
-    
-    for i in range(14, len(historical_data)):
-        prices = historical_data['price'][:i]
-        signals = strategy_analysis(prices)
-        
-        if signals['sma_entry'] and initial_balance > 0:
-            entry_price = historical_data['price'][i]
-            results.append({
-                'entry': entry_price,
-                'balance': initial_balance,
-                'action': 'buy'
-            })
-            initial_balance -= entry_price
-        
-        elif signals['macd_entry'] and initial_balance > 0:
-            exit_price = historical_data['price'][i]
-            results.append({
-                'exit': exit_price,
-                'balance': initial_balance,
-                'action': 'sell
+    # DataFrames are detected by duck typing so this module does not need to import pandas
+    if hasattr(historical_data, 'columns'):
+        prices = historical_data['price'].to_numpy(dtype=np.float64)
+    else:
+        prices = np.asarray(historical_data, dtype=np.float64)
+
+    entries, exits = strategy(prices, **strategy_params)
+
+    cash = float(initial_balance)
+    units = 0.0
+    open_trade = None
+    trades = []
+    fills = []
+    # Position after each fill; expanded to a per-bar series once the pass is done
+    fill_indices = []
+    cash_after = [cash]
+    units_after = [0.0]
+
+    # Only bars with a signal can change state; everything in between is carried forward
+    for i in np.flatnonzero(entries | exits):
+        price = prices[i]
+        if open_trade is None and entries[i] and price > 0:
+            units = cash * (1.0 - fee_rate) / price
+            open_trade = {'entry_index': int(i), 'entry_price': float(price), 'units': units, 'cost': cash}
+            fills.append({'index': int(i), 'action': 'buy', 'price': float(price), 'balance': cash})
+            cash = 0.0
+            fill_indices.append(i)
+            cash_after.append(cash)
+            units_after.append(units)
+        elif open_trade is not None and exits[i] and not entries[i]:
+            cash = units * price * (1.0 - fee_rate)
+            trade = dict(open_trade, exit_index=int(i), exit_price=float(price), proceeds=cash)
+            trade['pnl'] = cash - trade['cost']
+            trade['return'] = trade['pnl'] / trade['cost']
+            trades.append(trade)
+            fills.append({'index': int(i), 'action': 'sell', 'price': float(price), 'balance': cash})
+            units = 0.0
+            open_trade = None
+            fill_indices.append(i)
+            cash_after.append(cash)
+            units_after.append(units)
+
+    # Forward-fill the state after the latest fill at or before each bar
+    state = np.zeros(len(prices), dtype=np.int64)
+    state[fill_indices] = np.arange(1, len(fill_indices) + 1)
+    state = np.maximum.accumulate(state) if len(state) else state
+    equity = np.asarray(cash_after)[state] + np.asarray(units_after)[state] * prices
+    summary = summarize_equity(equity, initial_balance, trades)
+    summary['open_position'] = open_trade is not None
+
+    logger.info(
+        f"Backtest for {contract_address}: {summary['num_trades']} trades, "
+        f"return {summary['total_return']:.2%}, max drawdown {summary['max_drawdown']:.2%}"
+    )
+    return {
+        'contract_address': contract_address,
+        'trades': trades,
+        'fills': fills,
+        'equity_curve': equity,
+        'summary': summary,
+    }
@@ -0,0 +1,81 @@
+"""
+Compare the JSON-file cache with the segment cache backend.
+
+Run from the repository root:
+    python -m benchmarks.bench_cache_backends --contracts 2000 --accounts 200
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import numpy as np
+from benchmarks.synthetic import make_token_accounts
+from segment_cache import SegmentStore, migrate_json_cache
+from utils import process_token_data
+
+
+def disk_footprint(paths):
+    """Return (file count, allocated bytes) for the given files."""
+    allocated = sum(os.stat(path).st_blocks * 512 for path in paths)
+    return len(paths), allocated
+
+
+def time_lookups(keys, lookup):
+    """Return per-lookup latencies in microseconds."""
+    latencies = np.empty(len(keys))
+    for i, key in enumerate(keys):
+        start = time.perf_counter()
+        lookup(key)
+        latencies[i] = (time.perf_counter() - start) * 1e6
+    return latencies
+
+
+def report(label, latencies):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{label:<28} p50={p50:9.1f}us  p95={p95:9.1f}us  p99={p99:9.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contracts', type=int, default=1000)
+    parser.add_argument('--accounts', type=int, default=200, help="Token accounts per contract")
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        json_dir = os.path.join(workdir, 'json')
+        os.makedirs(json_dir)
+        keys = [f"contract{i:06d}" for i in range(args.contracts)]
+        now = time.time()
+        for i, key in enumerate(keys):
+            with open(os.path.join(json_dir, f"{key}.json"), 'w') as f:
+                json.dump({'timestamp': now, 'data': make_token_accounts(args.accounts, seed=i)}, f)
+
+        store = SegmentStore(os.path.join(workdir, 'contracts.seg'))
+        start = time.perf_counter()
+        migrate_json_cache(json_dir, store)
+        print(f"Migrated {args.contracts} contracts in {time.perf_counter() - start:.2f}s")
+
+        json_files = [os.path.join(json_dir, f"{key}.json") for key in keys]
+        count, size = disk_footprint(json_files)
+        print(f"JSON cache:    {count} files, {size / 1e6:.1f} MB allocated")
+        count, size = disk_footprint([store.path])
+        print(f"Segment cache: {count} file,  {size / 1e6:.1f} MB allocated")
+
+        def json_payload(key):
+            with open(os.path.join(json_dir, f"{key}.json")) as f:
+                return json.load(f)['data']
+
+        rng = random.Random(0)
+        sample = [rng.choice(keys) for _ in range(args.lookups)]
+        report("json full payload", time_lookups(sample, json_payload))
+        report("segment full payload", time_lookups(sample, store.load_entry))
+        report("json balances", time_lookups(sample, lambda key: process_token_data(json_payload(key))))
+        report("segment balances (mmap)", time_lookups(sample, lambda key: store.get_arrays(key)['balances']))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
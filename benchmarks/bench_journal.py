@@ -0,0 +1,75 @@
+"""
+Measure signal journal write rate and replay throughput.
+
+Writes synthetic strategy records for a set of contracts into a temporary journal, then times a full scan,
+a time-range scan, a single-contract scan, a decoded replay through a handler and a replay of one contract's
+journaled prices through the backtester.
+
+Run from the repository root:
+    python -m benchmarks.bench_journal --records 2000000 --contracts 500
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+
+
+def timed(label, func, items):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1e3:9.1f}ms  {items / elapsed:14.0f} records/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--contracts', type=int, default=200)
+    parser.add_argument('--segment-records', type=int, default=250000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # The journal reads its defaults from the settings; keep the default directory out of the way
+    os.environ.setdefault('JOURNAL_DIR', tempfile.mkdtemp(prefix='journal-default-'))
+    from backtest import backtest_strategy
+    from signal_journal import SignalJournal, KIND_STRATEGY, FLAG_SMA_ENTRY
+
+    rng = np.random.default_rng(args.seed)
+    addresses = [f"BenchContract{i:06d}" for i in range(args.contracts)]
+    owners = rng.integers(0, args.contracts, args.records).tolist()
+    prices = (100 * np.exp(np.cumsum(rng.normal(0, 0.001, args.records)))).tolist()
+    start_time = time.time() - args.records
+
+    with tempfile.TemporaryDirectory() as root:
+        journal = SignalJournal(root, segment_records=args.segment_records, retention_days=0)
+
+        def write():
+            record = journal.record
+            for i in range(args.records):
+                price = prices[i]
+                record(KIND_STRATEGY, addresses[owners[i]], (price, price, 50.0, 0.0, 0.0), FLAG_SMA_ENTRY,
+                       start_time + i)
+            journal.flush(fsync=True)
+        timed('write', write, args.records)
+        print(f"    {journal.stats()}, {sum(os.path.getsize(os.path.join(root, name)) for name in os.listdir(root)) / 2 ** 20:.1f}MB on disk")
+
+        timed('reopen', lambda: SignalJournal(root, segment_records=args.segment_records).close(), args.records)
+        timed('scan all', lambda: journal.scan(), args.records)
+        window = args.records // 10
+        middle = start_time + args.records // 2
+        timed('scan 10% time range', lambda: journal.scan(middle, middle + window), window)
+        one = timed('scan one contract', lambda: journal.scan(contracts=addresses[0]), args.records)
+        replayed = []
+        timed('replay decoded (10%)', lambda: journal.replay(replayed.append, middle, middle + window), window)
+
+        def replay_backtest():
+            _, series = journal.price_series(addresses[0])
+            return backtest_strategy(addresses[0], series)
+        timed('price series + backtest', replay_backtest, len(one))
+        journal.close()
+
+
+if __name__ == "__main__":
+    main()
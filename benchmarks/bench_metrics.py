@@ -0,0 +1,43 @@
+"""
+Measure the per-call overhead of metrics spans and counters with recording disabled and enabled.
+
+Run from the repository root:
+    python -m benchmarks.bench_metrics --calls 1000000
+"""
+import argparse
+import time
+import metrics
+
+
+def overhead_ns(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=1000000)
+    args = parser.parse_args()
+
+    def bare():
+        pass
+
+    def with_span():
+        with metrics.span('bench', 'contract0001'):
+            pass
+
+    def with_count():
+        metrics.count('bench_total', stage='bench')
+
+    baseline = overhead_ns(bare, args.calls)
+    for enabled in (False, True):
+        metrics.configure(enabled=enabled)
+        span_ns = overhead_ns(with_span, args.calls) - baseline
+        count_ns = overhead_ns(with_count, args.calls) - baseline
+        print(f"{'enabled ' if enabled else 'disabled'}  span {span_ns:8.1f} ns/call  count {count_ns:8.1f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compare tail latency of a single RPC endpoint with the health-scored router, with and without hedging.
+
+Starts local fake RPC servers of differing latency, jitter and error rate, then times sequential
+getTokenAccountsByOwner calls through each configuration. In the outage run the steady endpoint starts
+answering every request with 503 halfway through, to show failover and the circuit breaker.
+
+Run from the repository root:
+    python -m benchmarks.bench_rpc_router --calls 300
+"""
+import argparse
+import time
+import numpy as np
+from benchmarks.fake_rpc import FakeSolanaRpc
+
+
+def time_calls(call, calls):
+    latencies, failures = [], 0
+    for i in range(calls):
+        start = time.perf_counter()
+        try:
+            call(f"BenchOwner{i:06d}")
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    return np.asarray(latencies), failures
+
+
+def report(label, latencies, failures):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1e3
+    print(f"{label:<26} p50={p50:8.1f}ms  p95={p95:8.1f}ms  p99={p99:8.1f}ms  max={latencies.max() * 1e3:8.1f}ms  "
+          f"failures={failures}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=300)
+    parser.add_argument('--accounts', type=int, default=50, help="Token accounts per response")
+    args = parser.parse_args()
+
+    from rpc_batch import token_accounts_params
+    from rpc_router import RpcRouter
+    from transport import Transport
+
+    # (latency, jitter, error rate): a fast endpoint with heavy tail, a steady slower one and a flaky one
+    profiles = [(0.01, 0.2, 0.0), (0.03, 0.01, 0.0), (0.02, 0.02, 0.3)]
+    for label, hedge, outage in (('single endpoint', None, False), ('router', False, False),
+                                 ('router + hedging', True, False), ('router + hedging, outage', True, True)):
+        servers = [FakeSolanaRpc(args.accounts, latency, jitter, error_rate, seed=i).start()
+                   for i, (latency, jitter, error_rate) in enumerate(profiles)]
+        transport = Transport(max_retries=0)
+        try:
+            if hedge is None:
+                def call(owner, url=servers[0].url):
+                    payload = {'jsonrpc': '2.0', 'id': 1, 'method': 'getTokenAccountsByOwner',
+                               'params': token_accounts_params(owner)}
+                    response = transport.post(url, json=payload)
+                    response.raise_for_status()
+                    return response.json()
+            else:
+                router = RpcRouter([server.url for server in servers], transport=transport, hedge=hedge,
+                                   hedge_min_delay=0.01, failure_threshold=3, reset_timeout=5.0)
+
+                def call(owner):
+                    return router.rpc_call('getTokenAccountsByOwner', token_accounts_params(owner))
+
+            if outage:
+                first, first_failures = time_calls(call, args.calls // 2)
+                servers[1].error_rate = 1.0
+                second, second_failures = time_calls(call, args.calls - args.calls // 2)
+                latencies, failures = np.concatenate([first, second]), first_failures + second_failures
+            else:
+                latencies, failures = time_calls(call, args.calls)
+            report(label, latencies, failures)
+            if hedge is not None:
+                for host, health in router.stats().items():
+                    print(f"    {host:<22} {health['state']:<9} requests={health['requests']:<5} "
+                          f"errors={health['errors']:<4} hedges={health['hedges']:<4} wins={health['hedge_wins']}")
+                router.close()
+        finally:
+            for server in servers:
+                server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compare watchlist sweep throughput in one process with the multi-process sharded scanner.
+
+Starts a local fake RPC server, then scans the same list of contracts with main.sweep_contracts in this
+process and with ShardedScanner.sweep at several shard counts. Each configuration gets one warm-up sweep
+(process start-up and imports are not timed).
+
+Run from the repository root:
+    python -m benchmarks.bench_sharded --contracts 400 --accounts 2000 --shards 1 2 4
+"""
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.fake_rpc import FakeSolanaRpc
+from benchmarks.suite import configure_environment
+
+
+def report(label, contracts, elapsed):
+    print(f"{label:<22} {elapsed:8.2f}s  {contracts / elapsed:10.1f} contracts/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contracts', type=int, default=400)
+    parser.add_argument('--accounts', type=int, default=2000, help="Token accounts per contract")
+    parser.add_argument('--latency', type=float, default=0.01, help="Fake RPC latency per request in seconds")
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument('--batch-size', type=int, default=20, help="Contracts per batch sent to a shard")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir, FakeSolanaRpc(args.accounts, args.latency) as rpc:
+        # Set before any application import so the shard processes inherit it too
+        configure_environment(rpc.url, workdir)
+        import main
+        from sharded_scanner import ShardedScanner
+
+        warmup = [f"Warmup{i:06d}" for i in range(args.batch_size)]
+        contracts = [f"Sharded{i:06d}" for i in range(args.contracts)]
+        print(f"{args.contracts} contracts x {args.accounts} accounts, {os.cpu_count()} CPUs")
+
+        main.sweep_contracts(warmup)
+        start = time.perf_counter()
+        main.sweep_contracts(contracts)
+        report('in-process', args.contracts, time.perf_counter() - start)
+
+        for shards in dict.fromkeys(args.shards):
+            with ShardedScanner(shards, scheduler=main.ScanScheduler(path=None), batch_size=args.batch_size) as scanner:
+                scanner.sweep(warmup * shards)
+                start = time.perf_counter()
+                scanned = scanner.sweep(contracts)
+                report(f"{shards} shard{'s' if shards > 1 else ''}", len(scanned), time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Measure parameter-sweep scaling across worker counts.
+
+Run from the repository root:
+    python -m benchmarks.bench_sweep --contracts 50 --bars 20000
+"""
+import argparse
+import os
+import time
+from benchmarks.synthetic import make_price_histories
+from sweep import parameter_grid, run_parameter_sweep
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contracts', type=int, default=50)
+    parser.add_argument('--bars', type=int, default=20000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    price_series = make_price_histories(args.contracts, args.bars)
+    param_sets = parameter_grid(sma_window=[10, 14, 20, 30], fast=[8, 12], slow=[21, 26], signal=[9])
+    jobs = args.contracts * len(param_sets)
+    print(f"{args.contracts} contracts x {len(param_sets)} parameter sets = {jobs} backtests of {args.bars} bars")
+
+    worker_counts = sorted({1, *[2 ** k for k in range(1, 8) if 2 ** k < args.max_workers], args.max_workers})
+    baseline = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        run_parameter_sweep(price_series, param_sets, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        speedup = baseline / elapsed
+        print(f"workers={workers:<3} time={elapsed:7.2f}s  jobs/s={jobs / elapsed:8.1f}  "
+              f"speedup={speedup:5.2f}x  efficiency={speedup / workers:5.1%}")
+
+
+if __name__ == "__main__":
+    main()
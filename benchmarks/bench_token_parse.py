@@ -0,0 +1,90 @@
+"""
+Compare peak RSS and parse time of full JSON decoding with streaming balance extraction.
+
+Each method runs in a fresh interpreter reading the same response file in chunks, so peak RSS is not
+polluted by the other methods.
+
+Run from the repository root:
+    python -m benchmarks.bench_token_parse --accounts 200000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.synthetic import make_token_accounts
+
+CHUNK_SIZE = 65536
+METHODS = ('json', 'scanner', 'ijson')
+
+
+def read_chunks(path):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_method(method, path):
+    """Parse the response file with one method and print a JSON result line."""
+    import numpy as np
+    from token_stream import parse_ui_amounts
+    from utils import process_token_data
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if method == 'json':
+        response = json.loads(b''.join(read_chunks(path)))
+        balances = process_token_data(response['result']['value'])
+    else:
+        balances = parse_ui_amounts(read_chunks(path), use_ijson=method == 'ijson')
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'method': method, 'count': len(balances), 'seconds': elapsed,
+                      'peak_rss_mb': peak_rss_mb() - baseline, 'total': float(np.sum(balances))}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--accounts', type=int, default=200000)
+    parser.add_argument('--run', choices=METHODS, help=argparse.SUPPRESS)
+    parser.add_argument('--file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_method(args.run, args.file)
+        return
+
+    fd, path = tempfile.mkstemp(suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'jsonrpc': '2.0', 'id': 1,
+                       'result': {'context': {'slot': 1}, 'value': make_token_accounts(args.accounts)}}, f)
+        print(f"Response with {args.accounts} accounts: {os.path.getsize(path) / 2 ** 20:.1f} MB")
+
+        for method in METHODS:
+            completed = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_token_parse', '--run', method, '--file', path],
+                capture_output=True, text=True)
+            if completed.returncode != 0:
+                reason = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'
+                print(f"{method:<8} skipped ({reason})")
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(f"{method:<8} time={result['seconds']:7.3f}s  peak_rss=+{result['peak_rss_mb']:8.1f}MB  "
+                  f"balances={result['count']}  sum={result['total']:.6g}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Measure transaction-history ingestion throughput and the cost of incremental reruns.
+
+Starts a local fake RPC server with a synthetic swap history per contract, ingests each contract's history
+from scratch (backfilling until MAX_TRANSACTION_HISTORY-sized runs reach genesis), then adds new transactions
+and times the incremental rerun, which only walks down to the checkpointed head.
+
+Run from the repository root:
+    python -m benchmarks.bench_tx_history --contracts 4 --transactions 5000 --max-transactions 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.fake_rpc import FakeSolanaRpc
+from benchmarks.suite import configure_environment
+
+
+def report(label, runs, summaries, elapsed):
+    signatures = sum(summary['signatures'] for summary in summaries)
+    transfers = sum(summary['transfers'] for summary in summaries)
+    print(f"{label:<22} {runs:4d} runs {elapsed:8.2f}s  {signatures / elapsed:10.0f} signatures/s  "
+          f"{transfers:8d} transfers")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contracts', type=int, default=4)
+    parser.add_argument('--transactions', type=int, default=5000, help="History length per contract")
+    parser.add_argument('--new-transactions', type=int, default=100, help="Transactions added before the rerun")
+    parser.add_argument('--max-transactions', type=int, default=1000, help="Signatures ingested per run")
+    parser.add_argument('--latency', type=float, default=0.005, help="Fake RPC latency per request in seconds")
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir, \
+            FakeSolanaRpc(1, args.latency, transactions_per_address=args.transactions) as rpc:
+        configure_environment(rpc.url, workdir)
+        from tx_history import TransactionHistoryIngester
+
+        ingester = TransactionHistoryIngester(rpc.url, os.path.join(workdir, 'tx_history'),
+                                              max_transactions=args.max_transactions,
+                                              batch_size=args.batch_size, workers=args.workers)
+        contracts = [f"TxBench{i:06d}" for i in range(args.contracts)]
+        print(f"{args.contracts} contracts x {args.transactions} transactions, "
+              f"{args.max_transactions} per run, {args.workers} workers x {args.batch_size} per batch")
+
+        summaries = []
+        start = time.perf_counter()
+        for contract in contracts:
+            while True:
+                summaries.append(ingester.ingest(contract))
+                if summaries[-1]['complete']:
+                    break
+        report('full history', len(summaries), summaries, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        summaries = [ingester.ingest(contract) for contract in contracts]
+        report('rerun, nothing new', len(summaries), summaries, time.perf_counter() - start)
+
+        rpc.transactions_per_address = args.transactions + args.new_transactions
+        start = time.perf_counter()
+        summaries = [ingester.ingest(contract) for contract in contracts]
+        report(f"rerun, {args.new_transactions} new", len(summaries), summaries, time.perf_counter() - start)
+
+        stored = sum(os.path.getsize(os.path.join(workdir, 'tx_history', name))
+                     for name in os.listdir(os.path.join(workdir, 'tx_history')))
+        print(f"    {stored / 2 ** 20:.1f}MB of transfer records and checkpoints")
+        ingester.close()
+
+
+if __name__ == "__main__":
+    main()
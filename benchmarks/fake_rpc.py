@@ -0,0 +1,245 @@
+"""
+Local stub of the Solana JSON-RPC API for offline benchmarks.
+
+Answers getTokenAccountsByOwner (single and batched requests) with synthetic jsonParsed token accounts that
+are deterministic per owner address (drawn from a few pre-generated variants), after a configurable latency.
+With transactions_per_address set, every address also has a swap history served through
+getSignaturesForAddress (with before/until/limit paging) and getTransaction. Point SOLANA_API_URL at it to
+exercise the real fetch paths without network access.
+
+Run standalone from the repository root:
+    python -m benchmarks.fake_rpc --port 8899 --accounts 1000 --latency 0.05
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks.synthetic import make_signature_info, make_token_accounts, make_transaction
+
+# Distinct account lists served; owners map onto them by hash so payloads are generated once, not per call
+PAYLOAD_VARIANTS = 8
+# Largest page getSignaturesForAddress returns, as on mainnet
+MAX_SIGNATURES_LIMIT = 1000
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping connections (e.g. losers of hedged requests) are expected, not errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeSolanaRpc:
+    """
+    Threaded HTTP server speaking enough Solana JSON-RPC for the fetch paths.
+    Args:
+    - accounts_per_owner: int - Token accounts returned for every owner address.
+    - latency: float - Seconds each HTTP request is delayed before the reply.
+    - jitter: float - Extra uniformly random delay of up to this many seconds.
+    - error_rate: float - Fraction of HTTP requests answered with 503.
+    - seed: int - Seed for reproducible payloads and jitter.
+    - variants: int - Distinct account lists served.
+    - transactions_per_address: int - Length of every address's transaction history (may be raised while
+      running to simulate new transactions).
+    - host: str - Interface to bind.
+    - port: int - Port to bind (0 picks a free port).
+    """
+
+    def __init__(self, accounts_per_owner=1000, latency=0.0, jitter=0.0, error_rate=0.0, seed=0,
+                 variants=PAYLOAD_VARIANTS, transactions_per_address=0, host='127.0.0.1', port=0):
+        self.accounts_per_owner = accounts_per_owner
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self.variants = max(1, variants)
+        self.transactions_per_address = transactions_per_address
+        self.requests = 0
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._payloads = {}
+        self._lock = threading.Lock()
+        self._server = _QuietHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Generate the payload variants, then serve requests from a daemon thread."""
+        for variant in range(self.variants):
+            self._variant_json(variant)
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-rpc', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _variant_json(self, variant):
+        payload = self._payloads.get(variant)
+        if payload is None:
+            payload = json.dumps(make_token_accounts(self.accounts_per_owner, seed=self.seed * self.variants + variant))
+            with self._lock:
+                payload = self._payloads.setdefault(variant, payload)
+        return payload
+
+    def accounts_json(self, owner):
+        """
+        Serialized token accounts of one owner, picked from the pre-generated variants by address hash.
+        Args:
+        - owner: str - Owner address.
+        Returns:
+        - str: JSON array of token accounts.
+        """
+        return self._variant_json(zlib.crc32(owner.encode()) % self.variants)
+
+    @staticmethod
+    def signature(address, index):
+        """Signature of an address's index-th transaction (0 is the oldest)."""
+        return f"{address}-{index:09d}"
+
+    def signatures(self, address, before=None, until=None, limit=MAX_SIGNATURES_LIMIT):
+        """
+        getSignaturesForAddress result: signature entries newest first, older than `before` and newer than `until`.
+        Args:
+        - address: str - Address whose history is listed.
+        - before: str - Start below this signature.
+        - until: str - Stop at this signature (exclusive).
+        - limit: int - Maximum entries.
+        Returns:
+        - list: Signature entries.
+        """
+        start = self.transactions_per_address - 1 if before is None else int(before.rsplit('-', 1)[1]) - 1
+        stop = -1 if until is None else int(until.rsplit('-', 1)[1])
+        stop = max(stop, start - max(1, min(limit, MAX_SIGNATURES_LIMIT)))
+        return [make_signature_info(address, index, self.signature(address, index), self.seed)
+                for index in range(start, stop, -1)]
+
+    def transaction(self, signature):
+        """
+        getTransaction result for a signature from signatures(), or None if it is unknown.
+        Args:
+        - signature: str - Transaction signature.
+        Returns:
+        - dict: The transaction.
+        """
+        address, _, index = signature.rpartition('-')
+        if not address or not index.isdigit() or int(index) >= self.transactions_per_address:
+            return None
+        transaction = make_transaction(address, int(index), self.seed)
+        transaction['transaction']['signatures'] = [signature]
+        return transaction
+
+    def _reply(self, call):
+        request_id = json.dumps(call.get('id'))
+        method = call.get('method')
+        params = call.get('params') or []
+        if method == 'getTokenAccountsByOwner' and params:
+            result = '{"context":{"slot":1},"value":' + self.accounts_json(str(params[0])) + '}'
+        elif method == 'getSignaturesForAddress' and params:
+            options = params[1] if len(params) > 1 and isinstance(params[1], dict) else {}
+            result = json.dumps(self.signatures(str(params[0]), options.get('before'), options.get('until'),
+                                                options.get('limit', MAX_SIGNATURES_LIMIT)))
+        elif method == 'getTransaction' and params:
+            result = json.dumps(self.transaction(str(params[0])))
+        elif method == 'getHealth':
+            result = '"ok"'
+        elif method == 'getSlot':
+            result = '1'
+        else:
+            error = json.dumps({'code': -32601, 'message': f"Method not found: {method}"})
+            return '{"jsonrpc":"2.0","id":' + request_id + ',"error":' + error + '}'
+        return '{"jsonrpc":"2.0","id":' + request_id + ',"result":' + result + '}'
+
+    def handle(self, body):
+        """
+        Answer one HTTP request body.
+        Args:
+        - body: bytes - JSON-RPC request or batch.
+        Returns:
+        - tuple: (HTTP status, response bytes).
+        """
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            failed = self.error_rate > 0 and self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return 503, b'{"error":"service unavailable"}'
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 200, b'{"jsonrpc":"2.0","id":null,"error":{"code":-32700,"message":"Parse error"}}'
+        calls = payload if isinstance(payload, list) else [payload]
+        with self._lock:
+            self.calls += len(calls)
+        replies = [self._reply(call) for call in calls]
+        text = '[' + ','.join(replies) + ']' if isinstance(payload, list) else replies[0]
+        return 200, text.encode('utf-8')
+
+    def _handler_class(self):
+        rpc = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; without this, delayed ACKs add ~40ms per reply
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status, response = rpc.handle(body)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8899)
+    parser.add_argument('--accounts', type=int, default=1000, help="Token accounts per owner")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra random delay of up to this many seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument('--transactions', type=int, default=0, help="Transaction history length per address")
+    args = parser.parse_args()
+
+    rpc = FakeSolanaRpc(args.accounts, args.latency, args.jitter, args.error_rate,
+                        transactions_per_address=args.transactions, host=args.host, port=args.port)
+    with rpc:
+        print(f"Fake Solana RPC listening on {rpc.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
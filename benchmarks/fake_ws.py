@@ -0,0 +1,119 @@
+"""
+Local stub of the Solana websocket API for exercising the subscription monitor offline.
+
+Answers programSubscribe requests with subscription ids, pushes programNotification messages for chosen
+owners, and can refuse or drop connections to exercise reconnects. The server runs on the caller's event loop:
+
+    async with FakeSolanaWebsocket() as server:
+        monitor = AsyncContractMonitor(addresses, on_update, ws_url=server.url)
+        ...
+        await server.notify(owner_address, {'pubkey': ..., 'account': ...})
+"""
+import asyncio
+import itertools
+import json
+import websockets
+
+
+class FakeSolanaWebsocket:
+    """
+    Websocket server speaking enough of the Solana subscription API for async_monitor.
+    Args:
+    - refuse_connections: int - Number of initial connections closed right after the handshake.
+    - host: str - Interface to bind.
+    - port: int - Port to bind (0 picks a free port).
+    """
+
+    def __init__(self, refuse_connections=0, host='127.0.0.1', port=0):
+        self.refuse_connections = refuse_connections
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.subscribe_requests = []
+        # Owner address -> (connection, subscription id) for subscriptions on open connections
+        self._subscriptions = {}
+        self._open = set()
+        self._subscription_ids = itertools.count(1)
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    async def start(self):
+        """Start accepting connections on the running event loop."""
+        self._server = await websockets.serve(self._handle, self.host, self.port)
+        return self
+
+    async def stop(self):
+        """Close every connection and stop listening."""
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+        return False
+
+    def subscribed(self):
+        """
+        Owners with a live subscription.
+        Returns:
+        - set: Owner addresses subscribed on open connections.
+        """
+        return set(self._subscriptions)
+
+    @staticmethod
+    def _owner(params):
+        for filter_ in params[1].get('filters', []):
+            if 'memcmp' in filter_:
+                return filter_['memcmp']['bytes']
+        return None
+
+    async def _handle(self, connection):
+        self.connections += 1
+        if self.connections <= self.refuse_connections:
+            await connection.close(1013, 'try again later')
+            return
+        self._open.add(connection)
+        try:
+            async for message in connection:
+                request = json.loads(message)
+                if request.get('method') != 'programSubscribe':
+                    error = {'code': -32601, 'message': f"Method not found: {request.get('method')}"}
+                    await connection.send(json.dumps({'jsonrpc': '2.0', 'id': request.get('id'), 'error': error}))
+                    continue
+                self.subscribe_requests.append(request['params'])
+                subscription = next(self._subscription_ids)
+                self._subscriptions[self._owner(request['params'])] = (connection, subscription)
+                await connection.send(json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': subscription}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._open.discard(connection)
+            for owner, (subscribed_on, _) in list(self._subscriptions.items()):
+                if subscribed_on is connection:
+                    del self._subscriptions[owner]
+
+    async def notify(self, owner_address, value, slot=1):
+        """
+        Push a programNotification for an account change to the owner's subscriber.
+        Args:
+        - owner_address: str - Subscribed owner address.
+        - value: dict - Changed token account ({'pubkey', 'account'}).
+        - slot: int - Slot reported in the notification context.
+        """
+        connection, subscription = self._subscriptions[owner_address]
+        await connection.send(json.dumps({
+            'jsonrpc': '2.0',
+            'method': 'programNotification',
+            'params': {'result': {'context': {'slot': slot}, 'value': value}, 'subscription': subscription},
+        }))
+
+    async def drop_connections(self):
+        """Close every open connection, as a provider restart would."""
+        for connection in list(self._open):
+            await connection.close(1011, 'server restart')
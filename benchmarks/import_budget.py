@@ -0,0 +1,119 @@
+"""
+Check module import times against a budget using `python -X importtime`.
+
+Each module is imported in a fresh interpreter so nothing is already cached in sys.modules. The cumulative time
+reported for the module itself (including everything it pulls in) is compared with its budget, and the script
+exits non-zero if any module is over, so it can run in CI.
+
+Run from the repository root:
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --runs 5 --top 10 backtest sweep
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Cumulative import time budget per module, in milliseconds. numpy alone costs roughly 60-100 ms, so the
+# numeric modules that sweep and backtest workers import are budgeted just above it.
+IMPORT_BUDGET_MS = {
+    'settings': 40,
+    'config': 50,
+    'indicators': 150,
+    'backtest': 150,
+    'sweep': 200,
+    'strategy': 200,
+    'screening': 200,
+    'support_resistance': 150,
+    'holder_metrics': 200,
+    'signal_journal': 150,
+    'sharded_scanner': 300,
+    'tx_history': 300,
+    'historical_data': 350,
+    'main': 600,
+}
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr):
+    """
+    Parse `-X importtime` output.
+    Args:
+    - stderr: str - Interpreter stderr.
+    Returns:
+    - dict: Module name -> (self microseconds, cumulative microseconds).
+    """
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        timings[parts[2].strip()] = (int(parts[0]), int(parts[1]))
+    return timings
+
+
+def measure(module, runs=3):
+    """
+    Import a module in fresh interpreters and keep the fastest run.
+    Args:
+    - module: str - Module name.
+    - runs: int - Interpreters to start.
+    Returns:
+    - dict: Module name -> (self microseconds, cumulative microseconds) of the fastest run.
+    """
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                cwd=REPO_ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr.splitlines()[-1] if result.stderr else ''}")
+        timings = parse_importtime(result.stderr)
+        if module in timings and (best is None or timings[module][1] < best[module][1]):
+            best = timings
+    return best or {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', help="Modules to check (defaults to every budgeted module)")
+    parser.add_argument('--runs', type=int, default=3, help="Fresh interpreters per module; the fastest counts")
+    parser.add_argument('--top', type=int, default=0, help="Also list the N slowest imports under each module")
+    parser.add_argument('--output', help="Write the measurements to this JSON file")
+    args = parser.parse_args()
+
+    report = {}
+    over_budget = []
+    for module in args.modules or IMPORT_BUDGET_MS:
+        try:
+            timings = measure(module, args.runs)
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            over_budget.append(module)
+            continue
+        cumulative_ms = timings[module][1] / 1000
+        budget_ms = IMPORT_BUDGET_MS.get(module)
+        within = budget_ms is None or cumulative_ms <= budget_ms
+        if not within:
+            over_budget.append(module)
+        report[module] = {'cumulative_ms': cumulative_ms, 'budget_ms': budget_ms, 'within_budget': within}
+        status = 'ok' if within else 'OVER'
+        print(f"{module:<20} {cumulative_ms:8.1f} ms  budget {budget_ms if budget_ms is not None else '-':>5}  {status}")
+        if args.top:
+            slowest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+            for name, (self_us, _) in slowest:
+                print(f"    {name:<40} {self_us / 1000:8.1f} ms self")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if over_budget:
+        print(f"Over import budget: {', '.join(over_budget)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
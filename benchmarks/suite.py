@@ -0,0 +1,333 @@
+"""
+Reproducible offline benchmark suite.
+
+Every case runs against synthetic data of a configurable size; the fetch cases go through the real transport
+to a local fake JSON-RPC server (benchmarks/fake_rpc.py) with configurable latency. For each case the suite
+records per-call latency percentiles, throughput (accounts or bars processed per second) and the peak Python
+heap of one call, and writes the results to JSON so runs can be compared between commits.
+
+Run from the repository root:
+    python -m benchmarks.suite                                    # all cases, results in benchmarks/results/
+    python -m benchmarks.suite -k backtest --bars 200000          # cases whose name contains "backtest"
+    python -m benchmarks.suite --compare benchmarks/results/<baseline>.json --threshold 0.2
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from benchmarks.fake_rpc import FakeSolanaRpc
+from benchmarks.synthetic import make_price_series, make_token_accounts
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+
+# name -> setup(ctx) returning (callable, items processed per call, unit of the items)
+CASES = {}
+
+
+def case(name):
+    """
+    Register a benchmark case. The decorated setup function receives the suite context and returns
+    (func, items, unit): the zero-argument callable to time, how many items one call processes and their unit.
+    Args:
+    - name: str - Case name.
+    Returns:
+    - callable: The decorator.
+    """
+    def decorator(setup):
+        CASES[name] = setup
+        return setup
+    return decorator
+
+
+class SuiteContext:
+    """
+    Shared inputs of one suite run.
+    Args:
+    - args: argparse.Namespace - Sizes and latency options.
+    - rpc: FakeSolanaRpc - Running fake RPC server.
+    """
+
+    def __init__(self, args, rpc):
+        self.args = args
+        self.rpc = rpc
+        self._accounts = None
+        self._prices = None
+
+    @property
+    def accounts(self):
+        if self._accounts is None:
+            self._accounts = make_token_accounts(self.args.accounts, seed=self.args.seed)
+        return self._accounts
+
+    @property
+    def prices(self):
+        if self._prices is None:
+            self._prices = make_price_series(self.args.bars, seed=self.args.seed)
+        return self._prices
+
+
+@case('fetch_contract_data')
+def bench_fetch_contract_data(ctx):
+    import main
+
+    # A fresh address per call, so every call is a cache miss and a full RPC round trip
+    addresses = (f"BenchOwner{i:08d}" for i in itertools.count())
+    return lambda: main.fetch_contract_data(next(addresses)), ctx.args.accounts, 'accounts'
+
+
+@case('fetch_contracts_data_batch')
+def bench_fetch_contracts_data_batch(ctx):
+    import main
+
+    size = ctx.args.batch
+    counter = itertools.count()
+
+    def run():
+        start = next(counter) * size
+        main.fetch_contracts_data([f"BenchBatch{i:08d}" for i in range(start, start + size)])
+    return run, ctx.args.accounts * size, 'accounts'
+
+
+@case('process_token_data')
+def bench_process_token_data(ctx):
+    from utils import process_token_data
+
+    accounts = ctx.accounts
+    return lambda: process_token_data(accounts), len(accounts), 'accounts'
+
+
+@case('analyze_token_data')
+def bench_analyze_token_data(ctx):
+    from analysis import analyze_token_data
+
+    accounts = ctx.accounts
+    return lambda: analyze_token_data(accounts), len(accounts), 'accounts'
+
+
+@case('contract_state_load')
+def bench_contract_state_load(ctx):
+    from contract_state import ContractState
+
+    accounts = ctx.accounts
+    # A fresh state each call; reloading the same list into one state is a no-op
+    return lambda: ContractState('BenchContract').load(accounts), len(accounts), 'accounts'
+
+
+@case('analyze_contract_data')
+def bench_analyze_contract_data(ctx):
+    import main
+    from contract_state import ContractState
+
+    state = ContractState('BenchContract')
+    state.load(ctx.accounts)
+    return lambda: main.analyze_contract_data(state), len(state), 'accounts'
+
+
+@case('strategy_analysis')
+def bench_strategy_analysis(ctx):
+    from strategy import strategy_analysis
+
+    prices = ctx.prices
+    return lambda: strategy_analysis(prices), len(prices), 'bars'
+
+
+@case('screen_prices')
+def bench_screen_prices(ctx):
+    from screening import screen_prices
+
+    # One row per contract, all ending at the latest bar
+    matrix = np.lib.stride_tricks.sliding_window_view(ctx.prices, 500)[::max(1, (len(ctx.prices) - 500) // 1000)]
+    matrix = np.ascontiguousarray(matrix[:1000])
+    return lambda: screen_prices(matrix), len(matrix), 'contracts'
+
+
+@case('backtest_strategy')
+def bench_backtest_strategy(ctx):
+    from backtest import backtest_strategy
+
+    prices = ctx.prices
+    return lambda: backtest_strategy('BenchContract', prices), len(prices), 'bars'
+
+
+def configure_environment(rpc_url, workdir):
+    """
+    Point the application settings at the fake RPC and keep the run free of caching, alerts and pacing.
+    Must run before the first application module reads its settings.
+    Args:
+    - rpc_url: str - Fake RPC URL.
+    - workdir: str - Scratch directory for anything written to disk.
+    """
+    os.environ.update({
+        'SOLANA_API_URL': rpc_url,
+        'CACHE_ENABLED': '0',
+        'CACHE_DIR': os.path.join(workdir, 'cache'),
+        'HISTORY_DIR': os.path.join(workdir, 'history'),
+        'WATCHLIST_PATH': os.path.join(workdir, 'watchlist.json'),
+        'JOURNAL_DIR': os.path.join(workdir, 'journal'),
+        'TX_HISTORY_DIR': os.path.join(workdir, 'tx_history'),
+        'API_RATE_LIMIT': str(10 ** 9),
+        'SEND_ALERTS': '0',
+        'METRICS_ENABLED': '0',
+        'HTTP_MAX_RETRIES': '0',
+    })
+
+
+def run_case(func, items, min_iterations, max_iterations, min_time, warmup):
+    """
+    Time repeated calls of a case and measure the peak heap of one extra call.
+    Args:
+    - func: callable - Zero-argument case body.
+    - items: int - Items processed per call.
+    - min_iterations: int - Minimum timed calls.
+    - max_iterations: int - Maximum timed calls.
+    - min_time: float - Keep calling until this many seconds were spent (bounded by max_iterations).
+    - warmup: int - Untimed calls made first.
+    Returns:
+    - dict: Iterations, latency statistics in seconds, throughput and peak heap bytes.
+    """
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        while len(timings) < max_iterations and (len(timings) < min_iterations or
+                                                 time.perf_counter() - started < min_time):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings = np.asarray(timings)
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {
+        'iterations': len(timings),
+        'mean': float(timings.mean()),
+        'stdev': float(timings.std()),
+        'min': float(timings.min()),
+        'p50': float(p50),
+        'p95': float(p95),
+        'p99': float(p99),
+        'max': float(timings.max()),
+        'calls_per_second': float(len(timings) / timings.sum()),
+        'items_per_second': float(items * len(timings) / timings.sum()),
+        'peak_memory_bytes': int(peak),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results, baseline_path, threshold):
+    """
+    Print the p50 change of every case against a baseline result file.
+    Args:
+    - results: dict - Results of this run.
+    - baseline_path: str - Earlier result file.
+    - threshold: float - Relative p50 slowdown counted as a regression (0.2 = 20%).
+    Returns:
+    - list: Names of regressed cases.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline['meta'].get('commit', '?')} ({baseline_path}):")
+    regressions = []
+    for name, current in results['cases'].items():
+        previous = baseline['cases'].get(name)
+        if previous is None:
+            print(f"  {name:<28} (new)")
+            continue
+        change = current['p50'] / previous['p50'] - 1 if previous['p50'] else 0.0
+        memory_change = (current['peak_memory_bytes'] / previous['peak_memory_bytes'] - 1
+                         if previous['peak_memory_bytes'] else 0.0)
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"  {name:<28} p50 {change:+7.1%}  peak memory {memory_change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', dest='select', help="Only run cases whose name contains this string")
+    parser.add_argument('--accounts', type=int, default=2000, help="Token accounts per contract")
+    parser.add_argument('--bars', type=int, default=20000, help="Prices per series")
+    parser.add_argument('--batch', type=int, default=20, help="Contracts per batched fetch")
+    parser.add_argument('--latency', type=float, default=0.01, help="Fake RPC latency per request in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra random fake RPC latency in seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-iterations', type=int, default=5)
+    parser.add_argument('--max-iterations', type=int, default=1000)
+    parser.add_argument('--min-time', type=float, default=1.0, help="Seconds spent timing each case")
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--output', help="Result file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument('--compare', help="Baseline result file to compare with")
+    parser.add_argument('--threshold', type=float, default=0.2, help="p50 slowdown reported as a regression")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if not args.select or args.select in name]
+    if not names:
+        parser.error(f"No case matches {args.select!r}; cases: {', '.join(CASES)}")
+
+    commit = git_commit()
+    results = {'meta': {
+        'commit': commit,
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+    }, 'cases': {}}
+
+    with tempfile.TemporaryDirectory() as workdir, \
+            FakeSolanaRpc(args.accounts, args.latency, args.jitter, seed=args.seed) as rpc:
+        configure_environment(rpc.url, workdir)
+        ctx = SuiteContext(args, rpc)
+        for name in names:
+            func, items, unit = CASES[name](ctx)
+            result = run_case(func, items, args.min_iterations, args.max_iterations, args.min_time, args.warmup)
+            result['unit'] = unit
+            results['cases'][name] = result
+            print(f"{name:<28} p50={result['p50'] * 1e3:9.3f}ms  p95={result['p95'] * 1e3:9.3f}ms  "
+                  f"p99={result['p99'] * 1e3:9.3f}ms  {result['items_per_second']:12.0f} {unit}/s  "
+                  f"peak={result['peak_memory_bytes'] / 2 ** 20:7.2f}MB  n={result['iterations']}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
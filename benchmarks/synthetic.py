@@ -0,0 +1,199 @@
+import math
+import random
+import numpy as np
+
+# Base58 alphabet used for Solana addresses
+BASE58 = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+
+def random_address(rng):
+    """
+    Generate a random base58 address.
+    Args:
+    - rng: random.Random - Source of randomness.
+    Returns:
+    - str: A 44-character address.
+    """
+    return ''.join(rng.choice(BASE58) for _ in range(44))
+
+
+def make_token_accounts(num_accounts, mint=None, decimals=6, seed=0):
+    """
+    Generate a getTokenAccountsByOwner-style jsonParsed account list.
+    Args:
+    - num_accounts: int - Number of token accounts.
+    - mint: str - Mint address shared by every account (random when omitted).
+    - decimals: int - Token decimals.
+    - seed: int - Seed for reproducible output.
+    Returns:
+    - list: Token account entries as returned in result['value'].
+    """
+    rng = random.Random(seed)
+    mint = mint or random_address(rng)
+    accounts = []
+    for _ in range(num_accounts):
+        # Heavy-tailed balances, like real holder distributions
+        raw_amount = int(rng.paretovariate(1.2) * 10 ** decimals)
+        ui_amount = raw_amount / 10 ** decimals
+        accounts.append({
+            'pubkey': random_address(rng),
+            'account': {
+                'data': {
+                    'parsed': {
+                        'info': {
+                            'isNative': False,
+                            'mint': mint,
+                            'owner': random_address(rng),
+                            'state': 'initialized',
+                            'tokenAmount': {
+                                'amount': str(raw_amount),
+                                'decimals': decimals,
+                                'uiAmount': ui_amount,
+                                'uiAmountString': repr(ui_amount),
+                            },
+                        },
+                        'type': 'account',
+                    },
+                    'program': 'spl-token',
+                    'space': 165,
+                },
+                'executable': False,
+                'lamports': 2039280,
+                'owner': 'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA',
+                'rentEpoch': 361,
+            },
+        })
+    return accounts
+
+
+def make_price_series(num_bars, seed=0, volatility=0.01, start=1.0):
+    """
+    Generate a geometric random-walk price series.
+    Args:
+    - num_bars: int - Number of prices.
+    - seed: int - Seed for reproducible output.
+    - volatility: float - Standard deviation of the per-bar log return.
+    - start: float - First price.
+    Returns:
+    - np.ndarray: float64 prices.
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0, volatility, size=num_bars)
+    returns[0] = 0.0
+    return start * np.exp(np.cumsum(returns))
+
+
+def make_price_histories(num_contracts, num_bars, seed=0, volatility=0.01):
+    """
+    Generate one random-walk price series per synthetic contract.
+    Args:
+    - num_contracts: int - Number of series.
+    - num_bars: int - Prices per series.
+    - seed: int - Seed for reproducible output.
+    - volatility: float - Standard deviation of the per-bar log return.
+    Returns:
+    - dict: Maps a synthetic contract name to its float64 prices.
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0, volatility, size=(num_contracts, num_bars))
+    prices = np.exp(np.cumsum(returns, axis=1))
+    return {f"contract{i:04d}": prices[i] for i in range(num_contracts)}
+
+
+# Seconds between consecutive synthetic transactions of one mint
+TRANSACTION_INTERVAL = 30
+TRANSACTION_START_TIME = 1700000000
+
+
+def _transaction_failed(mint, index, seed, failure_rate):
+    return random.Random(f"{seed}:{mint}:{index}:err").random() < failure_rate
+
+
+def make_signature_info(mint, index, signature, seed=0, start_time=TRANSACTION_START_TIME, failure_rate=0.02):
+    """
+    Generate the getSignaturesForAddress entry of a transaction made by make_transaction.
+    Args:
+    - mint: str - Token mint address.
+    - index: int - Position in the mint's history (0 is the oldest).
+    - signature: str - Transaction signature.
+    - seed: int - Seed used for make_transaction.
+    - start_time: int - blockTime of the oldest transaction.
+    - failure_rate: float - Share of failed transactions.
+    Returns:
+    - dict: Signature entry.
+    """
+    failed = _transaction_failed(mint, index, seed, failure_rate)
+    return {'signature': signature, 'slot': 200000000 + 2 * index,
+            'err': {'InstructionError': [0, {'Custom': 6001}]} if failed else None, 'memo': None,
+            'blockTime': start_time + TRANSACTION_INTERVAL * index, 'confirmationStatus': 'finalized'}
+
+
+def make_transaction(mint, index, seed=0, decimals=6, start_time=TRANSACTION_START_TIME, failure_rate=0.02):
+    """
+    Generate a getTransaction-style swap of a token against SOL (json encoding).
+    The fee payer buys or sells the token from a pool at a slowly oscillating price, so the transfer amount and
+    price can be recovered from the token and SOL balance changes. Output is deterministic per (mint, index).
+    Args:
+    - mint: str - Token mint address.
+    - index: int - Position in the mint's history (0 is the oldest).
+    - seed: int - Seed for reproducible output.
+    - decimals: int - Token decimals.
+    - start_time: int - blockTime of the oldest transaction.
+    - failure_rate: float - Share of transactions that failed (only the fee is charged).
+    Returns:
+    - dict: Transaction as returned in result.
+    """
+    rng = random.Random(f"{seed}:{mint}:{index}")
+    payer, payer_ata, pool, pool_ata = (random_address(rng) for _ in range(4))
+    price = 1.0 + 0.2 * math.sin(index / 40) + 0.05 * math.sin(index / 7)
+    amount = round(rng.paretovariate(1.5), decimals)
+    if rng.random() < 0.5:
+        amount = -amount
+    failed = _transaction_failed(mint, index, seed, failure_rate)
+    fee = 5000
+    payer_sol, pool_sol = rng.randrange(10 ** 9, 10 ** 12), rng.randrange(10 ** 12, 10 ** 14)
+    payer_tokens, pool_tokens = round(rng.uniform(1e3, 1e6), decimals), round(rng.uniform(1e6, 1e9), decimals)
+    if failed:
+        token_delta, sol_delta = 0.0, 0
+    else:
+        token_delta, sol_delta = amount, -int(round(amount * price * 1e9))
+
+    def token_balance(account_index, owner, ui_amount):
+        raw = int(round(ui_amount * 10 ** decimals))
+        return {'accountIndex': account_index, 'mint': mint, 'owner': owner,
+                'programId': 'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA',
+                'uiTokenAmount': {'amount': str(raw), 'decimals': decimals, 'uiAmount': raw / 10 ** decimals,
+                                  'uiAmountString': str(raw / 10 ** decimals)}}
+
+    return {
+        'slot': 200000000 + 2 * index,
+        'blockTime': start_time + TRANSACTION_INTERVAL * index,
+        'version': 0,
+        'meta': {
+            'err': {'InstructionError': [0, {'Custom': 6001}]} if failed else None,
+            'status': {'Err': {'InstructionError': [0, {'Custom': 6001}]}} if failed else {'Ok': None},
+            'fee': fee,
+            'preBalances': [payer_sol, 2039280, pool_sol, 2039280, 1],
+            'postBalances': [payer_sol + sol_delta - fee, 2039280, pool_sol - sol_delta, 2039280, 1],
+            'preTokenBalances': [token_balance(1, payer, payer_tokens), token_balance(3, pool, pool_tokens)],
+            'postTokenBalances': [token_balance(1, payer, payer_tokens + token_delta),
+                                  token_balance(3, pool, pool_tokens - token_delta)],
+            'innerInstructions': [],
+            'logMessages': [f"Program {random_address(rng)} invoke [1]", "Program log: Instruction: Swap",
+                            f"Program {random_address(rng)} consumed {rng.randrange(10000, 90000)} compute units",
+                            "Program log: Error: slippage" if failed else "Program log: swap ok"],
+            'loadedAddresses': {'writable': [], 'readonly': []},
+            'computeUnitsConsumed': rng.randrange(10000, 90000),
+        },
+        'transaction': {
+            'signatures': [random_address(rng) + random_address(rng)],
+            'message': {
+                'accountKeys': [payer, payer_ata, pool, pool_ata, 'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA'],
+                'header': {'numRequiredSignatures': 1, 'numReadonlySignedAccounts': 0,
+                           'numReadonlyUnsignedAccounts': 1},
+                'instructions': [{'programIdIndex': 4, 'accounts': [1, 3, 0], 'data': random_address(rng)[:16],
+                                  'stackHeight': None}],
+                'recentBlockhash': random_address(rng),
+            },
+        },
+    }
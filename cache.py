@@ -0,0 +1,238 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from settings import get_settings
+from utils import load_cache_entry, save_cache_data
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Sentinel distinguishing "not cached" from a cached None
+MISSING = object()
+
+
+class _Flight:
+    """A load in progress that concurrent callers for the same key wait on."""
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class JsonDiskTier:
+    """
+    Disk tier storing one {address}.json file per contract in CACHE_DIR.
+    """
+
+    def load_entry(self, key):
+        return load_cache_entry(key)
+
+    def save_entry(self, key, data, timestamp=None):
+        save_cache_data(key, data, timestamp)
+
+
+def make_disk_tier(backend=None):
+    """
+    Build the disk tier selected by CACHE_BACKEND.
+    Args:
+    - backend: str - "json" or "segment" (CACHE_BACKEND by default).
+    Returns:
+    - object: A disk tier exposing load_entry(key) and save_entry(key, data, timestamp).
+    """
+    backend = backend or get_settings().cache_backend
+    if backend == 'segment':
+        # Only pull in NumPy/mmap machinery when the segment backend is selected
+        from segment_cache import SegmentStore
+        return SegmentStore()
+    if backend != 'json':
+        logger.warning(f"Unknown CACHE_BACKEND {backend!r}; falling back to JSON files.")
+    return JsonDiskTier()
+
+
+class TwoTierCache:
+    """
+    Contract cache with a bounded in-memory LRU/TTL tier in front of an on-disk tier in CACHE_DIR.
+    Concurrent misses for the same key are coalesced into a single load. Options left as None take their CACHE_* setting.
+    Args:
+    - max_entries: int - Maximum entries kept in memory before the least recently used is evicted.
+    - ttl: float - Seconds an entry stays fresh (both tiers).
+    - enabled: bool - When False nothing is stored, but concurrent loads are still coalesced.
+    - use_disk: bool - Whether to read through and write behind to the disk tier.
+    - disk_tier: object - Disk tier to use (defaults to the one selected by CACHE_BACKEND).
+    """
+
+    def __init__(self, max_entries=None, ttl=None, enabled=None, use_disk=True, disk_tier=None):
+        settings = get_settings()
+        self.max_entries = max(1, settings.cache_max_entries if max_entries is None else max_entries)
+        self.ttl = settings.cache_timeout if ttl is None else ttl
+        self.enabled = settings.cache_enabled if enabled is None else enabled
+        self.disk_tier = (disk_tier or make_disk_tier()) if self.enabled and use_disk else None
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0,
+                       'expirations': 0, 'loads': 0, 'coalesced': 0}
+
+    def _get_memory(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        timestamp, data = entry
+        if now - timestamp >= self.ttl:
+            del self._entries[key]
+            self._stats['expirations'] += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        return data
+
+    def _put_memory(self, key, data, timestamp):
+        self._entries[key] = (timestamp, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def get(self, key):
+        """
+        Look a key up in memory, then on disk.
+        Args:
+        - key: str - Contract address.
+        Returns:
+        - object: The cached data, or MISSING.
+        """
+        if not self.enabled:
+            return MISSING
+        with self._lock:
+            data = self._get_memory(key, time.time())
+            if data is not MISSING:
+                self._stats['hits'] += 1
+                return data
+
+        if self.disk_tier is not None:
+            entry = self.disk_tier.load_entry(key)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                timestamp, data = entry
+                with self._lock:
+                    self._put_memory(key, data, timestamp)
+                    self._stats['disk_hits'] += 1
+                return data
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return MISSING
+
+    def get_balances(self, key):
+        """
+        Look a key up for analysis. A disk tier that stores balances packed (the segment backend) answers with a
+        zero-copy balance view instead of decoding the whole account list.
+        Args:
+        - key: str - Contract address.
+        Returns:
+        - object: Cached data from memory, a read-only float64 balance array from disk, or MISSING.
+        """
+        load_balances = getattr(self.disk_tier, 'load_balances', None)
+        if load_balances is None:
+            return self.get(key)
+        if not self.enabled:
+            return MISSING
+        with self._lock:
+            data = self._get_memory(key, time.time())
+            if data is not MISSING:
+                self._stats['hits'] += 1
+                return data
+
+        # The view is not kept in the memory tier, which holds the full data for get()
+        entry = load_balances(key)
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            with self._lock:
+                self._stats['disk_hits'] += 1
+            return entry[1]
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return MISSING
+
+    def set(self, key, data):
+        """
+        Store data in memory and, for non-empty data, on disk.
+        Args:
+        - key: str - Contract address.
+        - data: object - JSON-serialisable contract data.
+        """
+        if not self.enabled:
+            return
+        timestamp = time.time()
+        with self._lock:
+            self._put_memory(key, data, timestamp)
+        if self.disk_tier is not None and data is not None:
+            try:
+                self.disk_tier.save_entry(key, data, timestamp)
+            except (OSError, TypeError, ValueError) as e:
+                logger.error(f"Failed to write disk cache for {key}: {e}")
+
+    def invalidate(self, key):
+        """Drop a key from the memory tier."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_or_load(self, key, loader, balances=False):
+        """
+        Return cached data, or load it once no matter how many threads miss concurrently.
+        Args:
+        - key: str - Contract address.
+        - loader: callable - Called as loader(key) on a miss; exceptions propagate and nothing is cached.
+        - balances: bool - Look the key up with get_balances, so a disk hit may return only the balances.
+        Returns:
+        - object: The cached or freshly loaded data.
+        """
+        data = self.get_balances(key) if balances else self.get(key)
+        if data is not MISSING:
+            return data
+
+        with self._lock:
+            # Another thread may have finished loading between the miss and here
+            data = self._get_memory(key, time.time()) if self.enabled else MISSING
+            if data is not MISSING:
+                return data
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader(key)
+            with self._lock:
+                self._stats['loads'] += 1
+            self.set(key, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.event.set()
+
+    def stats(self):
+        """
+        Snapshot of cache counters.
+        Returns:
+        - dict: Hit/miss/eviction counters plus the current memory tier size.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,29 @@
+import logging
+from settings import get_settings
+
+# Settings are loaded lazily: nothing is read from the environment until the first setting is used.
+# Values live on the typed settings.Settings object; names like config.SOLANA_API_URL are resolved from it.
+logger = logging.getLogger(__name__)
+
+
+def __getattr__(name):
+    """Resolve SETTING_NAME attributes from the cached settings object on first access."""
+    # The import system probes attributes like __path__; only setting names may load the settings
+    if name == "ADDITIONAL_CONFIG":
+        return get_settings().additional_config
+    if name.isupper() and hasattr(get_settings(), name.lower()):
+        return getattr(get_settings(), name.lower())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def validate_config():
+    """Function to validate if essential configurations are loaded."""
+    get_settings().validate()
+
+
+def send_telegram_alert(message, contract_address=None):
+    """Queue an alert message for the configured Telegram chat."""
+    # Imported here because the dispatcher itself reads its settings from config
+    from alert_dispatcher import get_alert_dispatcher
+
+    return get_alert_dispatcher().submit(message, contract_address)
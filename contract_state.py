@@ -0,0 +1,330 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Initial capacity of a growable column
+INITIAL_CAPACITY = 64
+# Contract states kept by the shared registry before the least recently used is dropped
+MAX_STATES = 1024
+
+
+def _token_infos(accounts):
+    return [entry['account']['data']['parsed']['info'] for entry in accounts if 'account' in entry]
+
+
+def _ui_amounts(infos):
+    # None (uiAmount of some zero-decimal tokens) converts to NaN
+    return np.array([info['tokenAmount']['uiAmount'] for info in infos], dtype=np.float64)
+
+
+def _account_ui_amounts(accounts):
+    return np.array([entry['account']['data']['parsed']['info']['tokenAmount']['uiAmount']
+                     for entry in accounts if 'account' in entry], dtype=np.float64)
+
+
+class GrowableColumn:
+    """
+    Append-friendly NumPy column: a backing array that doubles when full, exposed as a view of the filled part.
+    Args:
+    - dtype: numpy dtype - Element type.
+    - capacity: int - Initial backing array size.
+    """
+    __slots__ = ('dtype', '_data', '_size')
+
+    def __init__(self, dtype, capacity=INITIAL_CAPACITY):
+        self.dtype = np.dtype(dtype)
+        self._data = np.empty(max(1, capacity), dtype=self.dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, size):
+        if size > len(self._data):
+            capacity = len(self._data)
+            while capacity < size:
+                capacity *= 2
+            grown = np.empty(capacity, dtype=self.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+    def append(self, value):
+        """
+        Append one value (amortized O(1)).
+        Args:
+        - value: scalar - Value to append.
+        """
+        self._reserve(self._size + 1)
+        self._data[self._size] = value
+        self._size += 1
+
+    def extend(self, values):
+        """
+        Append many values with one copy.
+        Args:
+        - values: array-like - Values to append.
+        """
+        values = np.asarray(values, dtype=self.dtype)
+        self._reserve(self._size + len(values))
+        self._data[self._size:self._size + len(values)] = values
+        self._size += len(values)
+
+    def clear(self):
+        """Drop every value, keeping the backing array."""
+        self._size = 0
+
+    def truncate(self, size):
+        """
+        Drop the values from position size on, keeping the backing array.
+        Args:
+        - size: int - Values to keep.
+        """
+        self._size = min(self._size, max(0, size))
+
+    def view(self):
+        """
+        The filled part of the column, without copying.
+        The view is read-only and only valid until the next append that grows the backing array.
+        Returns:
+        - np.ndarray: Column values.
+        """
+        view = self._data[:self._size]
+        view.flags.writeable = False
+        return view
+
+
+class ContractState:
+    """
+    Columnar per-contract data shared by fetching, analysis, strategy and alerting.
+    A fetch is parsed once into flat arrays (balance per token account and dictionary-encoded owners); price
+    history is kept in growable timestamp/price/volume columns. Stages read the arrays directly instead of
+    re-walking the nested JSON, and parsing is skipped when the same fetched object is loaded again (e.g. a
+    cache hit).
+    Args:
+    - address: str - Contract address.
+    """
+    __slots__ = ('address', 'balances', 'owner_codes', 'owner_table', '_owner_index', 'fetched_at', 'version',
+                 '_source', 'timestamps', 'prices', 'volumes', 'last_analysis')
+
+    def __init__(self, address):
+        self.address = address
+        self.balances = np.empty(0, dtype=np.float64)
+        self.owner_codes = np.empty(0, dtype=np.int32)
+        self.owner_table = []
+        self._owner_index = {}
+        self.fetched_at = None
+        self.version = 0
+        self._source = None
+        self.timestamps = GrowableColumn(np.int64)
+        self.prices = GrowableColumn(np.float64)
+        self.volumes = GrowableColumn(np.float64)
+        self.last_analysis = None
+
+    def __len__(self):
+        return len(self.balances)
+
+    def _owner_code(self, owner):
+        code = self._owner_index.get(owner)
+        if code is None:
+            code = self._owner_index[owner] = len(self.owner_table)
+            self.owner_table.append(owner)
+        return code
+
+    def load_accounts(self, accounts):
+        """
+        Replace the holder columns from a getTokenAccountsByOwner account list in a single pass.
+        Args:
+        - accounts: list - jsonParsed token account entries.
+        Returns:
+        - bool: True if the accounts were parsed, False if this exact list was already loaded.
+        """
+        if accounts is self._source:
+            return False
+        infos = _token_infos(accounts)
+        if len(self.owner_table) > 2 * max(len(infos), INITIAL_CAPACITY):
+            # Owners who left are never reused; start a fresh dictionary once they dominate it
+            self.owner_table = []
+            self._owner_index = {}
+        index = self._owner_index
+        self.balances = _ui_amounts(infos)
+        self.owner_codes = np.fromiter((index[owner] if owner in index else self._owner_code(owner)
+                                        for owner in (info.get('owner') for info in infos)),
+                                       dtype=np.int32, count=len(infos))
+        self._loaded(accounts)
+        return True
+
+    def load_balances(self, balances):
+        """
+        Replace the holder columns from an already extracted balance array (e.g. a streamed fetch).
+        Owners are unknown in that case and the owner column is left empty.
+        Args:
+        - balances: array-like - Balance per token account.
+        Returns:
+        - bool: True if the balances were loaded, False if this exact array was already loaded.
+        """
+        if balances is self._source:
+            return False
+        self.balances = np.asarray(balances, dtype=np.float64)
+        self.owner_codes = np.empty(0, dtype=np.int32)
+        self._loaded(balances)
+        return True
+
+    def load(self, contract_data):
+        """
+        Load fetched contract data of either shape.
+        Args:
+        - contract_data: list or array-like - Account list from the RPC, or extracted balances.
+        Returns:
+        - bool: True if anything was parsed.
+        """
+        if isinstance(contract_data, list):
+            return self.load_accounts(contract_data)
+        return self.load_balances(contract_data)
+
+    def _loaded(self, source):
+        self._source = source
+        self.fetched_at = time.time()
+        self.version += 1
+        self.last_analysis = None
+
+    def owners(self):
+        """
+        Decode the owner column.
+        Returns:
+        - list: Owner address per token account (empty when only balances were loaded).
+        """
+        table = self.owner_table
+        return [table[code] for code in self.owner_codes.tolist()]
+
+    def append_prices(self, timestamps, prices, volumes=None):
+        """
+        Add price bars to the history columns. Bars at or before the last stored one replace the stored bars with
+        the same timestamp (e.g. the last bar rebuilt after more of its transfers arrived) or are inserted in order.
+        Args:
+        - timestamps: array-like - Epoch seconds, ascending.
+        - prices: array-like - Price per bar.
+        - volumes: array-like - Volume per bar (NaN when omitted).
+        Returns:
+        - int: Number of bars written (appended or replaced).
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.full(len(prices), np.nan) if volumes is None else np.asarray(volumes, dtype=np.float64)
+        stored = self.timestamps.view()
+        if len(stored) and len(timestamps) and timestamps[0] <= stored[-1]:
+            # Rewrite the tail from the first bar touched, keeping the stored bars the update does not replace
+            start = int(np.searchsorted(stored, timestamps[0], side='left'))
+            kept = ~np.isin(stored[start:], timestamps)
+            tail_timestamps = np.concatenate([stored[start:][kept], timestamps])
+            order = np.argsort(tail_timestamps, kind='stable')
+            tail_prices = np.concatenate([self.prices.view()[start:][kept], prices])[order]
+            tail_volumes = np.concatenate([self.volumes.view()[start:][kept], volumes])[order]
+            for column in (self.timestamps, self.prices, self.volumes):
+                column.truncate(start)
+            timestamps, prices, volumes = tail_timestamps[order], tail_prices, tail_volumes
+            written = len(order) - int(kept.sum())
+        else:
+            written = len(timestamps)
+        self.timestamps.extend(timestamps)
+        self.prices.extend(prices)
+        self.volumes.extend(volumes)
+        return written
+
+    def append_price(self, timestamp, price, volume=np.nan):
+        """
+        Append one price tick.
+        Args:
+        - timestamp: int - Epoch seconds.
+        - price: float - Price.
+        - volume: float - Volume.
+        """
+        self.timestamps.append(timestamp)
+        self.prices.append(price)
+        self.volumes.append(volume)
+
+    def price_history(self):
+        """
+        Views of the price history columns.
+        Returns:
+        - dict: 'timestamp', 'price' and 'volume' arrays.
+        """
+        return {'timestamp': self.timestamps.view(), 'price': self.prices.view(), 'volume': self.volumes.view()}
+
+
+def as_balances(contract_data):
+    """
+    Balance column of contract data in any of the shapes the fetch paths produce, without copying arrays.
+    Args:
+    - contract_data: ContractState, list or array-like - A loaded state, a jsonParsed account list, or balances.
+    Returns:
+    - np.ndarray: float64 balance per token account.
+    """
+    if isinstance(contract_data, ContractState):
+        return contract_data.balances
+    if isinstance(contract_data, list):
+        return _account_ui_amounts(contract_data)
+    return np.asarray(contract_data, dtype=np.float64)
+
+
+class ContractStateRegistry:
+    """
+    Thread-safe LRU map from contract address to its ContractState.
+    Args:
+    - max_states: int - States kept before the least recently used is dropped.
+    """
+
+    def __init__(self, max_states=MAX_STATES):
+        self.max_states = max(1, max_states)
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._states)
+
+    def get(self, address):
+        """
+        Return the state of a contract, creating an empty one on first use.
+        Args:
+        - address: str - Contract address.
+        Returns:
+        - ContractState: The contract's state.
+        """
+        with self._lock:
+            state = self._states.get(address)
+            if state is None:
+                state = self._states[address] = ContractState(address)
+                while len(self._states) > self.max_states:
+                    self._states.popitem(last=False)
+            else:
+                self._states.move_to_end(address)
+            return state
+
+    def discard(self, address):
+        """Forget a contract's state."""
+        with self._lock:
+            self._states.pop(address, None)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_contract_state(address):
+    """
+    Return the shared state of a contract.
+    Args:
+    - address: str - Contract address.
+    Returns:
+    - ContractState: The contract's state.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ContractStateRegistry()
+    return _registry.get(address)
@@ -1,37 +1,129 @@
-import requests
-import pandas as pd
 from datetime import datetime
-from config import SOLANA_API_URL
+from settings import get_settings
+from transport import get_transport
+from historical_store import get_history_store
+from contract_state import get_contract_state
+from strategy import moving_average
 import logging
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-def fetch_historical_data(contract_address, start_date, end_date):
+def _request_historical_data(contract_address, start_date, end_date):
     """
-    Fetch historical token data for a given contract address and date range.
-    Args:
-    - contract_address: str - The contract address to fetch historical data for.
-    - start_date: str - The start date in YYYY-MM-DD format.
-    - end_date: str - The end date in YYYY-MM-DD format.
+    Request historical bars from the API.
     Returns:
-    - pd.DataFrame: DataFrame containing historical data.
+    - pd.DataFrame: The bars, or None if the request failed.
     """
-    url = f"{SOLANA_API_URL}/historical_data"
+    url = f"{get_settings().solana_api_url}/historical_data"
     params = {
         'contract_address': contract_address,
         'start_date': start_date,
         'end_date': end_date
     }
-    response = requests.get(url, params=params)
+    response = get_transport().get(url, params=params, endpoint='historical_data')
     
     if response.status_code == 200:
         data = response.json()
         logger.info(f"Historical data fetched for {contract_address} from {start_date} to {end_date}.")
+        # Imported here so importing historical_data does not pay for pandas until a response is converted
+        import pandas as pd
+
         return pd.DataFrame(data)
     else:
         logger.error(f"Failed to fetch historical data for {contract_address}: {response.text}")
-        return pd.DataFrame()
+        return None
+
+def fetch_remote_historical_data(contract_address, start_date, end_date):
+    """
+    Fetch historical token data for a given contract address and date range from the API.
+    Args:
+    - contract_address: str - The contract address to fetch historical data for.
+    - start_date: str - The start date in YYYY-MM-DD format.
+    - end_date: str - The end date in YYYY-MM-DD format.
+    Returns:
+    - pd.DataFrame: DataFrame containing historical data.
+    """
+    df = _request_historical_data(contract_address, start_date, end_date)
+    if df is None:
+        # Imported here so importing historical_data does not pay for pandas
+        import pandas as pd
+
+        df = pd.DataFrame()
+    return df
+
+def fetch_historical_data(contract_address, start_date, end_date, use_store=None):
+    """
+    Fetch historical token data for a given contract address and date range.
+    With the local store enabled, only date ranges not already on disk are fetched and the result is read from disk.
+    Args:
+    - contract_address: str - The contract address to fetch historical data for.
+    - start_date: str - The start date in YYYY-MM-DD format.
+    - end_date: str - The end date in YYYY-MM-DD format.
+    - use_store: bool - Whether to go through the local historical store (HISTORY_STORE_ENABLED by default).
+    Returns:
+    - pd.DataFrame: DataFrame containing historical data.
+    """
+    use_store = get_settings().history_store_enabled if use_store is None else use_store
+    if not use_store:
+        return fetch_remote_historical_data(contract_address, start_date, end_date)
+
+    unstorable = _sync_store(contract_address, start_date, end_date)
+    if unstorable is not None:
+        return unstorable
+    return get_history_store().query_frame(contract_address, start_date, end_date)
+
+def _sync_store(contract_address, start_date, end_date):
+    """
+    Fetch the date ranges missing from the local store and merge them in.
+    Returns:
+    - pd.DataFrame: Fetched bars that could not be stored, or None once the store covers what was fetched.
+    """
+    store = get_history_store()
+    for missing_start, missing_end in store.missing_ranges(contract_address, start_date, end_date):
+        df = _request_historical_data(contract_address, missing_start, missing_end)
+        if df is None:
+            # Leave the range unmarked so the next call retries it
+            continue
+        try:
+            store.merge(contract_address, df, missing_start, missing_end)
+        except ValueError as e:
+            logger.error(f"Cannot store historical data for {contract_address}: {e}")
+            return df
+    return None
+
+def load_price_array(contract_address, start_date, end_date):
+    """
+    Load historical prices as a float64 array, fetching only ranges missing from the local store.
+    Args:
+    - contract_address: str - The contract address.
+    - start_date: str - The start date in YYYY-MM-DD format.
+    - end_date: str - The end date in YYYY-MM-DD format.
+    Returns:
+    - np.ndarray: Prices in time order (a read-only view of the stored column).
+    """
+    _sync_store(contract_address, start_date, end_date)
+    return get_history_store().query(contract_address, start_date, end_date, columns=['price'])['price']
+
+def load_price_history(contract_address, start_date, end_date, state=None):
+    """
+    Append stored price bars to a contract's state, fetching only ranges missing from the local store.
+    Bars already in the state are replaced by their stored values, so calling this again with a later end date
+    only adds the new bars.
+    Args:
+    - contract_address: str - The contract address.
+    - start_date: str - The start date in YYYY-MM-DD format.
+    - end_date: str - The end date in YYYY-MM-DD format.
+    - state: ContractState - State to fill (the shared state of the contract by default).
+    Returns:
+    - ContractState: The state, with its price history columns extended.
+    """
+    state = state or get_contract_state(contract_address)
+    _sync_store(contract_address, start_date, end_date)
+    bars = get_history_store().query(contract_address, start_date, end_date)
+    if 'price' in bars:
+        state.append_prices(bars['timestamp'], bars['price'], bars.get('volume'))
+    return state
 
 def analyze_historical_data(contract_address, start_date, end_date):
     """
@@ -43,13 +135,19 @@ def analyze_historical_data(contract_address, start_date, end_date):
     Returns:
     - dict: Analysis results.
     """
-    df = fetch_historical_data(contract_address, start_date, end_date)
+    if get_settings().history_store_enabled:
+        # Read the stored price column directly instead of going through a DataFrame
+        prices = load_price_array(contract_address, start_date, end_date)
+    else:
+        df = fetch_historical_data(contract_address, start_date, end_date)
+        if df.empty:
+            return {}
+        prices = df['price'].to_numpy(dtype='float64')
     
-    if df.empty:
+    if not len(prices):
         return {}
     
     # Simple example: Calculate moving averages for historical data
-    prices = df['price'].tolist()
     sma = moving_average(prices, window=14)
     
     analysis = {
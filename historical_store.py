@@ -0,0 +1,239 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone
+import logging
+import numpy as np
+from settings import get_settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Column names accepted as the bar time in fetched data, in order of preference
+TIME_COLUMNS = ('timestamp', 'time', 'date', 'datetime')
+META_FILE = 'meta.json'
+SECONDS_PER_DAY = 86400
+
+
+def _day(value):
+    """Convert a YYYY-MM-DD string or date to a date."""
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _day_start(day):
+    """Epoch seconds at 00:00 UTC of a date."""
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+
+
+def _merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def normalize_bars(frame):
+    """
+    Turn fetched historical data into epoch-second timestamps plus float64 numeric columns.
+    Args:
+    - frame: pd.DataFrame - Fetched bars with a time column and numeric columns such as price/volume.
+    Returns:
+    - tuple: (timestamps int64 array, dict of column name -> float64 array).
+    """
+    # Imported here so importing the store does not pay for pandas until fetched frames are converted
+    import pandas as pd
+
+    time_column = next((column for column in TIME_COLUMNS if column in frame.columns), None)
+    if time_column is None:
+        raise ValueError(f"Historical data has no time column (expected one of {TIME_COLUMNS}).")
+    times = frame[time_column]
+    if pd.api.types.is_numeric_dtype(times):
+        timestamps = times.to_numpy(dtype=np.int64)
+        # Millisecond epochs are common in market data APIs
+        if len(timestamps) and timestamps.max() > 10 ** 11:
+            timestamps = timestamps // 1000
+    else:
+        parsed = pd.to_datetime(times, utc=True)
+        timestamps = ((parsed - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+    columns = {
+        column: frame[column].to_numpy(dtype=np.float64)
+        for column in frame.select_dtypes('number').columns if column != time_column
+    }
+    return timestamps, columns
+
+
+class HistoricalStore:
+    """
+    Local columnar store of historical bars, one directory per contract holding a .npy file per column.
+    Tracks which days have been fetched so only missing date ranges go to the network.
+    Args:
+    - root: str - Base directory for the store (HISTORY_DIR by default).
+    """
+
+    def __init__(self, root=None):
+        self.root = root or get_settings().history_dir
+        self._lock = threading.Lock()
+
+    def _contract_dir(self, contract_address):
+        return os.path.join(self.root, contract_address)
+
+    def _load_meta(self, contract_address):
+        path = os.path.join(self._contract_dir(contract_address), META_FILE)
+        if not os.path.exists(path):
+            return {'columns': [], 'coverage': []}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _write_atomic(self, path, write):
+        directory = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _load_columns(self, contract_address, columns):
+        directory = self._contract_dir(contract_address)
+        arrays = {}
+        for column in ['timestamp'] + list(columns):
+            path = os.path.join(directory, f"{column}.npy")
+            arrays[column] = np.load(path, mmap_mode='r') if os.path.exists(path) else None
+        return arrays
+
+    def missing_ranges(self, contract_address, start_date, end_date):
+        """
+        Date ranges within [start_date, end_date] that have not been fetched yet.
+        Args:
+        - contract_address: str - Contract address.
+        - start_date: str - Start date in YYYY-MM-DD format.
+        - end_date: str - End date in YYYY-MM-DD format (inclusive).
+        Returns:
+        - list: (start_date, end_date) string pairs to fetch.
+        """
+        start, end = _day(start_date).toordinal(), _day(end_date).toordinal()
+        gaps = []
+        cursor = start
+        for covered_start, covered_end in self._load_meta(contract_address)['coverage']:
+            if covered_end < cursor:
+                continue
+            if covered_start > end:
+                break
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start - 1))
+            cursor = covered_end + 1
+        if cursor <= end:
+            gaps.append((cursor, end))
+        return [(date.fromordinal(a).isoformat(), date.fromordinal(b).isoformat()) for a, b in gaps]
+
+    def merge(self, contract_address, frame, start_date, end_date, mark_covered=True):
+        """
+        Merge freshly fetched bars for [start_date, end_date] into the store.
+        Today (UTC) and later days are never marked as fetched, since their bars are still incomplete.
+        Args:
+        - contract_address: str - Contract address.
+        - frame: pd.DataFrame - Fetched bars (may be empty if the range has no data).
+        - start_date: str - Start of the fetched range.
+        - end_date: str - End of the fetched range (inclusive).
+        - mark_covered: bool - Record the range as fully fetched; False for partial data such as ingested transfers.
+        """
+        new_times, new_columns = normalize_bars(frame) if len(frame) else (np.empty(0, dtype=np.int64), {})
+        with self._lock:
+            directory = self._contract_dir(contract_address)
+            os.makedirs(directory, exist_ok=True)
+            meta = self._load_meta(contract_address)
+            columns = list(dict.fromkeys(meta['columns'] + list(new_columns)))
+            existing = self._load_columns(contract_address, columns)
+
+            old_times = existing['timestamp'] if existing['timestamp'] is not None else np.empty(0, dtype=np.int64)
+            times = np.concatenate([old_times, new_times])
+            # Stable sort with new bars last, then keep the last bar for each timestamp
+            order = np.argsort(times, kind='stable')
+            sorted_times = times[order]
+            keep = np.ones(len(sorted_times), dtype=bool)
+            keep[:-1] = sorted_times[1:] != sorted_times[:-1]
+            order = order[keep]
+
+            merged = {'timestamp': times[order]}
+            for column in columns:
+                old = existing.get(column)
+                old = old if old is not None else np.full(len(old_times), np.nan)
+                new = new_columns.get(column, np.full(len(new_times), np.nan))
+                merged[column] = np.concatenate([old, new])[order]
+
+            for column, values in merged.items():
+                self._write_atomic(os.path.join(directory, f"{column}.npy"),
+                                   lambda f, values=values: np.save(f, np.ascontiguousarray(values)))
+
+            last_complete_day = (datetime.now(timezone.utc).date() - timedelta(days=1)).toordinal()
+            covered_end = min(_day(end_date).toordinal(), last_complete_day)
+            coverage = meta['coverage']
+            if mark_covered and _day(start_date).toordinal() <= covered_end:
+                coverage = _merge_intervals(coverage + [[_day(start_date).toordinal(), covered_end]])
+            meta = {'columns': columns, 'coverage': coverage}
+            self._write_atomic(os.path.join(directory, META_FILE),
+                               lambda f: f.write(json.dumps(meta).encode('utf-8')))
+        logger.debug(f"Stored {len(new_times)} bars for {contract_address} ({start_date} to {end_date})")
+
+    def query(self, contract_address, start_date, end_date, columns=None):
+        """
+        Read bars in [start_date, end_date] as read-only memory-mapped array views (no copies).
+        Args:
+        - contract_address: str - Contract address.
+        - start_date: str - Start date in YYYY-MM-DD format.
+        - end_date: str - End date in YYYY-MM-DD format (inclusive).
+        - columns: list - Columns to return (defaults to all stored columns).
+        Returns:
+        - dict: 'timestamp' (int64 epoch seconds) plus float64 arrays per column; empty arrays if nothing is stored.
+        """
+        meta = self._load_meta(contract_address)
+        columns = meta['columns'] if columns is None else columns
+        arrays = self._load_columns(contract_address, columns)
+        times = arrays['timestamp']
+        if times is None:
+            return {'timestamp': np.empty(0, dtype=np.int64), **{c: np.empty(0) for c in columns}}
+        lo = np.searchsorted(times, _day_start(_day(start_date)), side='left')
+        hi = np.searchsorted(times, _day_start(_day(end_date)) + SECONDS_PER_DAY, side='left')
+        return {
+            column: values[lo:hi] if values is not None else np.full(hi - lo, np.nan)
+            for column, values in arrays.items()
+        }
+
+    def query_frame(self, contract_address, start_date, end_date, columns=None):
+        """
+        Same as query, returned as a DataFrame with a datetime 'timestamp' column.
+        Args:
+        - contract_address: str - Contract address.
+        - start_date: str - Start date in YYYY-MM-DD format.
+        - end_date: str - End date in YYYY-MM-DD format (inclusive).
+        - columns: list - Columns to return (defaults to all stored columns).
+        Returns:
+        - pd.DataFrame: Bars in the range.
+        """
+        import pandas as pd
+
+        arrays = self.query(contract_address, start_date, end_date, columns)
+        arrays['timestamp'] = np.asarray(arrays['timestamp']).view('datetime64[s]')
+        return pd.DataFrame(arrays, copy=False)
+
+
+_store = None
+
+
+def get_history_store():
+    """
+    Return the shared historical store rooted at HISTORY_DIR.
+    Returns:
+    - HistoricalStore: The shared store.
+    """
+    global _store
+    if _store is None:
+        _store = HistoricalStore()
+    return _store
@@ -0,0 +1,235 @@
+from bisect import bisect_left, bisect_right, insort
+import logging
+import numpy as np
+from snapshot_diff import NEW_HOLDER, EXITED_HOLDER
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Holder counts reported for the largest N holders
+DEFAULT_TOP_N = (1, 10, 50)
+# Size buckets as a share of the tracked supply: <0.01%, 0.01-0.1%, 0.1-1%, >=1%
+DEFAULT_BUCKET_EDGES = (0.0001, 0.001, 0.01)
+# Target number of balances per block of the incremental sorted list
+BLOCK_SIZE = 1024
+
+
+def _bucket_labels(edges):
+    percents = [f"{edge * 100:g}%" for edge in edges]
+    labels = [f"<{percents[0]}"]
+    labels += [f"{low}-{high}" for low, high in zip(percents, percents[1:])]
+    labels.append(f">={percents[-1]}")
+    return labels
+
+
+def _gini(sorted_balances, total):
+    """Gini coefficient of ascending balances: 2*sum(rank*x)/(n*total) - (n+1)/n."""
+    n = len(sorted_balances)
+    if n == 0 or total <= 0:
+        return 0.0
+    ranks = np.arange(1, n + 1, dtype=np.float64)
+    return float(2.0 * np.dot(ranks, sorted_balances) / (n * total) - (n + 1) / n)
+
+
+def holder_metrics(balances, top_n=DEFAULT_TOP_N, bucket_edges=DEFAULT_BUCKET_EDGES):
+    """
+    Concentration metrics over token-account balances.
+    Top-N uses np.partition (O(n)) and only sorts the top slice; the Gini coefficient needs one full sort.
+    Args:
+    - balances: array-like - Balance per token account; zero and non-finite balances are not counted as holders.
+    - top_n: tuple - Holder counts to report the supply share of.
+    - bucket_edges: tuple - Ascending supply-share edges of the size buckets.
+    Returns:
+    - dict: 'holders', 'total', 'top_shares' (N -> share), 'gini', 'hhi' and 'buckets' (label -> holder count).
+    """
+    balances = np.asarray(balances, dtype=np.float64)
+    balances = balances[np.isfinite(balances) & (balances > 0)]
+    n = len(balances)
+    total = float(balances.sum())
+    labels = _bucket_labels(bucket_edges)
+    if n == 0 or total <= 0:
+        return {'holders': 0, 'total': 0.0, 'top_shares': {k: 0.0 for k in top_n}, 'gini': 0.0, 'hhi': 0.0,
+                'buckets': dict.fromkeys(labels, 0)}
+
+    largest = min(max(top_n), n)
+    top = np.sort(np.partition(balances, n - largest)[n - largest:])[::-1]
+    top_cumulative = np.cumsum(top)
+    top_shares = {k: float(top_cumulative[min(k, n) - 1] / total) for k in top_n}
+
+    shares = balances / total
+    counts = np.bincount(np.searchsorted(np.asarray(bucket_edges), shares, side='right'), minlength=len(labels))
+
+    return {
+        'holders': n,
+        'total': total,
+        'top_shares': top_shares,
+        'gini': _gini(np.sort(balances), total),
+        'hhi': float(np.dot(shares, shares)),
+        'buckets': dict(zip(labels, counts.tolist())),
+    }
+
+
+class HolderDistribution:
+    """
+    Holder balances kept in a block-sorted list (sqrt decomposition) so concentration metrics can be updated
+    from account deltas in O(sqrt n) instead of recomputed over every holder.
+    The Gini numerator sum(rank * x) is maintained exactly under inserts and removals: inserting x at rank r adds
+    r * x plus the sum of all larger balances, which each move up one rank.
+    Args:
+    - balances: array-like - Initial balance per token account.
+    - top_n: tuple - Holder counts to report the supply share of.
+    - bucket_edges: tuple - Ascending supply-share edges of the size buckets.
+    """
+
+    def __init__(self, balances=(), top_n=DEFAULT_TOP_N, bucket_edges=DEFAULT_BUCKET_EDGES):
+        self.top_n = top_n
+        self.bucket_edges = bucket_edges
+        self.rebuild(balances)
+
+    def rebuild(self, balances):
+        """
+        Reset the distribution from a full balance array, also clearing accumulated float rounding.
+        Args:
+        - balances: array-like - Balance per token account.
+        """
+        values = np.asarray(balances, dtype=np.float64)
+        values = np.sort(values[np.isfinite(values) & (values > 0)])
+        self._blocks = [values[i:i + BLOCK_SIZE].tolist() for i in range(0, len(values), BLOCK_SIZE)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._sums = [sum(block) for block in self._blocks]
+        self.count = len(values)
+        self.total = float(values.sum())
+        self._sum_squares = float(np.dot(values, values))
+        self._rank_sum = float(np.dot(np.arange(1, len(values) + 1, dtype=np.float64), values))
+        self._updates = 0
+
+    def _locate(self, value):
+        """Block index for value and the number/sum of balances in earlier blocks."""
+        index = min(bisect_left(self._maxes, value), len(self._blocks) - 1)
+        return index, sum(map(len, self._blocks[:index])), sum(self._sums[:index])
+
+    def add(self, value):
+        """
+        Add one holder balance.
+        Args:
+        - value: float - Balance (ignored unless positive).
+        """
+        if not value > 0:
+            return
+        if not self._blocks:
+            self._blocks, self._maxes, self._sums = [[value]], [value], [value]
+            rank, above = 1, 0.0
+        else:
+            index, before_count, before_sum = self._locate(value)
+            block = self._blocks[index]
+            position = bisect_right(block, value)
+            rank = before_count + position + 1
+            above = self.total - before_sum - sum(block[:position])
+            insort(block, value)
+            self._sums[index] += value
+            self._maxes[index] = block[-1]
+            if len(block) > 2 * BLOCK_SIZE:
+                half = len(block) // 2
+                self._blocks[index:index + 1] = [block[:half], block[half:]]
+                self._maxes[index:index + 1] = [block[half - 1], block[-1]]
+                self._sums[index:index + 1] = [sum(block[:half]), sum(block[half:])]
+        self._rank_sum += rank * value + above
+        self.count += 1
+        self.total += value
+        self._sum_squares += value * value
+        self._tick()
+
+    def remove(self, value):
+        """
+        Remove one holder balance.
+        Args:
+        - value: float - Balance previously added (ignored unless positive).
+        Returns:
+        - bool: True if the balance was found and removed.
+        """
+        if not value > 0 or not self._blocks:
+            return False
+        index, before_count, before_sum = self._locate(value)
+        block = self._blocks[index]
+        position = bisect_left(block, value)
+        if position >= len(block) or block[position] != value:
+            return False
+        rank = before_count + position + 1
+        above = self.total - before_sum - sum(block[:position + 1])
+        del block[position]
+        if block:
+            self._sums[index] -= value
+            self._maxes[index] = block[-1]
+        else:
+            del self._blocks[index], self._maxes[index], self._sums[index]
+        self._rank_sum -= rank * value + above
+        self.count -= 1
+        self.total -= value
+        self._sum_squares -= value * value
+        self._tick()
+        return True
+
+    def _tick(self):
+        # Periodically recompute from the sorted blocks so rounding in the running sums cannot accumulate
+        self._updates += 1
+        if self._updates > max(self.count, BLOCK_SIZE):
+            self.rebuild(self.sorted_balances())
+
+    def apply_deltas(self, deltas):
+        """
+        Update the distribution from snapshot_diff Delta records.
+        Args:
+        - deltas: list - Delta records of new, exited and changed holders.
+        """
+        for delta in deltas:
+            if delta.kind != NEW_HOLDER:
+                self.remove(delta.old_amount)
+            if delta.kind != EXITED_HOLDER:
+                self.add(delta.new_amount)
+
+    def sorted_balances(self):
+        """
+        Return all holder balances in ascending order.
+        Returns:
+        - np.ndarray: float64 balances.
+        """
+        return np.fromiter((value for block in self._blocks for value in block), dtype=np.float64, count=self.count)
+
+    def _count_below(self, value):
+        if not self._blocks:
+            return 0
+        index, before_count, _ = self._locate(value)
+        return before_count + bisect_left(self._blocks[index], value)
+
+    def metrics(self):
+        """
+        Current concentration metrics, in the same shape as holder_metrics.
+        Returns:
+        - dict: 'holders', 'total', 'top_shares', 'gini', 'hhi' and 'buckets'.
+        """
+        labels = _bucket_labels(self.bucket_edges)
+        n, total = self.count, self.total
+        if n == 0 or total <= 0:
+            return {'holders': 0, 'total': 0.0, 'top_shares': {k: 0.0 for k in self.top_n}, 'gini': 0.0,
+                    'hhi': 0.0, 'buckets': dict.fromkeys(labels, 0)}
+
+        largest = min(max(self.top_n), n)
+        top = []
+        for block in reversed(self._blocks):
+            top.extend(reversed(block))
+            if len(top) >= largest:
+                break
+        top_cumulative = np.cumsum(top[:largest])
+        top_shares = {k: float(top_cumulative[min(k, n) - 1] / total) for k in self.top_n}
+
+        below = [self._count_below(edge * total) for edge in self.bucket_edges]
+        counts = np.diff([0] + below + [n])
+
+        return {
+            'holders': n,
+            'total': total,
+            'top_shares': top_shares,
+            'gini': float(2.0 * self._rank_sum / (n * total) - (n + 1) / n),
+            'hhi': self._sum_squares / (total * total),
+            'buckets': dict(zip(labels, counts.tolist())),
+        }
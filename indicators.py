@@ -0,0 +1,421 @@
+from collections import deque
+import math
+import logging
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Largest exponent used when evaluating an EMA chunk in closed form (e**200 is far from overflow)
+_MAX_DECAY_EXPONENT = 200.0
+
+
+# Batch mode: whole series at once, aligned with the input prices and NaN until warmed up
+
+def _ema_recurrence(values, alpha, initial):
+    """
+    Evaluate y[t] = y[t-1] + alpha * (values[t] - y[t-1]) with y[-1] = initial, without a Python loop per element.
+    The recurrence runs along the last axis, so a matrix is smoothed row by row (initial is then a scalar or a
+    column of per-row values). It is solved in closed form over chunks short enough that the decay powers stay finite.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[:] = values
+        return out
+
+    length = values.shape[-1]
+    chunk = max(1, int(_MAX_DECAY_EXPONENT / -math.log(decay)))
+    inverse_powers = decay ** -np.arange(1, min(chunk, length) + 1, dtype=np.float64)
+    previous = initial
+    for start in range(0, length, chunk):
+        x = values[..., start:start + chunk]
+        powers = inverse_powers[:x.shape[-1]]
+        y = out[..., start:start + x.shape[-1]]
+        np.multiply(x, alpha * powers, out=y)
+        np.cumsum(y, axis=-1, out=y)
+        y += previous
+        y /= powers
+        previous = y[..., -1:]
+    return out
+
+
+def sma_series(prices, window=14):
+    """
+    Simple moving average series.
+    Args:
+    - prices: array-like - Historical price data.
+    - window: int - The window size for the moving average.
+    Returns:
+    - np.ndarray: SMA aligned with prices (NaN for the first window-1 entries).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    out = np.full(len(prices), np.nan)
+    if len(prices) >= window:
+        out[window - 1:] = sliding_window_view(prices, window).mean(axis=1)
+    return out
+
+
+def ema_series(prices, span):
+    """
+    Exponential moving average series with alpha = 2 / (span + 1), seeded with the SMA of the first span prices.
+    Args:
+    - prices: array-like - Historical price data.
+    - span: int - EMA span.
+    Returns:
+    - np.ndarray: EMA aligned with prices (NaN for the first span-1 entries).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    out = np.full(len(prices), np.nan)
+    if len(prices) >= span:
+        seed = prices[:span].mean()
+        out[span - 1] = seed
+        out[span:] = _ema_recurrence(prices[span:], 2.0 / (span + 1), seed)
+    return out
+
+
+def macd_series(prices, fast=12, slow=26, signal=9):
+    """
+    MACD line (fast EMA - slow EMA), its signal line (EMA of the MACD line) and histogram.
+    Args:
+    - prices: array-like - Historical price data.
+    - fast: int - The fast EMA span.
+    - slow: int - The slow EMA span.
+    - signal: int - The signal line EMA span.
+    Returns:
+    - dict: 'macd', 'signal' and 'histogram' arrays aligned with prices.
+    """
+    macd_line = ema_series(prices, fast) - ema_series(prices, slow)
+    signal_line = np.full(len(macd_line), np.nan)
+    valid = np.flatnonzero(~np.isnan(macd_line))
+    if len(valid):
+        first = valid[0]
+        signal_line[first:] = ema_series(macd_line[first:], signal)
+    return {'macd': macd_line, 'signal': signal_line, 'histogram': macd_line - signal_line}
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), rsi)
+    return rsi
+
+
+def rsi_series(prices, window=14):
+    """
+    Wilder's Relative Strength Index series.
+    Average gain/loss are seeded with the mean of the first window changes, then smoothed with alpha = 1 / window.
+    Args:
+    - prices: array-like - Historical price data.
+    - window: int - The RSI window.
+    Returns:
+    - np.ndarray: RSI aligned with prices (NaN for the first window entries).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    out = np.full(len(prices), np.nan)
+    if len(prices) <= window:
+        return out
+    delta = np.diff(prices)
+    gains = np.clip(delta, 0.0, None)
+    losses = np.clip(-delta, 0.0, None)
+
+    alpha = 1.0 / window
+    seed_gain = gains[:window].mean()
+    seed_loss = losses[:window].mean()
+    avg_gain = np.concatenate(([seed_gain], _ema_recurrence(gains[window:], alpha, seed_gain)))
+    avg_loss = np.concatenate(([seed_loss], _ema_recurrence(losses[window:], alpha, seed_loss)))
+    out[window:] = _rsi_from_averages(avg_gain, avg_loss)
+    return out
+
+
+# Matrix mode: one row per contract, aligned on the last column and NaN-padded at the start of shorter histories
+
+def history_starts(prices):
+    """
+    Column of the first price of each row.
+    Args:
+    - prices: np.ndarray - Price matrix (contracts x time), NaN-padded at the start.
+    Returns:
+    - np.ndarray: Start column per row (the column count for rows without prices).
+    """
+    valid = ~np.isnan(prices)
+    if not prices.shape[1]:
+        return np.zeros(len(prices), dtype=np.intp)
+    return np.where(valid.any(axis=1), valid.argmax(axis=1), prices.shape[1])
+
+
+def _seeded_ema_rows(values, starts, span, alpha, latest=False):
+    """
+    Smooth each row from its start column, seeded with the mean of its first span values (NaN until seeded).
+    With latest, only the last column is returned, computed as one dot product with the decay weights.
+    """
+    length = values.shape[1]
+    seed_columns = starts + span - 1
+    rows = np.flatnonzero(seed_columns < length)
+    before = np.arange(length) < seed_columns[:, None]
+    # The seed enters the recurrence as an impulse on a zero history, so every row can start at a different column
+    x = np.where(before, 0.0, values)
+    window = seed_columns[rows, None] - np.arange(span)
+    x[rows, seed_columns[rows]] = values[rows[:, None], window].mean(axis=1) / alpha
+    if latest:
+        # Weights of old values underflow to zero, which is where their contribution already is
+        weights = alpha * (1.0 - alpha) ** np.arange(length - 1, -1, -1, dtype=np.float64)
+        return np.where(seed_columns < length, x @ weights, np.nan)
+    out = _ema_recurrence(x, alpha, 0.0)
+    np.copyto(out, np.nan, where=before)
+    return out
+
+
+def ema_matrix(prices, span, starts=None, latest=False):
+    """
+    ema_series for every row of a price matrix.
+    Args:
+    - prices: np.ndarray - Price matrix (contracts x time), NaN-padded at the start, without gaps inside a history.
+    - span: int - EMA span.
+    - starts: np.ndarray - First price column per row (computed when omitted).
+    - latest: bool - Return only the last column.
+    Returns:
+    - np.ndarray: EMA matrix (NaN until each row has span prices), or its last column.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    starts = history_starts(prices) if starts is None else starts
+    return _seeded_ema_rows(prices, starts, span, 2.0 / (span + 1), latest)
+
+
+def macd_matrix(prices, fast=12, slow=26, signal=9, starts=None, latest=False):
+    """
+    macd_series for every row of a price matrix.
+    Args:
+    - prices: np.ndarray - Price matrix (contracts x time), NaN-padded at the start, without gaps inside a history.
+    - fast: int - The fast EMA span.
+    - slow: int - The slow EMA span.
+    - signal: int - The signal line EMA span.
+    - starts: np.ndarray - First price column per row (computed when omitted).
+    - latest: bool - Return only the last column of each line.
+    Returns:
+    - dict: 'macd', 'signal' and 'histogram' matrices, or their last columns.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    starts = history_starts(prices) if starts is None else starts
+    macd_line = ema_matrix(prices, fast, starts) - ema_matrix(prices, slow, starts)
+    # The MACD line exists once the slower EMA is seeded
+    macd_starts = starts + max(fast, slow) - 1
+    signal_line = _seeded_ema_rows(macd_line, macd_starts, signal, 2.0 / (signal + 1), latest)
+    if latest:
+        macd_line = macd_line[:, -1] if macd_line.shape[1] else np.full(len(macd_line), np.nan)
+    return {'macd': macd_line, 'signal': signal_line, 'histogram': macd_line - signal_line}
+
+
+def rsi_matrix(prices, window=14, starts=None, latest=False):
+    """
+    rsi_series for every row of a price matrix.
+    Args:
+    - prices: np.ndarray - Price matrix (contracts x time), NaN-padded at the start, without gaps inside a history.
+    - window: int - The RSI window.
+    - starts: np.ndarray - First price column per row (computed when omitted).
+    - latest: bool - Return only the last column.
+    Returns:
+    - np.ndarray: RSI matrix (NaN until each row has more than window prices), or its last column.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    starts = history_starts(prices) if starts is None else starts
+    if prices.shape[1] <= 1:
+        return np.full(len(prices) if latest else prices.shape, np.nan)
+    delta = np.diff(prices, axis=1)
+    gains = np.maximum(delta, 0.0)
+    losses = np.subtract(gains, delta, out=delta)
+    # Change t is the move into price t + 1, so each row's changes start at its start column
+    avg_gain = _seeded_ema_rows(gains, starts, window, 1.0 / window, latest)
+    avg_loss = _seeded_ema_rows(losses, starts, window, 1.0 / window, latest)
+    rsi = np.where(np.isnan(avg_gain), np.nan, _rsi_from_averages(avg_gain, avg_loss))
+    if latest:
+        return rsi
+    out = np.full(prices.shape, np.nan)
+    out[:, 1:] = rsi
+    return out
+
+
+# Streaming mode: O(1) update per price tick, matching the batch series element for element
+
+class SMA:
+    """
+    Streaming simple moving average.
+    Args:
+    - window: int - The window size.
+    """
+    __slots__ = ('window', 'value', '_prices', '_total')
+
+    def __init__(self, window=14):
+        self.window = window
+        self.value = None
+        self._prices = deque(maxlen=window)
+        self._total = 0.0
+
+    def update(self, price):
+        if len(self._prices) == self.window:
+            self._total -= self._prices[0]
+        self._prices.append(price)
+        self._total += price
+        if len(self._prices) == self.window:
+            self.value = self._total / self.window
+        return self.value
+
+
+class EMA:
+    """
+    Streaming exponential moving average, seeded with the SMA of the first span prices.
+    Args:
+    - span: int - EMA span.
+    """
+    __slots__ = ('span', 'alpha', 'value', '_count', '_seed_total')
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+        self.value = None
+        self._count = 0
+        self._seed_total = 0.0
+
+    def update(self, price):
+        if self.value is not None:
+            self.value += self.alpha * (price - self.value)
+            return self.value
+        self._count += 1
+        self._seed_total += price
+        if self._count == self.span:
+            self.value = self._seed_total / self.span
+        return self.value
+
+
+class MACD:
+    """
+    Streaming MACD with EMA fast/slow lines and an EMA signal line.
+    Args:
+    - fast: int - The fast EMA span.
+    - slow: int - The slow EMA span.
+    - signal: int - The signal line EMA span.
+    """
+    __slots__ = ('_fast', '_slow', '_signal', 'macd', 'signal')
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self._fast = EMA(fast)
+        self._slow = EMA(slow)
+        self._signal = EMA(signal)
+        self.macd = None
+        self.signal = None
+
+    def update(self, price):
+        fast = self._fast.update(price)
+        slow = self._slow.update(price)
+        if fast is not None and slow is not None:
+            self.macd = fast - slow
+            self.signal = self._signal.update(self.macd)
+        return self.macd, self.signal
+
+
+class WilderRSI:
+    """
+    Streaming Wilder RSI.
+    Args:
+    - window: int - The RSI window.
+    """
+    __slots__ = ('window', 'value', '_previous', '_count', '_avg_gain', '_avg_loss')
+
+    def __init__(self, window=14):
+        self.window = window
+        self.value = None
+        self._previous = None
+        self._count = 0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+    def update(self, price):
+        if self._previous is None:
+            self._previous = price
+            return None
+        delta = price - self._previous
+        self._previous = price
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+
+        if self._count < self.window:
+            # Seed phase: simple mean of the first window changes
+            self._count += 1
+            self._avg_gain += gain / self.window
+            self._avg_loss += loss / self.window
+            if self._count < self.window:
+                return None
+        else:
+            self._avg_gain += (gain - self._avg_gain) / self.window
+            self._avg_loss += (loss - self._avg_loss) / self.window
+
+        if self._avg_loss == 0:
+            self.value = 50.0 if self._avg_gain == 0 else 100.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + self._avg_gain / self._avg_loss)
+        return self.value
+
+
+class IndicatorEngine:
+    """
+    Stateful indicator set for one contract: SMA, EMA-based MACD and Wilder RSI, updated per price tick.
+    Args:
+    - sma_window: int - SMA window.
+    - rsi_window: int - RSI window.
+    - fast: int - MACD fast EMA span.
+    - slow: int - MACD slow EMA span.
+    - signal: int - MACD signal EMA span.
+    """
+    __slots__ = ('sma', 'rsi', 'macd', 'last_price')
+
+    def __init__(self, sma_window=14, rsi_window=14, fast=12, slow=26, signal=9):
+        self.sma = SMA(sma_window)
+        self.rsi = WilderRSI(rsi_window)
+        self.macd = MACD(fast, slow, signal)
+        self.last_price = None
+
+    @classmethod
+    def from_history(cls, prices, **kwargs):
+        """
+        Build an engine and replay a price history through it.
+        Args:
+        - prices: iterable - Historical price data, oldest first.
+        - kwargs: Indicator parameters passed to the constructor.
+        Returns:
+        - IndicatorEngine: The warmed-up engine.
+        """
+        engine = cls(**kwargs)
+        for price in prices:
+            engine.update(float(price))
+        return engine
+
+    def update(self, price):
+        """
+        Feed one price tick.
+        Args:
+        - price: float - Latest price.
+        Returns:
+        - dict: Current 'sma', 'rsi', 'macd' and 'signal' values (None while warming up).
+        """
+        self.last_price = price
+        sma = self.sma.update(price)
+        rsi = self.rsi.update(price)
+        macd, signal = self.macd.update(price)
+        return {'sma': sma, 'rsi': rsi, 'macd': macd, 'signal': signal}
+
+    def signals(self):
+        """
+        Entry signals in the same shape as strategy.strategy_analysis.
+        Returns:
+        - dict: 'sma_entry', 'rsi_entry' and 'macd_entry' booleans (False while warming up).
+        """
+        sma = self.sma.value
+        rsi = self.rsi.value
+        macd, signal = self.macd.macd, self.macd.signal
+        return {
+            'sma_entry': sma is not None and self.last_price > sma,
+            'rsi_entry': rsi is not None and rsi < 30,
+            'macd_entry': macd is not None and signal is not None and macd > signal,
+        }
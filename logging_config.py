@@ -1,10 +1,15 @@
 import logging
+from settings import get_settings
 
-def setup_logging():
-    """Set up the logging configuration"""
+def setup_logging(level=None):
+    """
+    Set up the logging configuration. Call it from entry points; importing modules never configures logging.
+    Args:
+    - level: int - Log level (DEBUG when DEBUG_MODE is set, INFO otherwise).
+    """
+    if level is None:
+        level = logging.DEBUG if get_settings().debug_mode else logging.INFO
     logging.basicConfig(
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=logging.INFO
+        level=level
     )
-
-setup_logging()
@@ -1,156 +1,248 @@
 import os
 import time
-import requests
+import threading
 import logging
-from solana.rpc.api import Client
-from solana.rpc.types import TokenAccountOpts
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from config import SOLANA_API_URL, BOT_TOKEN, CHAT_ID, SEND_ALERTS, ALERT_THRESHOLD, CACHE_ENABLED, CACHE_DIR, CACHE_TIMEOUT, SOLANA_NETWORK, SOLSCAN_API_URL, DEBUG_MODE
-from solana.publickey import PublicKey
+from config import validate_config
+from settings import get_settings
 import json
+from rate_limiter import TokenBucket
+from rpc_batch import fetch_token_accounts_batch, token_accounts_params
+from rpc_router import get_rpc_router
+from cache import TwoTierCache, MISSING
+from alert_dispatcher import get_alert_dispatcher
+from token_stream import fetch_token_balances
+from holder_metrics import holder_metrics
+from contract_state import as_balances, get_contract_state
+from scan_scheduler import ScanScheduler
+from logging_config import setup_logging
+import metrics
+import signal_journal
+from analysis import analyze_price_history
+from tx_history import get_tx_ingester
+import numpy as np
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Solana client
-solana_client = Client(SOLANA_API_URL)
+# Shared objects are built on first use, so importing this module opens no files and reads no settings
+_contract_cache = None
+_api_rate_limiter = None
+_shared_lock = threading.Lock()
 
-# Global cache variable
-contract_cache = {}
+def get_contract_cache():
+    """
+    Global cache: bounded in-memory LRU/TTL tier backed by the CACHE_DIR disk tier, created on first use.
+    Returns:
+    - TwoTierCache: The shared contract cache.
+    """
+    global _contract_cache
+    if _contract_cache is None:
+        with _shared_lock:
+            if _contract_cache is None:
+                _contract_cache = TwoTierCache()
+    return _contract_cache
 
-# Fetch contract data from Solana blockchain
-def fetch_contract_data(contract_address):
+def get_api_rate_limiter():
     """
-    Function to fetch contract data from Solana blockchain using the given contract address.
+    Shared limiter pacing RPC calls to the configured per-minute budget, created on first use.
+    Returns:
+    - TokenBucket: The shared limiter.
+    """
+    global _api_rate_limiter
+    if _api_rate_limiter is None:
+        with _shared_lock:
+            if _api_rate_limiter is None:
+                _api_rate_limiter = TokenBucket.per_minute(get_settings().api_rate_limit)
+    return _api_rate_limiter
+
+# Contracts watched by default (you can replace with actual fetching)
+DEFAULT_WATCHLIST = [
+    "5H8tW8f6Hx8TtD5h8gHfJ8N8xLz32Hw53N3y1m1dfYF1",  # Example contract 1
+    "5TnxP8f8Tn9tW33Hh8SHyH8tT8y6H8W5iTk9gk3b8fk6"   # Example contract 2
+]
+
+def _load_contract_data(contract_address):
+    """
+    Fetch contract data straight from the Solana RPC, bypassing the cache.
     Args:
-    - contract_address: str - The address of the Solana contract to analyze.
+    - contract_address: str - The address of the Solana contract.
     Returns:
-    - dict: The contract data (e.g., token balances, historical transactions, etc.)
+    - list: The token accounts, or None if the RPC returned no result.
     """
-    # Check if contract is in cache
-    if contract_address in contract_cache and time.time() - contract_cache[contract_address]['timestamp'] < CACHE_TIMEOUT:
-        logger.debug(f"Using cached data for contract {contract_address}")
-        return contract_cache[contract_address]['data']
-    
     # Fetch data from the blockchain (Solana)
     logger.info(f"Fetching data for contract {contract_address}")
-    
-    try:
+    with metrics.span('fetch', contract_address):
+        get_api_rate_limiter().acquire()
+
         # Example: Fetch the token accounts related to the contract address
-        result = solana_client.get_token_accounts_by_owner(
-            PublicKey(contract_address),
-            TokenAccountOpts()
+        result = get_rpc_router().rpc_call(
+            'getTokenAccountsByOwner',
+            token_accounts_params(contract_address)
         )
-        
-        # Check the response
-        if result.get('result') is not None:
-            contract_data = result['result']['value']
-            logger.info(f"Successfully fetched contract data for {contract_address}")
-        else:
-            logger.error(f"No data found for contract {contract_address}")
-            contract_data = None
-        
-        # Cache the data
-        if CACHE_ENABLED:
-            contract_cache[contract_address] = {
-                'timestamp': time.time(),
-                'data': contract_data
-            }
-
-        return contract_data
     
+    # Check the response
+    if result.get('result') is not None:
+        logger.info(f"Successfully fetched contract data for {contract_address}")
+        return result['result']['value']
+
+    logger.error(f"No data found for contract {contract_address}")
+    return None
+
+# Fetch contract data from Solana blockchain
+def fetch_contract_data(contract_address, balances=False):
+    """
+    Function to fetch contract data from Solana blockchain using the given contract address.
+    Lookups go through the two-tier cache; concurrent misses for one address share a single RPC call.
+    Args:
+    - contract_address: str - The address of the Solana contract to analyze.
+    - balances: bool - Only the balances are needed (analysis), so a segment cache hit may return them alone.
+    Returns:
+    - dict: The contract data (e.g., token balances, historical transactions, etc.); with balances=True, only the
+      balances as a float64 array when they come from the segment cache.
+    """
+    try:
+        return get_contract_cache().get_or_load(contract_address, _load_contract_data, balances=balances)
     except Exception as e:
         logger.error(f"Error fetching contract data: {e}")
         return None
 
 
+# Fetch many contracts with batched RPC round trips
+def fetch_contracts_data(contract_addresses, balances=False):
+    """
+    Function to fetch contract data for many addresses, packing cache misses into JSON-RPC batches.
+    Args:
+    - contract_addresses: list - The addresses of the Solana contracts to fetch.
+    - balances: bool - Only the balances are needed (analysis), so segment cache hits may return them alone.
+    Returns:
+    - dict: Maps each address to its contract data (with balances=True, only the balances when read from the
+      segment cache), or None if it could not be fetched.
+    """
+    cache = get_contract_cache()
+    results = {}
+    missing = []
+    for contract_address in contract_addresses:
+        cached = cache.get_balances(contract_address) if balances else cache.get(contract_address)
+        if cached is not MISSING:
+            results[contract_address] = cached
+        else:
+            missing.append(contract_address)
+
+    if missing:
+        logger.info(f"Fetching data for {len(missing)} contracts in batches")
+        with metrics.span('fetch_batch'):
+            batch_results = fetch_token_accounts_batch(missing, rate_limiter=get_api_rate_limiter())
+        metrics.count('contracts_fetched_total', len(missing))
+        for contract_address, entry in batch_results.items():
+            if entry['error'] is not None:
+                logger.error(f"Error fetching contract data for {contract_address}: {entry['error']}")
+            else:
+                cache.set(contract_address, entry['data'])
+            results[contract_address] = entry['data']
+
+    return results
+
+
 # Analyzing contract data for entry and exit points
 def analyze_contract_data(contract_data):
     """
     Function to analyze contract data and find entry and exit points based on support and resistance.
     Args:
-    - contract_data: list - List of contract data (e.g., token balances, transaction history).
+    - contract_data: ContractState - Loaded contract state; a raw account list or a float64 balance array
+      from fetch_token_balances is also accepted.
     Returns:
     - dict: The analysis results with entry/exit points.
     """
     # Placeholder for analysis (you can enhance with your own logic)
-    if not contract_data:
+    if contract_data is None or not len(contract_data):
         return None
     
     logger.info("Analyzing contract data for entry/exit points...")
     
     # Example: Find high and low token balance values (just as a sample logic)
-    balances = [entry['account']['data']['parsed']['info']['tokenAmount']['uiAmount']
-                for entry in contract_data if 'account' in entry]
+    balances = as_balances(contract_data)
     
-    if not balances:
+    if not len(balances):
         return None
 
-    max_balance = max(balances)
-    min_balance = min(balances)
+    max_balance = float(np.nanmax(balances))
+    min_balance = float(np.nanmin(balances))
     
     # Define entry and exit points based on simple support/resistance logic
-    entry_point = min_balance * (1 + ALERT_THRESHOLD)
-    exit_point = max_balance * (1 - ALERT_THRESHOLD)
+    alert_threshold = get_settings().alert_threshold
+    entry_point = min_balance * (1 + alert_threshold)
+    exit_point = max_balance * (1 - alert_threshold)
     
     return {
         'entry_point': entry_point,
         'exit_point': exit_point,
         'max_balance': max_balance,
-        'min_balance': min_balance
+        'min_balance': min_balance,
+        'holders': holder_metrics(balances)
     }
 
 
 # Send Telegram alert with analysis results
-def send_telegram_alert(message):
+def send_telegram_alert(message, contract_address=None):
     """
-    Function to send an alert to the Telegram bot.
+    Function to queue an alert for the Telegram bot without blocking the analysis.
     Args:
     - message: str - The message to send.
+    - contract_address: str - Contract the alert is about, used to coalesce repeated alerts.
+    Returns:
+    - bool: True if the alert was queued.
     """
-    if SEND_ALERTS and CHAT_ID:
-        try:
-            url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-            payload = {
-                'chat_id': CHAT_ID,
-                'text': message
-            }
-            response = requests.post(url, data=payload)
-            if response.status_code == 200:
-                logger.info(f"Alert sent to Telegram chat {CHAT_ID}")
-            else:
-                logger.error(f"Failed to send alert. Response: {response.text}")
-        except Exception as e:
-            logger.error(f"Error sending Telegram alert: {e}")
-    else:
-        logger.warning("Telegram alerts are not enabled or CHAT_ID is missing.")
+    return get_alert_dispatcher().submit(message, contract_address)
 
 
 # Analyze and send alerts for a given contract
-def analyze_and_alert(contract_address):
+def analyze_and_alert(contract_address, contract_data=None):
     """
     Main function to fetch, analyze, and send alerts based on contract data.
     Args:
     - contract_address: str - The address of the Solana contract.
+    - contract_data: list - Already-fetched contract data; fetched on demand when omitted.
+    Returns:
+    - dict: The analysis results, or None if the contract could not be analyzed.
     """
     logger.info(f"Analyzing contract {contract_address}")
     
-    # Fetch contract data
-    contract_data = fetch_contract_data(contract_address)
+    # Fetch contract data (only the balances when streaming is enabled)
+    if contract_data is None:
+        if get_settings().stream_token_accounts:
+            with metrics.span('fetch', contract_address):
+                contract_data = fetch_token_balances(contract_address, rate_limiter=get_api_rate_limiter())
+        else:
+            contract_data = fetch_contract_data(contract_address, balances=True)
     
-    if not contract_data:
+    if contract_data is None or not len(contract_data):
         logger.error(f"No contract data found for {contract_address}. Skipping analysis.")
-        return
+        metrics.count('contracts_skipped_total')
+        return None
+    
+    # Parse the fetch once into the contract's columnar state, shared by every later stage
+    state = get_contract_state(contract_address)
+    state.load(contract_data)
     
     # Analyze the contract data
-    analysis_results = analyze_contract_data(contract_data)
+    with metrics.span('analyze', contract_address):
+        analysis_results = analyze_contract_data(state)
+    state.last_analysis = analysis_results
+    
+    # Trade prices and volumes from the contract's transaction history, ingested incrementally
+    if analysis_results and get_settings().tx_history_enabled:
+        analysis_results['transactions'] = get_tx_ingester().ingest(contract_address, state=state,
+                                                                   rate_limiter=get_api_rate_limiter())
+        analysis_results['price_levels'] = analyze_price_history(state)
     
     if analysis_results:
         entry_point = analysis_results['entry_point']
         exit_point = analysis_results['exit_point']
         max_balance = analysis_results['max_balance']
         min_balance = analysis_results['min_balance']
+        holders = analysis_results['holders']
         
         # Prepare message
         message = (
@@ -159,64 +251,179 @@ def analyze_and_alert(contract_address):
             f"Exit Point: ${exit_point:.2f}\n"
             f"Max Balance: ${max_balance:.2f}\n"
             f"Min Balance: ${min_balance:.2f}\n"
+            f"Holders: {holders['holders']}, Top 10 Share: {holders['top_shares'].get(10, 0.0):.1%}, "
+            f"Gini: {holders['gini']:.2f}, HHI: {holders['hhi']:.4f}\n"
         )
+        price_levels = analysis_results.get('price_levels')
+        if price_levels:
+            message += (f"Price Support: {price_levels['support']:.9f} SOL, "
+                        f"Resistance: {price_levels['resistance']:.9f} SOL\n")
         
-        # Send Telegram alert
-        send_telegram_alert(message)
+        # Skip alerts identical to the last one sent for this contract, also across restarts
+        values = (entry_point, exit_point, max_balance, min_balance, holders['holders'], holders['gini'])
+        journal = signal_journal.get_signal_journal()
+        if get_settings().journal_dedupe_alerts and journal is not None and journal.is_duplicate_alert(contract_address, values):
+            logger.info(f"Skipping duplicate alert for {contract_address}")
+            metrics.count('alerts_total', outcome='duplicate')
+            alerted = False
+        else:
+            # Send Telegram alert
+            with metrics.span('alert', contract_address):
+                alerted = send_telegram_alert(message, contract_address)
+        signal_journal.record(signal_journal.KIND_CONTRACT, contract_address, values,
+                              signal_journal.FLAG_ALERTED if alerted else 0)
     else:
         logger.warning(f"No valid analysis found for contract {contract_address}.")
+    return analysis_results
 
 
-# Example function to check for new contracts and analyze them
-def monitor_new_contracts():
+# Analyze a batch of contracts concurrently
+def sweep_contracts(contract_addresses, max_workers=None):
     """
-    Function to monitor new contracts and analyze them.
+    Function to analyze many contracts concurrently with a bounded worker pool.
+    Contract data is prefetched in batched RPC calls paced by the shared token bucket, unless
+    STREAM_TOKEN_ACCOUNTS is set, in which case each worker streams just the balances of its contract.
+    Args:
+    - contract_addresses: list - Contract addresses to analyze.
+    - max_workers: int - Maximum number of contracts analyzed at once (MAX_CONTRACTS_TO_ANALYZE by default).
+    Returns:
+    - dict: Sweep wall time, batch fetch time, per-contract latency in seconds, cache and alert stats, and the
+      analysis results per contract.
     """
-    logger.info("Monitoring new contracts for analysis...")
-    
-    # Example: Predefined list of contract addresses (you can replace with actual fetching)
-    contract_addresses = [
-        "5H8tW8f6Hx8TtD5h8gHfJ8N8xLz32Hw53N3y1m1dfYF1",  # Example contract 1
-        "5TnxP8f8Tn9tW33Hh8SHyH8tT8y6H8W5iTk9gk3b8fk6"   # Example contract 2
-    ]
-    
-    for contract_address in contract_addresses:
-        analyze_and_alert(contract_address)
-        time.sleep(5)  # Delay between contract analyses to prevent too many requests
+    max_workers = max_workers or get_settings().max_contracts_to_analyze
+    latencies = {}
+    results = {}
 
+    def timed_analyze(contract_address, contract_data):
+        start = time.perf_counter()
+        try:
+            results[contract_address] = analyze_and_alert(contract_address, contract_data)
+        finally:
+            latencies[contract_address] = time.perf_counter() - start
 
-if __name__ == "__main__":
-    # Example of continuously monitoring and analyzing contracts
-    while True:
-        monitor_new_contracts()
-        time.sleep(300)  # Wait for 5 minutes before next iteration
+    sweep_start = time.perf_counter()
+    # Streaming fetches run per contract inside the pool instead of materializing batched responses
+    prefetched = {} if get_settings().stream_token_accounts else fetch_contracts_data(contract_addresses, balances=True)
+    fetch_time = time.perf_counter() - sweep_start
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(timed_analyze, address, prefetched.get(address)): address
+            for address in contract_addresses
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Error analyzing contract {futures[future]}: {e}")
+    wall_time = time.perf_counter() - sweep_start
+
+    if latencies:
+        ordered = sorted(latencies.values())
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+        logger.info(
+            f"Sweep of {len(latencies)} contracts finished in {wall_time:.2f}s "
+            f"(batch fetch {fetch_time:.2f}s, latency p50={ordered[len(ordered) // 2]:.2f}s, p95={p95:.2f}s, max={ordered[-1]:.2f}s)"
+        )
+    for contract_address, latency in latencies.items():
+        logger.debug(f"Contract {contract_address} analyzed in {latency:.3f}s")
 
+    cache_stats = get_contract_cache().stats()
+    logger.info(f"Contract cache stats: {cache_stats}")
+    alert_stats = get_alert_dispatcher().stats()
+    logger.info(f"Alert dispatcher stats: {alert_stats}")
+    # Results of a finished sweep are on disk even if the process stops before the next flush interval
+    signal_journal.flush()
 
-Explanation of the Code:
-Fetching Contract Data:
+    if metrics.is_enabled():
+        metrics.observe('sweep_duration_seconds', wall_time)
+        metrics.count('contracts_analyzed_total', len(latencies))
+        for name in ('hits', 'disk_hits', 'misses', 'size', 'hit_rate'):
+            metrics.gauge(f'cache_{name}', cache_stats.get(name, 0))
+        metrics.gauge('alert_queue_depth', alert_stats['queue_depth'])
+        metrics.write_textfile()
 
-The fetch_contract_data() function pulls data related to the specified contract address. In this case, it retrieves token account data from the Solana blockchain using Solana's RPC API. The data is cached for a specified amount of time to optimize performance and reduce API calls.
-Contract Data Analysis:
+    return {'wall_time': wall_time, 'fetch_time': fetch_time, 'latencies': latencies, 'cache': cache_stats,
+            'alerts': alert_stats, 'results': results}
 
-The analyze_contract_data() function processes the fetched contract data to calculate support and resistance levels. For simplicity, it identifies the minimum and maximum balances for the token associated with the contract and uses a basic entry and exit point strategy based on a configurable alert threshold.
-Sending Alerts via Telegram:
 
-The send_telegram_alert() function sends a message to a specific Telegram chat via a bot. The message contains the results of the analysis, including the entry and exit points for the token.
-Main Monitoring Logic:
+# Scan activity between two analyses of the same contract
+def scan_activity(previous, current):
+    """
+    Function to measure how much a contract changed between two scans, used to prioritize rescans.
+    Args:
+    - previous: dict - Analysis results of the previous scan (None if there was none).
+    - current: dict - Analysis results of this scan.
+    Returns:
+    - float: Relative change in holder count and supply plus the change in top-10 share, or None if unknown.
+    """
+    if not previous or not current:
+        return None
+    before, after = previous['holders'], current['holders']
+    activity = abs(after['top_shares'].get(10, 0.0) - before['top_shares'].get(10, 0.0))
+    if before['holders']:
+        activity += abs(after['holders'] - before['holders']) / before['holders']
+    if before['total']:
+        activity += abs(after['total'] - before['total']) / before['total']
+    return activity
+
 
-The monitor_new_contracts() function simulates monitoring a predefined list of contracts (you can replace this with actual contract discovery logic). Each contract is fetched and analyzed, and alerts are sent to Telegram based on the analysis results.
-Continuous Monitoring:
+# Example function to check for new contracts and analyze them
+def monitor_new_contracts():
+    """
+    Function to monitor new contracts and analyze them.
+    Returns:
+    - dict: Sweep statistics from sweep_contracts.
+    """
+    logger.info("Monitoring new contracts for analysis...")
+    
+    return sweep_contracts(DEFAULT_WATCHLIST)
 
-The while True loop in the __main__ block repeatedly checks for new contracts every 5 minutes (this can be adjusted). This mimics an ongoing monitoring system where new contracts are continually analyzed.
-Next Steps:
-Enhance the Analysis Logic: You can implement more sophisticated analysis, such as technical analysis on price data, to detect more precise entry and exit points.
-Integrate More Data Sources: You could integrate other data sources, like Solscan or CoinGecko, for more detailed token and market information.
-Expand the Contract Monitoring: Modify the script to monitor contracts in real-time by integrating with a Solana event listener, rather than just checking a static list.
 
-Installation Dependencies:
-You'll need to install requests, solana, and python-dotenv for this script to work:
+# Scan the persistent watchlist, spending the RPC budget on the most active contracts
+def run_scheduled_scans(scheduler=None, batch_size=None, idle_sleep=5.0):
+    """
+    Function to scan watched contracts as they come due, rescheduling each from its observed activity.
+    Args:
+    - scheduler: ScanScheduler - Watchlist to scan (the persistent WATCHLIST_PATH one by default).
+    - batch_size: int - Maximum contracts scanned per sweep (4 x MAX_CONTRACTS_TO_ANALYZE by default).
+    - idle_sleep: float - Longest sleep while nothing is due.
+    """
+    scheduler = scheduler or ScanScheduler()
+    batch_size = batch_size or get_settings().max_contracts_to_analyze * 4
+    metrics.start_http_server()
+    for contract_address in DEFAULT_WATCHLIST:
+        scheduler.add(contract_address)
+    previous = {}
 
-pip install requests solana python-dotenv
+    while True:
+        batch = scheduler.next_batch(batch_size)
+        if not batch:
+            wait = scheduler.seconds_until_due()
+            time.sleep(idle_sleep if wait is None else min(idle_sleep, max(wait, 0.1)))
+            continue
 
+        results = {}
+        try:
+            results = sweep_contracts(batch)['results']
+        except Exception as e:
+            logger.error(f"Scheduled sweep failed: {e}")
+        finally:
+            # Every popped contract must be rescheduled, even when its scan failed
+            for contract_address in batch:
+                current = results.get(contract_address)
+                scheduler.record(contract_address, scan_activity(previous.get(contract_address), current))
+                if current is not None:
+                    previous[contract_address] = current
+            scheduler.save()
 
 
+if __name__ == "__main__":
+    setup_logging()
+    validate_config()
+    # Continuously scan the watchlist, most active contracts first
+    if get_settings().scan_shards == 1:
+        run_scheduled_scans()
+    else:
+        from sharded_scanner import run_sharded_scans
+        run_sharded_scans()
@@ -0,0 +1,437 @@
+import os
+import tempfile
+import threading
+import time
+import logging
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from settings import get_settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Histogram upper bounds in seconds, from sub-millisecond CPU work to slow RPC and Telegram calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Label sets kept per metric; further contracts are folded into contract="other"
+MAX_SERIES = 2000
+# Metric name prefix
+NAMESPACE = 'alphascout'
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+STAGE_SECONDS = f'{NAMESPACE}_stage_duration_seconds'
+STAGE_ERRORS = f'{NAMESPACE}_stage_errors_total'
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of counters, gauges and histograms keyed by metric name and label set.
+    Args:
+    - buckets: tuple - Ascending histogram upper bounds.
+    - max_series: int - Label sets kept per metric before the contract label is folded into "other".
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, max_series=MAX_SERIES):
+        self.buckets = tuple(buckets)
+        self.max_series = max_series
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._series = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _key(self, name, labels):
+        # Called with the lock held; caps per-metric cardinality from per-contract labels
+        key = tuple(sorted(labels.items()))
+        seen = self._series.setdefault(name, set())
+        if key not in seen:
+            if len(seen) >= self.max_series and 'contract' in labels:
+                key = tuple(sorted({**labels, 'contract': 'other'}.items()))
+            seen.add(key)
+        return key
+
+    def describe(self, name, text):
+        """
+        Set the HELP text of a metric.
+        Args:
+        - name: str - Metric name.
+        - text: str - Description.
+        """
+        self._help[name] = text
+
+    def inc(self, name, value=1.0, **labels):
+        """
+        Add to a counter.
+        Args:
+        - name: str - Metric name (conventionally ending in _total).
+        - value: float - Amount to add.
+        - labels: Label values.
+        """
+        with self._lock:
+            key = self._key(name, labels)
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name, value, **labels):
+        """
+        Set a gauge.
+        Args:
+        - name: str - Metric name.
+        - value: float - Current value.
+        - labels: Label values.
+        """
+        with self._lock:
+            self._gauges.setdefault(name, {})[self._key(name, labels)] = float(value)
+
+    def observe(self, name, value, **labels):
+        """
+        Record one histogram observation.
+        Args:
+        - name: str - Metric name.
+        - value: float - Observed value (e.g. seconds).
+        - labels: Label values.
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = self._key(name, labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[index] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def absorb(self, snapshot, **labels):
+        """
+        Copy the series of another registry's snapshot into this one with extra labels, replacing what an
+        earlier snapshot of the same source set (snapshots are cumulative).
+        Args:
+        - snapshot: dict - Result of MetricsRegistry.snapshot(), e.g. from a worker process.
+        - labels: Labels identifying the source (e.g. shard="2").
+        """
+        with self._lock:
+            for kind, store in (('counters', self._counters), ('gauges', self._gauges)):
+                for name, series in snapshot.get(kind, {}).items():
+                    target = store.setdefault(name, {})
+                    for key, value in series.items():
+                        target[self._key(name, {**dict(key), **labels})] = value
+            for name, series in snapshot.get('histograms', {}).items():
+                target = self._histograms.setdefault(name, {})
+                for key, values in series.items():
+                    histogram = _Histogram(len(self.buckets) + 1)
+                    histogram.counts = list(values['buckets'])
+                    histogram.sum = values['sum']
+                    histogram.count = values['count']
+                    target[self._key(name, {**dict(key), **labels})] = histogram
+
+    def reset(self):
+        """Drop every recorded series."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self._series.clear()
+
+    def snapshot(self):
+        """
+        Copy of the recorded values.
+        Returns:
+        - dict: 'counters' and 'gauges' (name -> {labels: value}) and 'histograms'
+          (name -> {labels: {'count', 'sum', 'buckets'}}), with labels as tuples of (key, value) pairs.
+        """
+        with self._lock:
+            return {
+                'counters': {name: dict(series) for name, series in self._counters.items()},
+                'gauges': {name: dict(series) for name, series in self._gauges.items()},
+                'histograms': {name: {key: {'count': h.count, 'sum': h.sum, 'buckets': list(h.counts)}
+                                      for key, h in series.items()}
+                               for name, series in self._histograms.items()},
+            }
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+        Returns:
+        - str: The exposition text.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for kind, metrics in (('counter', snapshot['counters']), ('gauge', snapshot['gauges'])):
+            for name in sorted(metrics):
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} {kind}')
+                for key, value in sorted(metrics[name].items()):
+                    lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+        bounds = self.buckets + (float('inf'),)
+        for name in sorted(snapshot['histograms']):
+            if name in self._help:
+                lines.append(f'# HELP {name} {self._help[name]}')
+            lines.append(f'# TYPE {name} histogram')
+            for key, histogram in sorted(snapshot['histograms'][name].items()):
+                cumulative = 0
+                for bound, count in zip(bounds, histogram['buckets']):
+                    cumulative += count
+                    le = ('le', _format_value(bound))
+                    lines.append(f'{name}_bucket{_format_labels(key, le)} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(key)} {_format_value(histogram["sum"])}')
+                lines.append(f'{name}_count{_format_labels(key)} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+_registry = MetricsRegistry()
+_registry.describe(STAGE_SECONDS, 'Wall time spent in each pipeline stage.')
+_registry.describe(STAGE_ERRORS, 'Pipeline stage calls that raised an exception.')
+
+# Runtime overrides set by configure(); None follows METRICS_ENABLED / METRICS_PER_CONTRACT
+_enabled = None
+_per_contract = None
+
+
+def configure(enabled=None, per_contract=None):
+    """
+    Turn recording on or off at runtime, overriding METRICS_ENABLED / METRICS_PER_CONTRACT.
+    Args:
+    - enabled: bool - Record metrics.
+    - per_contract: bool - Label stage metrics with the contract address.
+    """
+    global _enabled, _per_contract
+    if enabled is not None:
+        _enabled = bool(enabled)
+    if per_contract is not None:
+        _per_contract = bool(per_contract)
+
+
+def is_enabled():
+    """
+    Whether metrics are being recorded.
+    Returns:
+    - bool: True if enabled.
+    """
+    return get_settings().metrics_enabled if _enabled is None else _enabled
+
+
+def _labels_contracts():
+    return get_settings().metrics_per_contract if _per_contract is None else _per_contract
+
+
+def get_registry():
+    """
+    Return the process-wide metrics registry.
+    Returns:
+    - MetricsRegistry: The shared registry.
+    """
+    return _registry
+
+
+class _NullSpan:
+    """Span returned when metrics are disabled; entering and leaving it does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('labels', 'start')
+
+    def __init__(self, labels):
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _registry.observe(STAGE_SECONDS, time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None:
+            _registry.inc(STAGE_ERRORS, **self.labels)
+        return False
+
+
+def span(stage, contract_address=None):
+    """
+    Time a block of code as one pipeline stage:
+
+        with metrics.span('fetch', contract_address):
+            ...
+
+    Records the duration in the stage histogram and counts exceptions. When metrics are disabled a shared no-op
+    span is returned, so the cost is one settings lookup.
+    Args:
+    - stage: str - Stage name (e.g. 'fetch', 'analyze', 'alert').
+    - contract_address: str - Contract the work is for (omitted when per-contract labels are off).
+    Returns:
+    - context manager: The span.
+    """
+    if not is_enabled():
+        return _NULL_SPAN
+    labels = {'stage': stage}
+    if contract_address is not None and _labels_contracts():
+        labels['contract'] = contract_address
+    return _Span(labels)
+
+
+def timed(stage):
+    """
+    Decorator timing every call of a function as a pipeline stage.
+    Args:
+    - stage: str - Stage name.
+    Returns:
+    - callable: The decorator.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return func(*args, **kwargs)
+            with _Span({'stage': stage}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1.0, **labels):
+    """
+    Add to a counter if metrics are enabled.
+    Args:
+    - name: str - Metric name without the namespace prefix (e.g. 'alerts_total').
+    - value: float - Amount to add.
+    - labels: Label values.
+    """
+    if is_enabled():
+        _registry.inc(f'{NAMESPACE}_{name}', value, **labels)
+
+
+def observe(name, value, **labels):
+    """
+    Record a histogram observation if metrics are enabled.
+    Args:
+    - name: str - Metric name without the namespace prefix (e.g. 'http_request_duration_seconds').
+    - value: float - Observed value.
+    - labels: Label values.
+    """
+    if is_enabled():
+        _registry.observe(f'{NAMESPACE}_{name}', value, **labels)
+
+
+def gauge(name, value, **labels):
+    """
+    Set a gauge if metrics are enabled.
+    Args:
+    - name: str - Metric name without the namespace prefix (e.g. 'alert_queue_depth').
+    - value: float - Current value.
+    - labels: Label values.
+    """
+    if is_enabled():
+        _registry.set(f'{NAMESPACE}_{name}', value, **labels)
+
+
+def render():
+    """
+    Render the shared registry in the Prometheus text format.
+    Returns:
+    - str: The exposition text.
+    """
+    return _registry.render()
+
+
+def write_textfile(path=None):
+    """
+    Atomically write the metrics to a file, e.g. for the node_exporter textfile collector.
+    Args:
+    - path: str - Output file (defaults to METRICS_EXPORT_PATH).
+    Returns:
+    - str: The path written, or None if metrics are disabled or no path is configured.
+    """
+    if not is_enabled():
+        return None
+    if path is None:
+        path = get_settings().metrics_export_path
+    if not path:
+        return None
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(render())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Metrics request: {format % args}")
+
+
+def start_http_server(port=None, host='0.0.0.0'):
+    """
+    Serve /metrics for Prometheus scraping from a daemon thread.
+    Args:
+    - port: int - Port to listen on (defaults to METRICS_PORT; 0 there means no endpoint).
+    - host: str - Interface to bind.
+    Returns:
+    - ThreadingHTTPServer: The running server, or None if metrics are disabled or no port is configured.
+    """
+    if not is_enabled():
+        return None
+    if port is None:
+        port = get_settings().metrics_port
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,99 @@
+import threading
+import time
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter used to pace outgoing API calls.
+    Args:
+    - rate: float - Tokens added to the bucket per second.
+    - capacity: float - Maximum burst size (defaults to one second's worth of tokens).
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive.")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, calls_per_minute, capacity=None):
+        """
+        Build a bucket from a calls-per-minute budget (e.g. ADDITIONAL_CONFIG["API_RATE_LIMIT"]).
+        Args:
+        - calls_per_minute: int - Allowed calls per minute.
+        - capacity: float - Optional burst size.
+        Returns:
+        - TokenBucket: The configured limiter.
+        """
+        return cls(calls_per_minute / 60.0, capacity)
+
+    def set_rate(self, rate, capacity=None):
+        """
+        Change the refill rate, e.g. when a shared budget is re-split.
+        Args:
+        - rate: float - Tokens added per second.
+        - capacity: float - Maximum burst size (defaults to one second's worth of tokens).
+        """
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive.")
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+            self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens without blocking.
+        Args:
+        - tokens: float - Number of tokens to take.
+        Returns:
+        - bool: True if the tokens were taken.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Block until the requested tokens are available.
+        Args:
+        - tokens: float - Number of tokens to take.
+        - timeout: float - Maximum seconds to wait, or None to wait indefinitely.
+        Returns:
+        - float: Seconds spent waiting, or None if the timeout expired.
+        """
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}.")
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return now - start
+                wait = (tokens - self._tokens) / self.rate
+            if timeout is not None:
+                remaining = timeout - (now - start)
+                if remaining <= 0:
+                    return None
+                wait = min(wait, remaining)
+            time.sleep(wait)
@@ -1,47 +1,103 @@
+import asyncio
 import time
 import logging
-from solana.rpc.api import Client
-from solana.publickey import PublicKey
-from config import SOLANA_API_URL
 from telegram_bot import send_telegram_alert
+from rpc_batch import fetch_token_accounts_batch
+from async_monitor import AsyncContractMonitor
+from snapshot_diff import SnapshotDiffer, format_deltas
+from holder_metrics import HolderDistribution
+from logging_config import setup_logging
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Solana client
-solana_client = Client(SOLANA_API_URL)
+def _alert_on_deltas(contract_address, snapshot, distributions, deltas):
+    """
+    Update a contract's holder distribution from deltas and alert on the significant ones.
+    Args:
+    - contract_address: str - Contract the deltas belong to.
+    - snapshot: SnapshotDiffer - The contract's snapshot, already updated with the deltas.
+    - distributions: dict - Contract address -> HolderDistribution, filled on first use.
+    - deltas: list - Delta records from the snapshot.
+    """
+    logger.info(f"Change detected in contract {contract_address} ({len(deltas)} accounts)")
+    distribution = distributions.get(contract_address)
+    if distribution is None:
+        # Built from the snapshot, which already includes these deltas
+        distribution = distributions[contract_address] = HolderDistribution(snapshot.balances())
+    else:
+        distribution.apply_deltas(deltas)
 
-def monitor_contract(contract_address):
+    significant = snapshot.significant(deltas)
+    if significant:
+        metrics = distribution.metrics()
+        message = (
+            f"{format_deltas(contract_address, significant)}\n"
+            f"Holders: {metrics['holders']}, top 10 share: {metrics['top_shares'].get(10, 0.0):.1%}, "
+            f"Gini: {metrics['gini']:.2f}"
+        )
+        send_telegram_alert(message, contract_address)
+
+def monitor_contracts(contract_addresses, interval=10):
     """
-    Continuously monitor a specific Solana contract.
+    Continuously monitor many Solana contracts, polling them together in batched RPC calls.
+    Holder changes are diffed per account and only those past ALERT_THRESHOLD are alerted.
     Args:
-    - contract_address: str - The contract address to monitor.
+    - contract_addresses: list - The contract addresses to monitor.
+    - interval: float - Seconds between polling cycles.
     """
-    logger.info(f"Monitoring contract {contract_address} in real-time.")
+    logger.info(f"Monitoring {len(contract_addresses)} contracts in real-time.")
     
-    previous_data = None
+    snapshots = {contract_address: SnapshotDiffer() for contract_address in contract_addresses}
+    distributions = {}
     
     while True:
         try:
-            contract_data = solana_client.get_token_accounts_by_owner(PublicKey(contract_address), {'mint': 'mint_address_here'})
+            results = fetch_token_accounts_batch(contract_addresses)
             
-            if contract_data['result']:
-                current_data = contract_data['result']['value']
+            for contract_address, entry in results.items():
+                if entry['error'] is not None:
+                    logger.error(f"Error monitoring contract {contract_address}: {entry['error']}")
+                    continue
                 
-                if previous_data != current_data:
-                    logger.info(f"Change detected in contract {contract_address}")
-                    send_telegram_alert(f"Change detected in contract {contract_address}")
-                    
-                    previous_data = current_data
-            else:
-                logger.warning(f"No data found for contract {contract_address}.")
-            
-            time.sleep(10)  # Adjust as needed for real-time frequency
+                current_data = entry['data']
+                if not current_data:
+                    logger.warning(f"No data found for contract {contract_address}.")
+                    continue
+                
+                snapshot = snapshots[contract_address]
+                deltas = snapshot.diff(current_data)
+                if deltas:
+                    _alert_on_deltas(contract_address, snapshot, distributions, deltas)
             
         except Exception as e:
-            logger.error(f"Error monitoring contract {contract_address}: {e}")
-            time.sleep(10)  # Reattempt after some time
+            logger.error(f"Error monitoring contracts: {e}")
+        
+        time.sleep(interval)  # Adjust as needed for real-time frequency
+
+def monitor_contract(contract_address):
+    """
+    Continuously monitor a specific Solana contract.
+    Args:
+    - contract_address: str - The contract address to monitor.
+    """
+    monitor_contracts([contract_address])
+
+def monitor_contracts_async(contract_addresses):
+    """
+    Monitor many Solana contracts over one websocket connection, falling back to adaptive polling.
+    Args:
+    - contract_addresses: list - The contract addresses to monitor.
+    """
+    distributions = {}
+
+    def on_update(contract_address, deltas):
+        _alert_on_deltas(contract_address, monitor.snapshot(contract_address), distributions, deltas)
+
+    monitor = AsyncContractMonitor(contract_addresses, on_update)
+    asyncio.run(monitor.run())
 
 if __name__ == "__main__":
+    setup_logging()
     contract_address = "5H8tW8f6Hx8TtD5h8gHfJ8N8xLz32Hw53N3y1m1dfYF1"  # Example contract address
-    monitor_contract(contract_address)
+    monitor_contracts_async([contract_address])
@@ -0,0 +1,109 @@
+import logging
+from settings import get_settings
+from transport import get_transport
+from rpc_router import get_rpc_router
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# SPL Token program, used to select every token account held by an owner
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+
+
+def token_accounts_params(owner_address, program_id=TOKEN_PROGRAM_ID):
+    """
+    Build the getTokenAccountsByOwner parameter list for an owner address.
+    Args:
+    - owner_address: str - Address whose token accounts are requested.
+    - program_id: str - Token program to filter accounts by.
+    Returns:
+    - list: JSON-RPC params.
+    """
+    return [owner_address, {'programId': program_id}, {'encoding': 'jsonParsed'}]
+
+
+def build_token_accounts_request(request_id, owner_address, program_id=TOKEN_PROGRAM_ID):
+    """
+    Build a single getTokenAccountsByOwner JSON-RPC request.
+    Args:
+    - request_id: int - JSON-RPC id used to match the response.
+    - owner_address: str - Address whose token accounts are requested.
+    - program_id: str - Token program to filter accounts by.
+    Returns:
+    - dict: The JSON-RPC request object.
+    """
+    return {
+        'jsonrpc': '2.0',
+        'id': request_id,
+        'method': 'getTokenAccountsByOwner',
+        'params': token_accounts_params(owner_address, program_id)
+    }
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def fetch_token_accounts_batch(contract_addresses, batch_size=None, rpc_url=None,
+                               rate_limiter=None, timeout=None):
+    """
+    Fetch token accounts for many addresses using JSON-RPC batch requests.
+    Args:
+    - contract_addresses: list - Addresses to fetch token accounts for.
+    - batch_size: int - Maximum number of requests packed into one HTTP round trip (RPC_BATCH_SIZE by default).
+    - rpc_url: str - JSON-RPC endpoint (can point at a local stub server); routed across RPC_ENDPOINTS when omitted.
+    - rate_limiter: TokenBucket - Optional limiter charged one token per address.
+    - timeout: float - HTTP timeout in seconds for each batch (transport default when omitted).
+    Returns:
+    - dict: Maps each address to {'data': list or None, 'error': str or None}.
+    """
+    addresses = list(dict.fromkeys(contract_addresses))
+    batch_size = batch_size or get_settings().rpc_batch_size
+    results = {}
+    transport = get_transport()
+    request_kwargs = {'timeout': timeout} if timeout is not None else {}
+
+    for chunk in _chunks(addresses, max(1, batch_size)):
+        if rate_limiter is not None:
+            for _ in chunk:
+                rate_limiter.acquire()
+
+        payload = [build_token_accounts_request(i, address) for i, address in enumerate(chunk)]
+        try:
+            if rpc_url is None:
+                response = get_rpc_router().post(endpoint='rpc.batch', json=payload, **request_kwargs)
+            else:
+                response = transport.post(rpc_url, json=payload, endpoint='rpc.batch', **request_kwargs)
+            response.raise_for_status()
+            replies = response.json()
+        except Exception as e:
+            logger.error(f"Batch request for {len(chunk)} addresses failed: {e}")
+            for address in chunk:
+                results[address] = {'data': None, 'error': str(e)}
+            continue
+
+        # A server that rejects the whole batch answers with a single error object
+        if isinstance(replies, dict):
+            error = str(replies.get('error', 'Unexpected non-batch response'))
+            logger.error(f"Batch request for {len(chunk)} addresses rejected: {error}")
+            for address in chunk:
+                results[address] = {'data': None, 'error': error}
+            continue
+        by_id = {reply.get('id'): reply for reply in replies if isinstance(reply, dict)}
+
+        for i, address in enumerate(chunk):
+            reply = by_id.get(i)
+            if reply is None:
+                results[address] = {'data': None, 'error': 'No response in batch'}
+            elif reply.get('error') is not None:
+                results[address] = {'data': None, 'error': str(reply['error'])}
+            else:
+                results[address] = {'data': (reply.get('result') or {}).get('value'), 'error': None}
+
+    failed = sum(1 for entry in results.values() if entry['error'] is not None)
+    if failed:
+        logger.warning(f"Batch fetch completed with {failed}/{len(results)} failed addresses.")
+    else:
+        logger.info(f"Batch fetch completed for {len(results)} addresses.")
+    return results
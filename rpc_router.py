@@ -0,0 +1,344 @@
+import random
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+import requests
+from settings import get_settings
+from transport import get_transport, RETRY_STATUSES
+import metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Circuit breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Weight of the latest request in the latency and error-rate EWMAs
+HEALTH_SMOOTHING = 0.2
+# Recent latencies kept per endpoint for the hedge delay percentile
+LATENCY_SAMPLES = 200
+# Samples needed before the p95 is trusted; until then the hedge waits twice the latency EWMA
+MIN_HEDGE_SAMPLES = 20
+# How strongly the error-rate EWMA inflates an endpoint's score
+ERROR_PENALTY = 10.0
+# Share of calls sent to a random healthy endpoint so stale scores of unused endpoints get refreshed
+EXPLORE_RATE = 0.05
+
+
+class NoHealthyEndpointError(requests.ConnectionError):
+    """Raised when every endpoint's circuit is open."""
+
+
+class EndpointHealth:
+    """
+    Latency, error rate and circuit-breaker state of one RPC endpoint.
+    """
+    __slots__ = ('url', 'label', 'latency', 'error_rate', 'samples', 'state', 'failures', 'opened_at',
+                 'in_flight', 'trial_in_flight', 'requests', 'errors', 'hedges', 'hedge_wins')
+
+    def __init__(self, url):
+        self.url = url
+        self.label = urlsplit(url).netloc or url
+        self.latency = None
+        self.error_rate = 0.0
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.in_flight = 0
+        self.trial_in_flight = False
+        self.requests = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def score(self):
+        # Lower is better; endpoints without samples score 0 so they get tried
+        latency = self.latency or 0.0
+        return latency * (1 + self.in_flight) * (1 + ERROR_PENALTY * self.error_rate)
+
+    def p95(self):
+        if len(self.samples) < MIN_HEDGE_SAMPLES:
+            return 2 * self.latency if self.latency is not None else None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def as_dict(self):
+        return {
+            'state': self.state,
+            'latency_ewma': self.latency,
+            'error_rate': self.error_rate,
+            'p95': self.p95(),
+            'requests': self.requests,
+            'errors': self.errors,
+            'in_flight': self.in_flight,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+        }
+
+
+class RpcRouter:
+    """
+    Routes JSON-RPC calls across several endpoints by health, with circuit breakers and hedged requests.
+    Each call goes to the endpoint with the best score (latency EWMA inflated by its error-rate EWMA and
+    in-flight requests); a small share of calls goes to another endpoint to keep its score current. If it has
+    not answered after that endpoint's p95 latency, one duplicate is sent to the next best endpoint and
+    whichever answers first wins. A failed call fails over to the next endpoint.
+    An endpoint failing failure_threshold times in a row is skipped for reset_timeout seconds, then a single
+    trial request decides whether it is closed again. All routed calls must be idempotent reads.
+    Options left as None take their RPC_* setting.
+    Args:
+    - endpoints: list - JSON-RPC URLs (SOLANA_API_URL when empty).
+    - transport: Transport - HTTP transport (the shared one by default).
+    - hedge: bool - Send hedged duplicates of slow requests.
+    - hedge_min_delay: float - Shortest wait in seconds before hedging.
+    - failure_threshold: int - Consecutive failures that open an endpoint's circuit.
+    - reset_timeout: float - Seconds an open circuit stays open before a trial request.
+    - max_workers: int - Threads available for concurrent attempts.
+    """
+
+    def __init__(self, endpoints=None, transport=None, hedge=None, hedge_min_delay=None, failure_threshold=None,
+                 reset_timeout=None, max_workers=16):
+        settings = get_settings()
+        urls = list(dict.fromkeys(endpoints or [settings.solana_api_url]))
+        self.endpoints = [EndpointHealth(url) for url in urls]
+        self.transport = transport
+        self.hedge = settings.rpc_hedge if hedge is None else hedge
+        self.hedge_min_delay = settings.rpc_hedge_min_delay if hedge_min_delay is None else hedge_min_delay
+        self.failure_threshold = max(1, settings.rpc_failure_threshold if failure_threshold is None
+                                     else failure_threshold)
+        self.reset_timeout = settings.rpc_reset_timeout if reset_timeout is None else reset_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rpc-router')
+        self._lock = threading.Lock()
+        self._rpc_id = 0
+
+    def _transport(self):
+        return self.transport or get_transport()
+
+    def _admits(self, health, now):
+        """
+        Whether an endpoint may take a request now; an open circuit turns half-open once reset_timeout has passed.
+        Called with the lock held.
+        """
+        if health.state == OPEN and now - health.opened_at >= self.reset_timeout:
+            health.state = HALF_OPEN
+            logger.info(f"RPC endpoint {health.label} half-open; sending a trial request")
+        return health.state == CLOSED or (health.state == HALF_OPEN and not health.trial_in_flight)
+
+    def _available(self, now):
+        """Endpoints that may take a request, best first. Called with the lock held."""
+        available = [health for health in self.endpoints if self._admits(health, now)]
+        available.sort(key=EndpointHealth.score)
+        if len(available) > 1 and random.random() < EXPLORE_RATE:
+            explored = available.pop(random.randrange(1, len(available)))
+            available.insert(0, explored)
+        return available
+
+    def _claim(self, health):
+        # Called with the lock held when a request is sent to the endpoint
+        health.in_flight += 1
+        if health.state == HALF_OPEN:
+            health.trial_in_flight = True
+
+    def _record(self, health, latency, failed):
+        with self._lock:
+            health.in_flight -= 1
+            health.trial_in_flight = False
+            health.requests += 1
+            health.error_rate += HEALTH_SMOOTHING * ((1.0 if failed else 0.0) - health.error_rate)
+            if failed:
+                health.errors += 1
+                health.failures += 1
+                if health.state == HALF_OPEN or health.failures >= self.failure_threshold:
+                    if health.state != OPEN:
+                        logger.warning(f"RPC endpoint {health.label} circuit opened after {health.failures} failures")
+                        metrics.count('rpc_circuit_opened_total', endpoint=health.label)
+                    health.state = OPEN
+                    health.opened_at = time.monotonic()
+                return
+            health.latency = latency if health.latency is None else \
+                health.latency + HEALTH_SMOOTHING * (latency - health.latency)
+            health.samples.append(latency)
+            health.failures = 0
+            if health.state != CLOSED:
+                logger.info(f"RPC endpoint {health.label} recovered; circuit closed")
+            health.state = CLOSED
+
+    def _attempt(self, health, endpoint, kwargs):
+        """Send one request to one endpoint. Returns (response, error); failures are recorded, not raised."""
+        start = time.perf_counter()
+        try:
+            response = self._transport().post(health.url, endpoint=f"{endpoint}@{health.label}", max_retries=0,
+                                              **kwargs)
+        except requests.RequestException as e:
+            self._record(health, time.perf_counter() - start, True)
+            return None, e
+        failed = response.status_code in RETRY_STATUSES or response.status_code >= 400
+        self._record(health, time.perf_counter() - start, failed)
+        return response, None
+
+    def _hedge_delay(self, health):
+        p95 = health.p95()
+        return max(self.hedge_min_delay, p95) if p95 is not None else None
+
+    def post(self, endpoint='rpc', **kwargs):
+        """
+        POST a JSON-RPC payload to the healthiest endpoint, hedging and failing over as configured.
+        Args:
+        - endpoint: str - Stats label prefix (the endpoint host is appended).
+        - kwargs: Arguments forwarded to Transport.post (e.g. json, stream, timeout).
+        Returns:
+        - requests.Response: The first successful response, or the last failed one if every endpoint failed.
+        Raises:
+        - requests.RequestException: If no endpoint returned a response.
+        """
+        with self._lock:
+            candidates = self._available(time.monotonic())
+
+        pending = {}
+        last_response = last_error = None
+        next_index = 0
+        hedged = False
+
+        def launch():
+            """Send to the next candidate that still admits a request, or return None if none is left."""
+            nonlocal next_index
+            # Re-checked and claimed under one lock hold: since the candidates were listed, another call may
+            # have taken a half-open endpoint's single trial or opened a circuit
+            with self._lock:
+                now = time.monotonic()
+                while next_index < len(candidates):
+                    health = candidates[next_index]
+                    next_index += 1
+                    if self._admits(health, now):
+                        self._claim(health)
+                        break
+                else:
+                    return None
+            pending[self._executor.submit(self._attempt, health, endpoint, kwargs)] = health
+            return health
+
+        primary = launch()
+        if primary is None:
+            raise NoHealthyEndpointError("Every RPC endpoint's circuit is open.")
+        hedge_delay = self._hedge_delay(primary) if self.hedge else None
+        hedge_at = time.monotonic() + hedge_delay if hedge_delay is not None else None
+
+        while pending:
+            timeout = None
+            if not hedged and hedge_at is not None and next_index < len(candidates):
+                timeout = max(0.0, hedge_at - time.monotonic())
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # The primary is slower than its p95: race a duplicate on the next best endpoint
+                hedged = True
+                health = launch()
+                if health is not None:
+                    with self._lock:
+                        health.hedges += 1
+                    metrics.count('rpc_hedges_total', endpoint=health.label)
+                continue
+
+            for future in done:
+                health = pending.pop(future)
+                response, error = future.result()
+                if error is None and response.status_code < 400:
+                    if hedged and health is not primary:
+                        with self._lock:
+                            health.hedge_wins += 1
+                        metrics.count('rpc_hedge_wins_total', endpoint=health.label)
+                    # Close failed and losing responses so their connections return to the pool
+                    if last_response is not None:
+                        last_response.close()
+                    for other in pending:
+                        other.add_done_callback(_close_response)
+                    return response
+                if response is not None:
+                    if last_response is not None:
+                        last_response.close()
+                    last_response = response
+                last_error = error or last_error
+                if not pending and next_index < len(candidates):
+                    failover = launch()
+                    if failover is None:
+                        continue
+                    primary = failover
+                    logger.warning(f"RPC call to {health.label} failed; failing over to {primary.label}")
+                    metrics.count('rpc_failovers_total', endpoint=primary.label)
+                    hedge_delay = self._hedge_delay(primary) if self.hedge else None
+                    hedge_at = time.monotonic() + hedge_delay if hedge_delay is not None else None
+
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+    def rpc_call(self, method, params=None):
+        """
+        Make a single Solana JSON-RPC call through the router.
+        Args:
+        - method: str - JSON-RPC method name (e.g. getTokenAccountsByOwner).
+        - params: list - Method parameters.
+        Returns:
+        - dict: The decoded JSON-RPC response ({'result': ...} or {'error': ...}).
+        """
+        with self._lock:
+            self._rpc_id += 1
+            request_id = self._rpc_id
+        payload = {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params or []}
+        response = self.post(endpoint=f"rpc.{method}", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def stats(self):
+        """
+        Snapshot of per-endpoint health.
+        Returns:
+        - dict: Maps endpoint hosts to circuit state, latency EWMA, error rate, p95 and counters.
+        """
+        with self._lock:
+            return {health.label: health.as_dict() for health in self.endpoints}
+
+    def close(self):
+        """Stop the worker threads once in-flight attempts finish."""
+        self._executor.shutdown(wait=False)
+
+
+def _close_response(future):
+    response, _ = future.result()
+    if response is not None:
+        response.close()
+
+
+def parse_endpoints(value):
+    """
+    Split a comma-separated endpoint list.
+    Args:
+    - value: str - e.g. "https://a.example,https://b.example".
+    Returns:
+    - list: Non-empty, stripped URLs.
+    """
+    return [url.strip() for url in (value or '').split(',') if url.strip()]
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_rpc_router():
+    """
+    Return the process-wide router over RPC_ENDPOINTS (or SOLANA_API_URL alone), creating it on first use.
+    Returns:
+    - RpcRouter: The shared router.
+    """
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                settings = get_settings()
+                _router = RpcRouter(parse_endpoints(settings.rpc_endpoints) or [settings.solana_api_url])
+    return _router
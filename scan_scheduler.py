@@ -0,0 +1,282 @@
+import heapq
+import itertools
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import logging
+from settings import get_settings
+from rate_limiter import TokenBucket
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Weight of the latest scan in a contract's activity score
+ACTIVITY_SMOOTHING = 0.3
+# Default of ScanScheduler's path, standing for WATCHLIST_PATH (None already means in-memory only)
+DEFAULT_PATH = object()
+
+
+class WatchEntry:
+    """
+    Scan state of one watched contract.
+    """
+    __slots__ = ('address', 'next_due', 'interval', 'score', 'last_scanned', 'scans', 'version')
+
+    def __init__(self, address, next_due, interval, score, last_scanned=None, scans=0):
+        self.address = address
+        self.next_due = next_due
+        self.interval = interval
+        self.score = score
+        self.last_scanned = last_scanned
+        self.scans = scans
+        self.version = 0
+
+    def as_dict(self):
+        return {
+            'next_due': self.next_due,
+            'interval': self.interval,
+            'score': self.score,
+            'last_scanned': self.last_scanned,
+            'scans': self.scans,
+        }
+
+
+class ScanScheduler:
+    """
+    Heap-ordered watchlist that decides which contracts to scan next.
+    Each contract carries an activity score (an EWMA of how much it changed per scan). Hot contracts are rescanned
+    every min_interval seconds and dormant ones every max_interval, on a log scale in between. Intervals are
+    stretched when the watchlist as a whole would exceed the RPC budget, and each batch is admitted against a
+    token bucket refilled at that budget. State is saved to a JSON file so the schedule survives restarts.
+    Options left as None take their setting.
+    Args:
+    - path: str - Watchlist file (WATCHLIST_PATH by default; None keeps the schedule in memory only).
+    - min_interval: float - Scan interval of the most active contracts (SCAN_MIN_INTERVAL).
+    - max_interval: float - Scan interval of dormant contracts (SCAN_MAX_INTERVAL).
+    - hot_activity: float - Activity score at which a contract gets min_interval (SCAN_HOT_ACTIVITY).
+    - calls_per_minute: int - RPC budget shared by all scans (API_RATE_LIMIT).
+    - calls_per_scan: float - RPC calls one contract scan costs.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, min_interval=None, max_interval=None, hot_activity=None,
+                 calls_per_minute=None, calls_per_scan=1.0):
+        settings = get_settings()
+        self.path = path = settings.watchlist_path if path is DEFAULT_PATH else path
+        self.min_interval = settings.scan_min_interval if min_interval is None else min_interval
+        self.max_interval = settings.scan_max_interval if max_interval is None else max_interval
+        self.hot_activity = settings.scan_hot_activity if hot_activity is None else hot_activity
+        calls_per_minute = settings.api_rate_limit if calls_per_minute is None else calls_per_minute
+        self.calls_per_scan = calls_per_scan
+        self.budget_rate = calls_per_minute / 60.0
+        self._budget = TokenBucket.per_minute(calls_per_minute)
+        self._entries = {}
+        self._heap = []
+        self._total_demand = 0.0
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, address):
+        return address in self._entries
+
+    def _push(self, entry):
+        entry.version += 1
+        heapq.heappush(self._heap, (entry.next_due, next(self._sequence), entry.address, entry.version))
+
+    def _base_interval(self, score):
+        # Log-linear between max_interval (score 0) and min_interval (score >= hot_activity)
+        heat = min(1.0, max(0.0, score / self.hot_activity)) if self.hot_activity > 0 else 1.0
+        return self.max_interval * (self.min_interval / self.max_interval) ** heat
+
+    def _demand(self, entry):
+        # Calls per second a contract needs at its unscaled interval
+        return self.calls_per_scan / self._base_interval(entry.score)
+
+    def _budget_scale(self):
+        return max(1.0, self._total_demand / self.budget_rate) if self.budget_rate > 0 else 1.0
+
+    def add(self, address, due=None):
+        """
+        Add a contract to the watchlist (no-op if it is already watched).
+        New contracts start halfway between hot and dormant and are due immediately unless `due` is given.
+        Args:
+        - address: str - Contract address.
+        - due: float - Epoch seconds of the first scan.
+        Returns:
+        - bool: True if the contract was added.
+        """
+        with self._lock:
+            if address in self._entries:
+                return False
+            score = self.hot_activity / 2
+            entry = WatchEntry(address, time.time() if due is None else due, self._base_interval(score), score)
+            self._entries[address] = entry
+            self._total_demand += self._demand(entry)
+            self._push(entry)
+            self._dirty = True
+            return True
+
+    def remove(self, address):
+        """
+        Stop watching a contract.
+        Args:
+        - address: str - Contract address.
+        Returns:
+        - bool: True if the contract was watched.
+        """
+        with self._lock:
+            # Its heap item is skipped lazily
+            entry = self._entries.pop(address, None)
+            if entry is None:
+                return False
+            self._total_demand -= self._demand(entry)
+            self._dirty = True
+            return True
+
+    def next_batch(self, max_size, now=None):
+        """
+        Pop contracts that are due, most overdue first, as far as the RPC budget allows.
+        Args:
+        - max_size: int - Maximum number of contracts returned.
+        - now: float - Current epoch seconds (defaults to time.time()).
+        Returns:
+        - list: Addresses to scan; call record() for each once scanned.
+        """
+        now = time.time() if now is None else now
+        batch = []
+        with self._lock:
+            while self._heap and len(batch) < max_size:
+                due, _, address, version = self._heap[0]
+                entry = self._entries.get(address)
+                if entry is None or entry.version != version:
+                    heapq.heappop(self._heap)
+                    continue
+                if due > now or not self._budget.try_acquire(self.calls_per_scan):
+                    break
+                heapq.heappop(self._heap)
+                batch.append(address)
+        return batch
+
+    def record(self, address, activity=None, now=None):
+        """
+        Reschedule a scanned contract from how much it changed.
+        Args:
+        - address: str - Contract address returned by next_batch.
+        - activity: float - Relative change seen by this scan (None keeps the current score, e.g. on a first scan).
+        - now: float - Current epoch seconds (defaults to time.time()).
+        Returns:
+        - float: Seconds until the contract is due again, or None if it is no longer watched.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry is None:
+                return None
+            if activity is not None and math.isfinite(activity):
+                self._total_demand -= self._demand(entry)
+                entry.score = ACTIVITY_SMOOTHING * max(0.0, activity) + (1 - ACTIVITY_SMOOTHING) * entry.score
+                self._total_demand += self._demand(entry)
+            entry.interval = min(self.max_interval, self._base_interval(entry.score) * self._budget_scale())
+            entry.last_scanned = now
+            entry.scans += 1
+            entry.next_due = now + entry.interval
+            self._push(entry)
+            self._dirty = True
+            return entry.interval
+
+    def retry(self, address, due=None):
+        """
+        Put a contract returned by next_batch back on the schedule without counting a scan (e.g. its scan was lost).
+        Args:
+        - address: str - Contract address.
+        - due: float - Epoch seconds it is due again (defaults to now).
+        Returns:
+        - bool: True if the contract is still watched.
+        """
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry is None:
+                return False
+            entry.next_due = time.time() if due is None else due
+            self._push(entry)
+            return True
+
+    def seconds_until_due(self, now=None):
+        """
+        Seconds until the next contract is due (0 if one is overdue, None if the watchlist is empty).
+        Args:
+        - now: float - Current epoch seconds (defaults to time.time()).
+        Returns:
+        - float: Delay in seconds.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            while self._heap:
+                due, _, address, version = self._heap[0]
+                entry = self._entries.get(address)
+                if entry is not None and entry.version == version:
+                    return max(0.0, due - now)
+                heapq.heappop(self._heap)
+        return None
+
+    def entries(self):
+        """
+        Snapshot of the watchlist.
+        Returns:
+        - dict: Address -> scan state ('next_due', 'interval', 'score', 'last_scanned', 'scans').
+        """
+        with self._lock:
+            return {address: entry.as_dict() for address, entry in self._entries.items()}
+
+    def load(self):
+        """Load the watchlist from the state file, replacing the in-memory schedule."""
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read watchlist {self.path}: {e}")
+            return
+        with self._lock:
+            self._entries = {}
+            self._heap = []
+            self._total_demand = 0.0
+            for address, saved in state.get('contracts', {}).items():
+                entry = WatchEntry(address, saved['next_due'], saved['interval'], saved['score'],
+                                   saved.get('last_scanned'), saved.get('scans', 0))
+                self._entries[address] = entry
+                self._total_demand += self._demand(entry)
+                self._push(entry)
+            self._dirty = False
+        logger.info(f"Loaded watchlist with {len(self._entries)} contracts from {self.path}")
+
+    def save(self, force=False):
+        """
+        Write the watchlist to the state file atomically (skipped when nothing changed).
+        Args:
+        - force: bool - Write even if nothing changed.
+        """
+        if not self.path or not (self._dirty or force):
+            return
+        with self._lock:
+            state = {'saved_at': time.time(),
+                     'contracts': {address: entry.as_dict() for address, entry in self._entries.items()}}
+            self._dirty = False
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,127 @@
+import numpy as np
+import logging
+import metrics
+import signal_journal
+from indicators import history_starts, macd_matrix, rsi_matrix
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Columns of the signal matrix, named like the keys of strategy.strategy_analysis
+SIGNALS = ('sma_entry', 'rsi_entry', 'macd_entry')
+
+
+def align_prices(histories, length=None):
+    """
+    Stack ragged price histories into a matrix aligned on their latest price.
+    Args:
+    - histories: list - Price histories, oldest first.
+    - length: int - Columns kept (the longest history by default); longer histories keep their latest prices.
+    Returns:
+    - np.ndarray: Price matrix (contracts x time), NaN-padded at the start of shorter histories.
+    """
+    if length is None:
+        length = max((len(history) for history in histories), default=0)
+    matrix = np.full((len(histories), length), np.nan)
+    if length:
+        for row, history in zip(matrix, histories):
+            history = np.asarray(history, dtype=np.float64)[-length:]
+            row[length - len(history):] = history
+    return matrix
+
+
+def _forward_fill(prices):
+    """Fill gaps inside each row with the previous price; leading padding stays NaN."""
+    index = np.where(np.isnan(prices), 0, np.arange(prices.shape[1]))
+    np.maximum.accumulate(index, axis=1, out=index)
+    return np.take_along_axis(prices, index, axis=1)
+
+
+@metrics.timed('screening')
+def screen_prices(prices, addresses=None, top=None, min_signals=1, sma_window=14, rsi_window=14, rsi_threshold=30,
+                  fast=12, slow=26, signal=9):
+    """
+    Compute the strategy_analysis entry signals for many contracts at once and rank the candidates.
+    Each row is evaluated on its own history, so signals match strategy_analysis on that row; contracts still
+    warming up get False for the indicators they lack.
+    Args:
+    - prices: np.ndarray - Price matrix (contracts x time) aligned on the latest column, NaN-padded at the start
+      of shorter histories; NaN gaps inside a history are filled with the previous price.
+    - addresses: list - Contract address per row (row indices are used when omitted).
+    - top: int - Maximum number of candidates returned (all by default).
+    - min_signals: int - Entry signals a contract needs to be a candidate.
+    - sma_window: int - SMA window.
+    - rsi_window: int - RSI window.
+    - rsi_threshold: float - RSI below which the RSI entry fires.
+    - fast: int - MACD fast EMA span.
+    - slow: int - MACD slow EMA span.
+    - signal: int - MACD signal EMA span.
+    Returns:
+    - dict: 'signals' boolean matrix (contracts x SIGNALS), the latest 'price', 'sma', 'rsi', 'macd' and 'signal'
+      per contract, and 'candidates': dicts sorted by number of signals, then by lowest RSI.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.ndim != 2:
+        raise ValueError(f"Expected a contracts x time price matrix, got shape {prices.shape}")
+    addresses = list(range(len(prices))) if addresses is None else list(addresses)
+    if len(addresses) != len(prices):
+        raise ValueError(f"Got {len(addresses)} addresses for {len(prices)} price rows")
+    if not prices.shape[1]:
+        prices = np.full((len(prices), 1), np.nan)
+    starts = history_starts(prices)
+    if np.isnan(prices).sum() != starts.sum():
+        prices = _forward_fill(prices)
+
+    count = len(prices)
+    last = prices[:, -1]
+    # Only the latest value of each indicator is screened; NaN until the row has enough prices
+    sma = prices[:, -sma_window:].mean(axis=1) if prices.shape[1] >= sma_window else np.full(count, np.nan)
+    rsi = rsi_matrix(prices, rsi_window, starts, latest=True)
+    macd_values = macd_matrix(prices, fast, slow, signal, starts, latest=True)
+    macd_line = macd_values['macd']
+    signal_line = macd_values['signal']
+
+    # NaN comparisons are False, so warming-up indicators never fire
+    with np.errstate(invalid='ignore'):
+        signals = np.column_stack([last > sma, rsi < rsi_threshold, macd_line > signal_line])
+
+    scores = signals.sum(axis=1)
+    order = np.lexsort((np.where(np.isnan(rsi), np.inf, rsi), -scores))
+    order = order[scores[order] >= min_signals][:top]
+    candidates = [{
+        'address': addresses[row],
+        'row': int(row),
+        'score': int(scores[row]),
+        'signals': dict(zip(SIGNALS, signals[row].tolist())),
+        'price': float(last[row]),
+        'rsi': float(rsi[row]),
+    } for row in order]
+
+    logger.debug(f"Screened {count} contracts: {len(candidates)} candidates")
+    return {'signals': signals, 'price': last, 'sma': sma, 'rsi': rsi, 'macd': macd_line, 'signal': signal_line,
+            'candidates': candidates}
+
+
+def screen_states(states, top=None, min_signals=1, length=None, **kwargs):
+    """
+    Screen the price histories of contract states and journal each contract's signals.
+    Args:
+    - states: list - ContractState objects.
+    - top: int - Maximum number of candidates returned.
+    - min_signals: int - Entry signals a contract needs to be a candidate.
+    - length: int - Latest prices used per contract (the full histories by default). EMAs and RSI are seeded at the
+      start of the kept window, so a short window changes their values.
+    - kwargs: Indicator parameters passed to screen_prices.
+    Returns:
+    - dict: The screen_prices result, with candidates identified by contract address.
+    """
+    states = list(states)
+    result = screen_prices(align_prices([state.prices.view() for state in states], length),
+                           [state.address for state in states], top, min_signals, **kwargs)
+    flags = (np.array([signal_journal.FLAG_SMA_ENTRY, signal_journal.FLAG_RSI_ENTRY, signal_journal.FLAG_MACD_ENTRY])
+             * result['signals']).sum(axis=1).tolist()
+    rows = np.column_stack([result['price'], result['sma'], result['rsi'], result['macd'], result['signal']]).tolist()
+    for state, values, flag in zip(states, rows, flags):
+        if len(state.prices):
+            signal_journal.record(signal_journal.KIND_STRATEGY, state.address, values, flag)
+    return result
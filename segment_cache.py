@@ -0,0 +1,351 @@
+import argparse
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import logging
+import numpy as np
+from settings import get_settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Record layout (little endian, every record padded to 8 bytes):
+#   header | key (utf-8) | meta (JSON) | array table | padding | float64 array data
+MAGIC = b'ASG1'
+HEADER = struct.Struct('<4sHHdII')  # magic, key_len, n_arrays, timestamp, meta_len, record_len
+ARRAY_ENTRY = struct.Struct('<HQ')  # name_len, element count (name bytes follow)
+SEGMENT_FILE = 'contracts.seg'
+# Superseded bytes a segment must hold before it is compacted automatically, whatever their share of the file
+COMPACT_MIN_BYTES = 1 << 20
+
+
+def _pad8(n):
+    return (n + 7) & ~7
+
+
+def extract_balances(contract_data):
+    """
+    Pull token balances out of getTokenAccountsByOwner data as a float64 array.
+    Args:
+    - contract_data: list - Raw token accounts.
+    Returns:
+    - np.ndarray: uiAmount per account (NaN where missing).
+    """
+    balances = np.empty(len(contract_data), dtype=np.float64)
+    for i, entry in enumerate(contract_data):
+        try:
+            amount = entry['account']['data']['parsed']['info']['tokenAmount']['uiAmount']
+        except (KeyError, TypeError):
+            amount = None
+        balances[i] = np.nan if amount is None else amount
+    return balances
+
+
+class SegmentStore:
+    """
+    Append-only single-file cache store with an in-memory address index.
+    Numeric arrays are stored packed and read back as zero-copy views over an mmap of the segment.
+    Rewriting a key leaves its old record behind; the file is compacted when it is opened and after a write once
+    those superseded records pass compact_ratio of it (and COMPACT_MIN_BYTES).
+    Args:
+    - path: str - Segment file path (created if missing; in CACHE_DIR by default).
+    - ttl: float - Seconds an entry stays fresh for load_entry (CACHE_TIMEOUT by default).
+    - compact_ratio: float - Share of superseded bytes that triggers compaction, 0 to never compact automatically
+      (CACHE_COMPACT_RATIO by default).
+    """
+
+    def __init__(self, path=None, ttl=None, compact_ratio=None):
+        settings = get_settings()
+        self.path = path or os.path.join(settings.cache_dir, SEGMENT_FILE)
+        self.ttl = settings.cache_timeout if ttl is None else ttl
+        self.compact_ratio = settings.cache_compact_ratio if compact_ratio is None else compact_ratio
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writer = open(self.path, 'ab')
+        self._mm = None
+        self._mapped_size = 0
+        self._index = {}
+        self._live_bytes = 0
+        self._rebuild_index()
+        self.maybe_compact()
+
+    def _remap(self):
+        size = os.path.getsize(self.path)
+        if size == self._mapped_size:
+            return
+        # The previous map is left to the garbage collector; array views may still reference it
+        if size:
+            with open(self.path, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._mm = None
+        self._mapped_size = size
+
+    def _rebuild_index(self):
+        self._remap()
+        offset = 0
+        while offset < self._mapped_size:
+            record_len = 0
+            if offset + HEADER.size <= self._mapped_size:
+                magic, _, _, _, _, record_len = HEADER.unpack_from(self._mm, offset)
+                if magic != MAGIC:
+                    record_len = 0
+            if record_len < HEADER.size or offset + record_len > self._mapped_size:
+                # A crash mid-append leaves a partial record; drop it so appends stay aligned
+                logger.warning(f"Truncating corrupt segment tail at offset {offset} in {self.path}")
+                self._writer.truncate(offset)
+                self._writer.seek(offset)
+                self._remap()
+                break
+            self._add(self._read_key(offset), offset, record_len)
+            offset += record_len
+
+    def _add(self, key, offset, record_len):
+        previous = self._index.get(key)
+        if previous is not None:
+            self._live_bytes -= previous[1]
+        self._index[key] = (offset, record_len)
+        self._live_bytes += record_len
+
+    def _read_key(self, offset):
+        _, key_len, _, _, _, _ = HEADER.unpack_from(self._mm, offset)
+        start = offset + HEADER.size
+        return bytes(self._mm[start:start + key_len]).decode('utf-8')
+
+    def put(self, key, meta, arrays=None, timestamp=None):
+        """
+        Append a record; the newest record for a key wins.
+        Args:
+        - key: str - Contract address.
+        - meta: object - JSON-serialisable payload.
+        - arrays: dict - Optional name -> sequence of floats stored as packed float64.
+        - timestamp: float - Time the data was fetched (defaults to now).
+        """
+        key_bytes = key.encode('utf-8')
+        meta_bytes = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+        packed = [(name.encode('utf-8'), np.ascontiguousarray(values, dtype='<f8'))
+                  for name, values in (arrays or {}).items()]
+
+        table = b''.join(ARRAY_ENTRY.pack(len(name), len(values)) + name for name, values in packed)
+        head_len = HEADER.size + len(key_bytes) + len(meta_bytes) + len(table)
+        data_start = _pad8(head_len)
+        record_len = data_start + sum(values.nbytes for _, values in packed)
+        header = HEADER.pack(MAGIC, len(key_bytes), len(packed),
+                             timestamp if timestamp is not None else time.time(), len(meta_bytes), record_len)
+
+        chunks = [header, key_bytes, meta_bytes, table, b'\0' * (data_start - head_len)]
+        chunks.extend(values.tobytes() for _, values in packed)
+        with self._lock:
+            offset = self._writer.tell()
+            self._writer.write(b''.join(chunks))
+            self._writer.flush()
+            self._add(key, offset, record_len)
+        self.maybe_compact()
+
+    def _locate(self, key):
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None, self._mm
+            if entry[0] >= self._mapped_size:
+                self._remap()
+            return entry[0], self._mm
+
+    def get_arrays(self, key):
+        """
+        Return the numeric arrays of a record without decoding its JSON payload.
+        Args:
+        - key: str - Contract address.
+        Returns:
+        - dict: name -> read-only float64 view into the mapped segment, or None if absent.
+        """
+        offset, mm = self._locate(key)
+        if offset is None:
+            return None
+        return self._arrays_at(mm, offset)
+
+    def _arrays_at(self, mm, offset):
+        _, key_len, n_arrays, _, meta_len, _ = HEADER.unpack_from(mm, offset)
+        pos = offset + HEADER.size + key_len + meta_len
+        entries = []
+        for _ in range(n_arrays):
+            name_len, count = ARRAY_ENTRY.unpack_from(mm, pos)
+            pos += ARRAY_ENTRY.size
+            entries.append((bytes(mm[pos:pos + name_len]).decode('utf-8'), count))
+            pos += name_len
+        pos = offset + _pad8(pos - offset)
+        arrays = {}
+        for name, count in entries:
+            arrays[name] = np.frombuffer(mm, dtype='<f8', count=count, offset=pos)
+            pos += count * 8
+        return arrays
+
+    def get(self, key):
+        """
+        Return a full record.
+        Args:
+        - key: str - Contract address.
+        Returns:
+        - tuple: (timestamp, meta, arrays), or None if absent.
+        """
+        offset, mm = self._locate(key)
+        if offset is None:
+            return None
+        _, key_len, _, timestamp, meta_len, _ = HEADER.unpack_from(mm, offset)
+        start = offset + HEADER.size + key_len
+        meta = json.loads(bytes(mm[start:start + meta_len]))
+        return timestamp, meta, self._arrays_at(mm, offset)
+
+    def load_entry(self, key):
+        """
+        Disk-tier interface used by TwoTierCache.
+        Args:
+        - key: str - Contract address.
+        Returns:
+        - tuple: (timestamp, data) for a fresh entry, or None.
+        """
+        offset, mm = self._locate(key)
+        if offset is None:
+            return None
+        _, key_len, _, timestamp, meta_len, _ = HEADER.unpack_from(mm, offset)
+        if time.time() - timestamp >= self.ttl:
+            return None
+        start = offset + HEADER.size + key_len
+        return timestamp, json.loads(bytes(mm[start:start + meta_len]))
+
+    def load_balances(self, key):
+        """
+        Disk-tier interface used by TwoTierCache.get_balances: the balance column only, without decoding the
+        JSON payload.
+        Args:
+        - key: str - Contract address.
+        Returns:
+        - tuple: (timestamp, read-only float64 balance view into the mapped segment) for a fresh entry, or None.
+        """
+        offset, mm = self._locate(key)
+        if offset is None:
+            return None
+        timestamp = HEADER.unpack_from(mm, offset)[3]
+        if time.time() - timestamp >= self.ttl:
+            return None
+        balances = self._arrays_at(mm, offset).get('balances')
+        return (timestamp, balances) if balances is not None else None
+
+    def save_entry(self, key, data, timestamp=None):
+        """
+        Disk-tier interface used by TwoTierCache; token balances are stored as a packed array.
+        Args:
+        - key: str - Contract address.
+        - data: list - Raw token accounts.
+        - timestamp: float - Time the data was fetched.
+        """
+        arrays = {'balances': extract_balances(data)} if isinstance(data, list) else None
+        self.put(key, data, arrays, timestamp)
+
+    def keys(self):
+        with self._lock:
+            return list(self._index)
+
+    def dead_bytes(self):
+        """Bytes held by superseded records."""
+        with self._lock:
+            return self._writer.tell() - self._live_bytes
+
+    def _should_compact(self):
+        size = self._writer.tell()
+        dead = size - self._live_bytes
+        return self.compact_ratio > 0 and dead >= COMPACT_MIN_BYTES and dead > self.compact_ratio * size
+
+    def maybe_compact(self):
+        """
+        Compact the segment if its superseded records pass the compaction threshold.
+        Returns:
+        - int: Bytes reclaimed (0 if the segment was left as is).
+        """
+        with self._lock:
+            if not self._should_compact():
+                return 0
+            reclaimed = self._compact_locked()
+        logger.info(f"Compacted {self.path}, reclaiming {reclaimed} bytes")
+        return reclaimed
+
+    def compact(self):
+        """
+        Rewrite the segment keeping only the newest record per key.
+        Returns:
+        - int: Bytes reclaimed.
+        """
+        with self._lock:
+            return self._compact_locked()
+
+    def _compact_locked(self):
+        self._writer.flush()
+        self._remap()
+        before = self._mapped_size
+        tmp_path = self.path + '.compact'
+        new_index = {}
+        with open(tmp_path, 'wb') as out:
+            for key, (offset, record_len) in self._index.items():
+                new_index[key] = (out.tell(), record_len)
+                out.write(self._mm[offset:offset + record_len])
+        self._writer.close()
+        # Views handed out earlier keep the old map, and with it the replaced file, alive
+        os.replace(tmp_path, self.path)
+        self._writer = open(self.path, 'ab')
+        self._index = new_index
+        self._mapped_size = -1
+        self._remap()
+        return before - self._mapped_size
+
+    def close(self):
+        with self._lock:
+            self._writer.close()
+
+
+def migrate_json_cache(source_dir=None, store=None):
+    """
+    Copy every {address}.json cache file into a segment store, keeping original timestamps.
+    Args:
+    - source_dir: str - Directory of JSON cache files (CACHE_DIR by default).
+    - store: SegmentStore - Destination (defaults to the segment file in CACHE_DIR).
+    Returns:
+    - int: Number of entries migrated.
+    """
+    source_dir = source_dir or get_settings().cache_dir
+    store = store or SegmentStore()
+    migrated = 0
+    for cache_file in sorted(glob.glob(os.path.join(source_dir, '*.json'))):
+        contract_address = os.path.splitext(os.path.basename(cache_file))[0]
+        try:
+            with open(cache_file, 'r') as f:
+                cached_data = json.load(f)
+            store.save_entry(contract_address, cached_data['data'], cached_data['timestamp'])
+            migrated += 1
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Skipping unreadable cache file {cache_file}: {e}")
+    logger.info(f"Migrated {migrated} cache entries from {source_dir} to {store.path}")
+    return migrated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Segment cache maintenance")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = subparsers.add_parser('migrate', help="Import the JSON cache directory")
+    migrate_parser.add_argument('--source', default=None, help="JSON cache directory (CACHE_DIR by default)")
+    migrate_parser.add_argument('--dest', default=None, help="Segment file path")
+    compact_parser = subparsers.add_parser('compact', help="Drop superseded records")
+    compact_parser.add_argument('--path', default=None, help="Segment file path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'migrate':
+        migrate_json_cache(args.source, SegmentStore(args.dest))
+    else:
+        reclaimed = SegmentStore(args.path).compact()
+        logger.info(f"Compaction reclaimed {reclaimed} bytes")
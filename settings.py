@@ -0,0 +1,229 @@
+import os
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import Optional
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+def _env_str(env, name, default=None):
+    return env.get(name, default)
+
+
+def _env_int(env, name, default):
+    return int(env.get(name, default))
+
+
+def _env_float(env, name, default):
+    return float(env.get(name, default))
+
+
+def _env_bool(env, name, default):
+    return bool(int(env.get(name, default)))
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Typed application settings, read from environment variables (and a .env file) once.
+    Every field maps to the upper-case environment variable of the same name, also exposed by the config module.
+    """
+    # Solana API
+    solana_api_url: str = "https://api.mainnet-beta.solana.com"  # Default Solana RPC URL
+    solana_api_key: Optional[str] = None
+    solana_ws_url: str = "wss://api.mainnet-beta.solana.com"  # Websocket endpoint for subscriptions
+    solana_network: str = "mainnet-beta"  # Can be "mainnet-beta", "devnet", or "testnet"
+    solscan_api_url: str = "https://solscan.io/api"  # API URL for Solscan (for transaction data)
+
+    # Telegram bot
+    bot_token: str = "YOUR_TELEGRAM_BOT_TOKEN"
+    bot_username: str = "AlphaScoutBot"
+    chat_id: Optional[str] = None  # Telegram Chat ID for sending alerts
+
+    # Cache
+    cache_enabled: bool = True
+    cache_dir: str = "./cache"
+    cache_timeout: int = 3600  # Cache timeout in seconds
+    cache_max_entries: int = 1024  # Max contracts kept in the in-memory cache tier
+    cache_backend: str = "json"  # Disk tier: "json" (one file per contract) or "segment" (single mmap'd file)
+    cache_compact_ratio: float = 0.5  # Compact the segment file once superseded records pass this share (0 never)
+
+    # Historical data store
+    history_store_enabled: bool = True  # Persist fetched bars locally and only fetch missing ranges
+    history_dir: str = "./history"  # Directory holding per-contract columnar price history
+
+    # Telegram alerts
+    send_alerts: bool = True
+    alert_threshold: float = 0.05  # Threshold for triggering alerts (5% price change)
+    alert_coalesce_window: float = 2.0  # Seconds alerts are collected before one batched message is sent
+    alert_queue_size: int = 1000  # Max pending alerts; new alerts are dropped when full
+    alert_min_interval: float = 1.0  # Min seconds between messages to one chat (Telegram per-chat limit)
+
+    # Charting
+    chart_output_dir: str = "./charts/"
+    chart_style: str = "plotly"  # Options: "plotly", "matplotlib"
+    chart_width: int = 800
+    chart_height: int = 600
+
+    # Trading
+    trading_enabled: bool = False
+    trading_api_key: Optional[str] = None
+    trading_api_secret: Optional[str] = None
+
+    # Debugging
+    debug_mode: bool = False
+
+    # Metrics
+    metrics_enabled: bool = False  # Record stage timings and counters (near-zero cost when off)
+    metrics_per_contract: bool = True  # Label stage timings with the contract address
+    metrics_export_path: Optional[str] = None  # Prometheus text file rewritten after every sweep
+    metrics_port: int = 0  # Port serving /metrics for Prometheus scraping (0 disables the endpoint)
+
+    # Analysis and RPC
+    max_contracts_to_analyze: int = 5  # Max number of contracts to analyze concurrently
+    sleep_between_requests: int = 3  # Time to wait between API requests (in seconds)
+    rpc_batch_size: int = 100  # Max addresses packed into one JSON-RPC batch request
+    stream_token_accounts: bool = False  # Stream-parse balances instead of building full account lists
+
+    # RPC routing
+    rpc_endpoints: Optional[str] = None  # Comma-separated JSON-RPC URLs to route across (SOLANA_API_URL if unset)
+    rpc_hedge: bool = True  # Race a duplicate request on the next endpoint once the first exceeds its p95
+    rpc_hedge_min_delay: float = 0.05  # Shortest wait in seconds before a hedged request is sent
+    rpc_failure_threshold: int = 5  # Consecutive failures that take an endpoint out of rotation
+    rpc_reset_timeout: float = 30.0  # Seconds before a failed endpoint gets a trial request
+
+    # Signal journal
+    journal_enabled: bool = True  # Append analysis and strategy results to the on-disk journal
+    journal_dir: str = "./journal"  # Directory holding journal segment files
+    journal_segment_records: int = 1000000  # Records per segment file (64 bytes each)
+    journal_flush_interval: float = 1.0  # Max seconds journal records stay buffered in memory
+    journal_retention_days: float = 30.0  # Sealed segments older than this are deleted (0 keeps all)
+    journal_dedupe_alerts: bool = True  # Skip alerts identical to the last one journaled for the contract
+
+    # Scan scheduler
+    watchlist_path: str = "./watchlist.json"  # Persistent watchlist with per-contract scan state
+    scan_min_interval: float = 5.0  # Seconds between scans of the most active contracts
+    scan_max_interval: float = 3600.0  # Seconds between scans of dormant contracts
+    scan_hot_activity: float = 0.05  # Activity score (relative change per scan) treated as fully hot
+
+    # Sharded scanning
+    scan_shards: int = 1  # Worker processes scanning the watchlist (1 scans in-process, 0 uses one per CPU)
+    shard_virtual_nodes: int = 64  # Points per shard on the consistent-hash ring
+    shard_max_inflight: int = 2  # Batches queued per shard process at once
+
+    # Transaction history ingestion
+    tx_history_enabled: bool = False  # Ingest each analyzed contract's transactions into price/volume bars
+    tx_history_dir: str = "./tx_history"  # Directory holding per-contract transfer records and checkpoints
+    tx_page_size: int = 1000  # Signatures per getSignaturesForAddress page (the RPC maximum is 1000)
+    tx_batch_size: int = 50  # getTransaction calls packed into one JSON-RPC batch
+    tx_fetch_workers: int = 4  # Transaction batches fetched concurrently
+    tx_bar_seconds: int = 60  # Width in seconds of the price/volume bars built from transfers
+
+    # HTTP transport (shared by RPC, Telegram and historical data calls)
+    http_connect_timeout: float = 5.0  # Seconds to establish a connection
+    http_read_timeout: float = 30.0  # Seconds to wait for a response
+    http_max_retries: int = 3  # Retries on connection errors, 429 and 5xx responses
+    http_backoff_base: float = 0.5  # Base delay in seconds for jittered exponential backoff
+    http_backoff_max: float = 10.0  # Upper bound on a single backoff delay
+    http_pool_size: int = 20  # Keep-alive connections kept per host
+
+    # Proxy
+    proxy_url: Optional[str] = None
+    use_proxy: bool = False
+
+    # Additional settings
+    api_rate_limit: int = 1000  # Max API calls per minute
+    max_transaction_history: int = 1000  # Max transaction history to fetch
+    alert_voice: str = "default"  # Voice for Telegram bot alerts (optional)
+
+    @classmethod
+    def from_env(cls, env=None):
+        """
+        Build settings from environment variables, using the defaults above for unset ones.
+        Args:
+        - env: dict - Variables to read (defaults to os.environ).
+        Returns:
+        - Settings: The parsed settings.
+        """
+        env = os.environ if env is None else env
+        parsers = {str: _env_str, Optional[str]: _env_str, int: _env_int, float: _env_float, bool: _env_bool}
+        values = {}
+        for field in fields(cls):
+            name = field.name.upper()
+            if name in env:
+                values[field.name] = parsers[field.type](env, name, field.default)
+        # The websocket endpoint follows the RPC URL unless set explicitly
+        if 'SOLANA_WS_URL' not in env and 'solana_api_url' in values:
+            values['solana_ws_url'] = values['solana_api_url'].replace("https://", "wss://").replace("http://", "ws://")
+        return cls(**values)
+
+    @property
+    def additional_config(self):
+        """Environment-specific extras, in the shape of the original ADDITIONAL_CONFIG dict."""
+        return {
+            "API_RATE_LIMIT": self.api_rate_limit,
+            "MAX_TRANSACTION_HISTORY": self.max_transaction_history,
+            "ALERT_VOICE": self.alert_voice,
+        }
+
+    def warnings(self):
+        """
+        Describe settings that are missing or inconsistent but not fatal.
+        Returns:
+        - list: Warning messages.
+        """
+        messages = []
+        if self.solana_api_key is None:
+            messages.append("No Solana API Key found. Please set your API key in the .env file or environment variables.")
+        if self.bot_token == "YOUR_TELEGRAM_BOT_TOKEN":
+            messages.append("Telegram Bot Token is not set! Please provide a valid token.")
+        if self.chat_id is None:
+            messages.append("Telegram Chat ID is not set! Please provide a valid Chat ID to receive alerts.")
+        if self.trading_enabled and (self.trading_api_key is None or self.trading_api_secret is None):
+            messages.append("Trading API credentials are missing. Trading functionality will be disabled.")
+        if self.use_proxy and self.proxy_url is None:
+            messages.append("Proxy is enabled, but no proxy URL is provided. Please set PROXY_URL.")
+        return messages
+
+    def validate(self):
+        """
+        Check that essential settings are present, logging non-fatal warnings.
+        Raises:
+        - ValueError: If a required setting is missing.
+        """
+        for message in self.warnings():
+            logger.warning(message)
+        if not self.solana_api_url:
+            raise ValueError("SOLANA_API_URL is required but not set.")
+        if not self.bot_token:
+            raise ValueError("BOT_TOKEN is required but not set.")
+        if self.chat_id is None:
+            raise ValueError("CHAT_ID is required but not set.")
+
+
+@lru_cache(maxsize=None)
+def get_settings():
+    """
+    Load settings on first use (reading a .env file if it exists) and return the cached instance.
+    Returns:
+    - Settings: The process-wide settings.
+    """
+    # Imported here so importing settings stays cheap until a value is needed
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    settings = Settings.from_env()
+    logger.debug(f"Configuration: {settings.additional_config}")
+    return settings
+
+
+def reload_settings():
+    """
+    Drop the cached settings so the next get_settings() re-reads the environment.
+    Returns:
+    - Settings: The freshly loaded settings.
+    """
+    get_settings.cache_clear()
+    return get_settings()
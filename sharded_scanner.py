@@ -0,0 +1,520 @@
+import bisect
+import hashlib
+import itertools
+import multiprocessing
+import os
+import queue
+import time
+import logging
+from settings import get_settings
+from scan_scheduler import ScanScheduler
+from alert_dispatcher import get_alert_dispatcher
+import metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Longest wait in seconds for worker messages before the coordinator checks its workers again
+POLL_INTERVAL = 0.5
+# Seconds a stopping worker gets to finish its queued batches before it is terminated
+STOP_TIMEOUT = 30.0
+
+
+def _hash(value):
+    # Stable across processes and runs, unlike the salted built-in hash()
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """
+    Consistent-hash ring mapping contract addresses to shards.
+    Each shard owns `replicas` virtual points on the ring, so adding or removing a shard only moves the
+    addresses that land on its points (about 1/N of them); every other address keeps its shard and cache.
+    Args:
+    - nodes: iterable - Initial shard ids.
+    - replicas: int - Virtual points per shard (SHARD_VIRTUAL_NODES by default).
+    """
+
+    def __init__(self, nodes=(), replicas=None):
+        self.replicas = max(1, get_settings().shard_virtual_nodes if replicas is None else replicas)
+        self.nodes = set()
+        self._points = []
+        self._owners = []
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def add(self, node):
+        """
+        Add a shard's points to the ring (no-op if it is already on it).
+        Args:
+        - node: int - Shard id.
+        """
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for replica in range(self.replicas):
+            point = _hash(f"shard-{node}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node):
+        """
+        Remove a shard's points from the ring.
+        Args:
+        - node: int - Shard id.
+        """
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def node_for(self, key):
+        """
+        Shard owning a key: the first point clockwise from the key's hash.
+        Args:
+        - key: str - Contract address.
+        Returns:
+        - int: Shard id.
+        Raises:
+        - LookupError: If the ring is empty.
+        """
+        if not self._points:
+            raise LookupError("The hash ring has no shards.")
+        return self._owners[bisect.bisect(self._points, _hash(key)) % len(self._points)]
+
+    def assign(self, keys):
+        """
+        Group keys by owning shard.
+        Args:
+        - keys: iterable - Contract addresses.
+        Returns:
+        - dict: Shard id -> list of addresses, in input order.
+        """
+        groups = {}
+        for key in keys:
+            groups.setdefault(self.node_for(key), []).append(key)
+        return groups
+
+
+def shard_environment(shard_id, shard_count, calls_per_minute=None):
+    """
+    Settings overrides giving a shard process its own slice of the cache, RPC budget and journal.
+    Args:
+    - shard_id: int - Shard id.
+    - shard_count: int - Shards sharing the budget.
+    - calls_per_minute: int - Global RPC budget (API_RATE_LIMIT by default).
+    Returns:
+    - dict: Environment variables for the shard.
+    """
+    settings = get_settings()
+    calls_per_minute = settings.api_rate_limit if calls_per_minute is None else calls_per_minute
+    return {
+        'API_RATE_LIMIT': str(max(1, int(calls_per_minute // shard_count))),
+        'CACHE_DIR': os.path.join(settings.cache_dir, f"shard-{shard_id}"),
+        'CACHE_MAX_ENTRIES': str(max(1, settings.cache_max_entries // shard_count)),
+        'JOURNAL_DIR': os.path.join(settings.journal_dir, f"shard-{shard_id}"),
+        # The coordinator serves and exports the aggregated metrics
+        'METRICS_PORT': '0',
+        'METRICS_EXPORT_PATH': '',
+        'SCAN_SHARDS': '1',
+    }
+
+
+class _ForwardingDispatcher:
+    """Alert dispatcher of a shard process: every alert goes to the coordinator, which sends them all."""
+
+    def __init__(self, shard_id, outbox):
+        self.shard_id = shard_id
+        self._outbox = outbox
+        self._forwarded = 0
+
+    def submit(self, message, contract_address=None):
+        self._outbox.put(('alert', self.shard_id, contract_address, message))
+        self._forwarded += 1
+        return True
+
+    def stats(self):
+        return {'forwarded': self._forwarded, 'queue_depth': 0}
+
+
+def _shard_worker(shard_id, environment, inbox, outbox):
+    """
+    Entry point of a shard process: scans the batches it is sent and reports activity, alerts and metrics.
+    Args:
+    - shard_id: int - Shard id.
+    - environment: dict - Settings overrides from shard_environment.
+    - inbox: multiprocessing.Queue - Commands from the coordinator.
+    - outbox: multiprocessing.Queue - Messages to the coordinator.
+    """
+    os.environ.update(environment)
+    # Under spawn the parent's __main__ (often main.py) was already re-imported as __mp_main__; modules only read
+    # settings when they are used, so re-reading them here gives every shard its own cache, journal and budget
+    from settings import reload_settings
+    reload_settings()
+    from logging_config import setup_logging
+    setup_logging()
+    import main
+    import signal_journal
+    from alert_dispatcher import set_alert_dispatcher
+    from contract_state import get_contract_state
+
+    set_alert_dispatcher(_ForwardingDispatcher(shard_id, outbox))
+    outbox.put(('ready', shard_id, os.getpid()))
+    while True:
+        message = inbox.get()
+        command = message[0]
+        if command == 'stop':
+            break
+        if command == 'budget':
+            main.get_api_rate_limiter().set_rate(message[1] / 60.0)
+            continue
+        _, batch_id, addresses = message
+        # The contract states still hold the previous scan's results, used to measure activity
+        previous = {address: get_contract_state(address).last_analysis for address in addresses}
+        results = {}
+        try:
+            results = main.sweep_contracts(addresses)['results']
+        except Exception as e:
+            logger.error(f"Shard {shard_id} sweep failed: {e}")
+        activity = {address: main.scan_activity(previous[address], results.get(address)) for address in addresses}
+        outbox.put(('result', shard_id, batch_id, activity))
+        if metrics.is_enabled():
+            outbox.put(('metrics', shard_id, metrics.get_registry().snapshot()))
+    signal_journal.flush()
+
+
+class _Shard:
+    """Coordinator-side handle of one shard process."""
+    __slots__ = ('shard_id', 'process', 'inbox', 'inflight', 'backlog', 'stopping', 'ready')
+
+    def __init__(self, shard_id, process, inbox):
+        self.shard_id = shard_id
+        self.process = process
+        self.inbox = inbox
+        self.inflight = set()
+        self.backlog = []
+        self.stopping = False
+        self.ready = False
+
+
+class ShardedScanner:
+    """
+    Scans the watchlist with one worker process per shard so JSON decoding and analysis use every core.
+    Contracts are partitioned by consistent hashing of their address, so each contract always goes to the
+    same shard and that shard's cache. Each shard gets an equal share of API_RATE_LIMIT and of the cache size,
+    and the coordinator admits batches against the global budget, sends every alert through its own
+    dispatcher and serves the shards' metrics labelled by shard. When shards are added or removed, or a worker
+    dies, only the contracts of the affected shard move.
+    Args:
+    - shards: int - Worker processes to start (0 uses one per CPU; SCAN_SHARDS by default).
+    - scheduler: ScanScheduler - Watchlist to scan (the persistent WATCHLIST_PATH one by default).
+    - batch_size: int - Contracts per batch sent to a shard (4 x MAX_CONTRACTS_TO_ANALYZE by default).
+    - max_inflight: int - Batches queued per shard at once (SHARD_MAX_INFLIGHT by default).
+    - replicas: int - Virtual points per shard on the hash ring (SHARD_VIRTUAL_NODES by default).
+    - respawn: bool - Replace workers that die.
+    - calls_per_minute: int - Global RPC budget split between the shards (API_RATE_LIMIT by default).
+    """
+
+    def __init__(self, shards=None, scheduler=None, batch_size=None, max_inflight=None, replicas=None, respawn=True,
+                 calls_per_minute=None):
+        settings = get_settings()
+        shards = settings.scan_shards if shards is None else shards
+        self.initial_shards = shards or os.cpu_count() or 1
+        self.scheduler = scheduler if scheduler is not None else ScanScheduler()
+        self.batch_size = max(1, batch_size or settings.max_contracts_to_analyze * 4)
+        self.max_inflight = max(1, settings.shard_max_inflight if max_inflight is None else max_inflight)
+        self.respawn = respawn
+        self.calls_per_minute = settings.api_rate_limit if calls_per_minute is None else calls_per_minute
+        self._context = multiprocessing.get_context('spawn')
+        self._outbox = self._context.Queue()
+        self._ring = HashRing(replicas=replicas)
+        self._shards = {}
+        self._batches = {}
+        self._batch_ids = itertools.count()
+        self._shard_ids = itertools.count()
+        self._sweep_results = None
+        self._counters = {'batches': 0, 'scanned': 0, 'alerts': 0, 'requeued': 0, 'restarts': 0}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        """Start the initial worker processes."""
+        for _ in range(self.initial_shards):
+            self.add_shard()
+        return self
+
+    # Shard membership
+
+    def _spawn(self, shard_id):
+        inbox = self._context.Queue()
+        environment = shard_environment(shard_id, max(self.initial_shards, len(self._ring) + 1),
+                                        self.calls_per_minute)
+        process = self._context.Process(target=_shard_worker, args=(shard_id, environment, inbox, self._outbox),
+                                        name=f"scan-shard-{shard_id}", daemon=True)
+        process.start()
+        shard = self._shards[shard_id] = _Shard(shard_id, process, inbox)
+        return shard
+
+    def add_shard(self, shard_id=None):
+        """
+        Start a worker and move its share of the contracts to it.
+        Args:
+        - shard_id: int - Id to reuse (e.g. of a worker that died); a new one by default.
+        Returns:
+        - int: The shard id.
+        """
+        shard_id = next(self._shard_ids) if shard_id is None else shard_id
+        self._spawn(shard_id)
+        self._ring.add(shard_id)
+        self._rebalance()
+        logger.info(f"Added scan shard {shard_id} (pid {self._shards[shard_id].process.pid}); "
+                    f"{len(self._ring)} shards")
+        return shard_id
+
+    def remove_shard(self, shard_id):
+        """
+        Stop sending work to a shard and let its worker exit after the batches it already has.
+        Args:
+        - shard_id: int - Shard id.
+        """
+        shard = self._shards.get(shard_id)
+        if shard is None or shard.stopping:
+            return
+        shard.stopping = True
+        self._ring.remove(shard_id)
+        shard.inbox.put(('stop',))
+        self._rebalance()
+        logger.info(f"Removing scan shard {shard_id}; {len(self._ring)} shards")
+
+    def _rebalance(self):
+        """Re-split the RPC budget and re-route contracts not yet sent to a worker."""
+        if not self._ring:
+            return
+        share = max(1, int(self.calls_per_minute // len(self._ring)))
+        backlog = []
+        for shard in self._shards.values():
+            backlog.extend(shard.backlog)
+            shard.backlog = []
+            if not shard.stopping:
+                shard.inbox.put(('budget', share))
+        for shard_id, addresses in self._ring.assign(backlog).items():
+            self._shards[shard_id].backlog.extend(addresses)
+
+    def _reap(self):
+        """Handle workers that exited: requeue their unfinished batches and replace crashed ones."""
+        exited = [shard for shard in self._shards.values() if not shard.process.is_alive()]
+        if not exited:
+            return
+        # A worker's queued messages are all in the pipe once it has exited; take its last results first
+        self._poll(0)
+        # Take crashed workers off the ring first, so their unfinished batches go to the remaining shards
+        for shard in exited:
+            del self._shards[shard.shard_id]
+            if not shard.stopping:
+                logger.error(f"Scan shard {shard.shard_id} exited with code {shard.process.exitcode}")
+                self._ring.remove(shard.shard_id)
+        for shard in exited:
+            shard_id = shard.shard_id
+            for batch_id in shard.inflight:
+                _, addresses, scheduled = self._batches.pop(batch_id)
+                self._requeue(addresses, scheduled)
+            self._requeue(shard.backlog, True)
+            if shard.stopping:
+                logger.info(f"Scan shard {shard_id} stopped")
+                continue
+            if self.respawn and shard.ready:
+                self._counters['restarts'] += 1
+                metrics.count('shard_restarts_total')
+                # Same id, so the shard takes back the same contracts
+                self.add_shard(shard_id)
+            else:
+                self._rebalance()
+
+    def _requeue(self, addresses, scheduled):
+        if not addresses:
+            return
+        if scheduled:
+            for address in addresses:
+                self.scheduler.retry(address)
+        elif not self._ring:
+            # No shard left to take them; the sweep reports these contracts as not scanned
+            logger.error(f"No scan shards left; {len(addresses)} contracts of the sweep were not scanned")
+            return
+        else:
+            # Addresses of a one-off sweep go straight back to their (possibly new) shards
+            for shard_id, group in self._ring.assign(addresses).items():
+                for start in range(0, len(group), self.batch_size):
+                    self._send(self._shards[shard_id], group[start:start + self.batch_size], False)
+        self._counters['requeued'] += len(addresses)
+
+    # Work distribution
+
+    def _send(self, shard, addresses, scheduled):
+        batch_id = next(self._batch_ids)
+        self._batches[batch_id] = (shard.shard_id, addresses, scheduled)
+        shard.inflight.add(batch_id)
+        shard.inbox.put(('scan', batch_id, addresses))
+        self._counters['batches'] += 1
+
+    def _dispatch(self):
+        """Pull due contracts up to the free batch slots and send full batches to their shards."""
+        active = [shard for shard in self._shards.values() if not shard.stopping]
+        if not active:
+            return
+        free = sum(self.max_inflight - len(shard.inflight) for shard in active) * self.batch_size
+        free -= sum(len(shard.backlog) for shard in active)
+        if free > 0:
+            for shard_id, addresses in self._ring.assign(self.scheduler.next_batch(free)).items():
+                self._shards[shard_id].backlog.extend(addresses)
+        for shard in active:
+            while shard.backlog and len(shard.inflight) < self.max_inflight:
+                addresses, shard.backlog = shard.backlog[:self.batch_size], shard.backlog[self.batch_size:]
+                self._send(shard, addresses, True)
+
+    def _handle(self, message):
+        kind, shard_id = message[0], message[1]
+        if kind == 'result':
+            _, _, batch_id, activity = message
+            batch = self._batches.pop(batch_id, None)
+            shard = self._shards.get(shard_id)
+            if shard is not None:
+                shard.inflight.discard(batch_id)
+            if batch is None:
+                return
+            self._counters['scanned'] += len(activity)
+            if batch[2]:
+                for address, value in activity.items():
+                    self.scheduler.record(address, value)
+            elif self._sweep_results is not None:
+                self._sweep_results.update(activity)
+        elif kind == 'alert':
+            _, _, contract_address, text = message
+            self._counters['alerts'] += 1
+            get_alert_dispatcher().submit(text, contract_address)
+        elif kind == 'metrics':
+            metrics.get_registry().absorb(message[2], shard=str(shard_id))
+        elif kind == 'ready':
+            if shard_id in self._shards:
+                self._shards[shard_id].ready = True
+            logger.debug(f"Scan shard {shard_id} ready (pid {message[2]})")
+
+    def _poll(self, timeout):
+        """Handle worker messages, waiting up to timeout seconds for the first one."""
+        try:
+            message = self._outbox.get(timeout=timeout) if timeout > 0 else self._outbox.get_nowait()
+        except queue.Empty:
+            return 0
+        handled = 0
+        while True:
+            self._handle(message)
+            handled += 1
+            try:
+                message = self._outbox.get_nowait()
+            except queue.Empty:
+                return handled
+
+    def sweep(self, contract_addresses, timeout=None):
+        """
+        Scan a list of contracts once across the shards, outside the schedule, and wait for all of them.
+        Args:
+        - contract_addresses: list - Contracts to scan.
+        - timeout: float - Maximum seconds to wait, or None to wait until done.
+        Returns:
+        - dict: Address -> activity (None where unknown) for every contract scanned in time.
+        """
+        self._sweep_results = {}
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        try:
+            for shard_id, addresses in self._ring.assign(contract_addresses).items():
+                for start in range(0, len(addresses), self.batch_size):
+                    self._send(self._shards[shard_id], addresses[start:start + self.batch_size], False)
+            while any(not scheduled for _, _, scheduled in self._batches.values()):
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                self._poll(POLL_INTERVAL)
+                self._reap()
+            return self._sweep_results
+        finally:
+            self._sweep_results = None
+
+    def run(self, idle_sleep=5.0, iterations=None):
+        """
+        Scan the watchlist continuously, rescheduling every contract from the activity its shard reports.
+        Args:
+        - idle_sleep: float - Longest wait while nothing is due.
+        - iterations: int - Stop after this many loop passes (forever by default).
+        """
+        for _ in itertools.count() if iterations is None else range(iterations):
+            self._reap()
+            self._dispatch()
+            wait = 0.0 if any(shard.backlog for shard in self._shards.values()) else idle_sleep
+            if not self._batches:
+                due = self.scheduler.seconds_until_due()
+                wait = min(wait, max(due, 0.1)) if due is not None else wait
+            else:
+                wait = min(wait, POLL_INTERVAL)
+            if self._poll(wait):
+                self.scheduler.save()
+                if metrics.is_enabled():
+                    for shard in self._shards.values():
+                        metrics.gauge('shard_inflight_batches', len(shard.inflight), shard=str(shard.shard_id))
+                    metrics.write_textfile()
+
+    def stats(self):
+        """
+        Coordinator counters and per-shard state.
+        Returns:
+        - dict: Counters plus 'shards' mapping shard ids to pid, in-flight batches and backlog size.
+        """
+        stats = dict(self._counters)
+        stats['shards'] = {shard_id: {'pid': shard.process.pid, 'inflight': len(shard.inflight),
+                                      'backlog': len(shard.backlog), 'stopping': shard.stopping}
+                           for shard_id, shard in self._shards.items()}
+        return stats
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """
+        Stop every worker after its queued batches, terminating those that do not exit in time.
+        Args:
+        - timeout: float - Seconds to wait for the workers.
+        """
+        for shard_id in list(self._shards):
+            self.remove_shard(shard_id)
+        deadline = time.monotonic() + timeout
+        while self._shards and time.monotonic() < deadline:
+            self._poll(POLL_INTERVAL)
+            self._reap()
+        for shard in self._shards.values():
+            logger.warning(f"Terminating scan shard {shard.shard_id}")
+            shard.process.terminate()
+            shard.process.join()
+        self._shards.clear()
+        self.scheduler.save()
+
+
+def run_sharded_scans(shards=None, scheduler=None):
+    """
+    Sharded counterpart of main.run_scheduled_scans: scan the watchlist with one process per shard.
+    Args:
+    - shards: int - Worker processes (0 uses one per CPU; SCAN_SHARDS by default).
+    - scheduler: ScanScheduler - Watchlist to scan (the persistent WATCHLIST_PATH one by default).
+    """
+    from main import DEFAULT_WATCHLIST
+
+    scanner = ShardedScanner(shards, scheduler)
+    metrics.start_http_server()
+    for contract_address in DEFAULT_WATCHLIST:
+        scanner.scheduler.add(contract_address)
+    with scanner:
+        scanner.run()
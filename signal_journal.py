@@ -0,0 +1,516 @@
+import atexit
+import glob
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import logging
+import numpy as np
+from settings import get_settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Record kinds, one per producing stage
+KIND_CONTRACT = 1  # main.analyze_contract_data
+KIND_LEVELS = 2  # analysis.analyze_token_data
+KIND_STRATEGY = 3  # strategy.strategy_analysis
+
+# Meaning of the value slots of each kind; unused slots are NaN
+VALUE_FIELDS = {
+    KIND_CONTRACT: ('entry_point', 'exit_point', 'max_balance', 'min_balance', 'holders', 'gini'),
+    KIND_LEVELS: ('entry_point', 'exit_point', 'support', 'resistance'),
+    KIND_STRATEGY: ('price', 'sma', 'rsi', 'macd', 'signal'),
+}
+KIND_NAMES = {KIND_CONTRACT: 'contract', KIND_LEVELS: 'levels', KIND_STRATEGY: 'strategy'}
+
+# Flag bits
+FLAG_ALERTED = 1
+FLAG_SMA_ENTRY = 2
+FLAG_RSI_ENTRY = 4
+FLAG_MACD_ENTRY = 8
+
+# Fixed-width 64-byte record (little endian):
+#   timestamp f8 | contract id u4 | kind u1 | flags u1 | reserved u2 | 6 x f8 values
+N_VALUES = 6
+RECORD = struct.Struct('<dIBBH6d')
+RECORD_DTYPE = np.dtype([('timestamp', '<f8'), ('contract', '<u4'), ('kind', 'u1'), ('flags', 'u1'),
+                         ('reserved', '<u2'), ('values', '<f8', (N_VALUES,))])
+# Segment files start with a header padded to one record, so records stay 64-byte aligned
+MAGIC = b'ASJ1'
+SEGMENT_HEADER = struct.Struct(f'<4sHH{RECORD.size - 8}x')  # magic, version, record size
+VERSION = 1
+SEGMENT_GLOB = 'signals-*.seg'
+CONTRACTS_FILE = 'contracts.txt'
+INDEX_SUFFIX = '.idx'
+# Records buffered in memory before they are written out
+BUFFER_RECORDS = 4096
+SECONDS_PER_DAY = 86400
+
+_NAN_VALUES = (float('nan'),) * N_VALUES
+
+
+def _pad_values(values):
+    values = tuple(map(float, values[:N_VALUES]))
+    return values + _NAN_VALUES[len(values):]
+
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class _Segment:
+    """Index entry of one segment file: record count, time range and the contracts it holds."""
+    __slots__ = ('path', 'count', 'first', 'last', 'contracts', 'sealed')
+
+    def __init__(self, path, count=0, first=None, last=None, contracts=(), sealed=False):
+        self.path = path
+        self.count = count
+        self.first = first
+        self.last = last
+        self.contracts = set(contracts)
+        self.sealed = sealed
+
+    def records(self):
+        """Read-only memory map of the segment's flushed records."""
+        if not self.count:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.path, dtype=RECORD_DTYPE, mode='r', offset=SEGMENT_HEADER.size, shape=(self.count,))
+
+    def save_index(self):
+        index = {'count': self.count, 'first': self.first, 'last': self.last, 'contracts': sorted(self.contracts)}
+        _write_atomic(self.path + INDEX_SUFFIX, json.dumps(index).encode('utf-8'))
+
+
+class SignalJournal:
+    """
+    Append-only journal of analysis and strategy results in fixed-width binary records.
+    Records are buffered and appended to numbered segment files; a segment is sealed once it holds
+    segment_records records and an index of its time range and contracts is written beside it, so range
+    scans only map the segments that can match. Contract addresses are dictionary-encoded in a side file.
+    Timestamps are kept non-decreasing (a record older than the last one is stamped with the last timestamp),
+    which lets scans binary-search each segment by time. Options left as None take their JOURNAL_* setting.
+    Args:
+    - root: str - Journal directory (created if missing).
+    - segment_records: int - Records per segment file.
+    - flush_interval: float - Seconds buffered records may wait before they are written.
+    - retention_days: float - Sealed segments older than this are deleted (0 keeps everything).
+    """
+
+    def __init__(self, root=None, segment_records=None, flush_interval=None, retention_days=None):
+        settings = get_settings()
+        self.root = root = root or settings.journal_dir
+        self.segment_records = max(1, settings.journal_segment_records if segment_records is None else segment_records)
+        self.flush_interval = settings.journal_flush_interval if flush_interval is None else flush_interval
+        self.retention_days = settings.journal_retention_days if retention_days is None else retention_days
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._buffer = bytearray(BUFFER_RECORDS * RECORD.size)
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._last_timestamp = 0.0
+        self._last_alerted = None
+        self._load_contracts()
+        self._load_segments()
+        self._writer = None
+        self._open_active()
+
+    # Contract dictionary
+
+    def _load_contracts(self):
+        path = os.path.join(self.root, CONTRACTS_FILE)
+        self._contracts = []
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            lines = text.split('\n')
+            # A crash mid-write can leave a partial last line; no record refers to it yet
+            self._contracts = lines[:-1]
+            if lines[-1]:
+                with open(path, 'r+', encoding='utf-8') as f:
+                    f.truncate(len(text.encode('utf-8')) - len(lines[-1].encode('utf-8')))
+        self._contract_ids = {address: i for i, address in enumerate(self._contracts)}
+        self._contracts_file = open(path, 'a', encoding='utf-8')
+
+    def _contract_id(self, contract_address):
+        contract_id = self._contract_ids.get(contract_address)
+        if contract_id is None:
+            contract_id = self._contract_ids[contract_address] = len(self._contracts)
+            self._contracts.append(contract_address)
+            # Written before any record referring to it reaches disk
+            self._contracts_file.write(contract_address + '\n')
+            self._contracts_file.flush()
+        return contract_id
+
+    def contract_address(self, contract_id):
+        """
+        Decode a contract id.
+        Args:
+        - contract_id: int - Id stored in a record.
+        Returns:
+        - str: Contract address.
+        """
+        return self._contracts[contract_id]
+
+    # Segments
+
+    def _load_segments(self):
+        self._segments = []
+        for path in sorted(glob.glob(os.path.join(self.root, SEGMENT_GLOB))):
+            index_path = path + INDEX_SUFFIX
+            if os.path.exists(index_path):
+                with open(index_path, 'r') as f:
+                    index = json.load(f)
+                self._segments.append(_Segment(path, index['count'], index['first'], index['last'],
+                                               index['contracts'], sealed=True))
+            else:
+                self._segments.append(self._scan_segment(path))
+        self._last_timestamp = next((s.last for s in reversed(self._segments) if s.last is not None), 0.0)
+
+    def _scan_segment(self, path):
+        """Rebuild the index of an unsealed segment, dropping a partial record left by a crash."""
+        size = os.path.getsize(path)
+        if size < SEGMENT_HEADER.size:
+            # Created but never written to before a crash
+            with open(path, 'wb') as f:
+                f.write(SEGMENT_HEADER.pack(MAGIC, VERSION, RECORD.size))
+            return _Segment(path)
+        with open(path, 'rb') as f:
+            header = f.read(SEGMENT_HEADER.size)
+        if SEGMENT_HEADER.unpack(header)[0] != MAGIC:
+            raise ValueError(f"{path} is not a signal journal segment.")
+        _, version, record_size = SEGMENT_HEADER.unpack(header)
+        if version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{path} has unsupported version {version} or record size {record_size}.")
+        count, tail = divmod(size - SEGMENT_HEADER.size, RECORD.size)
+        if tail:
+            logger.warning(f"Truncating partial journal record at offset {size - tail} in {path}")
+            with open(path, 'r+b') as f:
+                f.truncate(size - tail)
+        segment = _Segment(path, count)
+        if count:
+            records = segment.records()
+            segment.first = float(records['timestamp'][0])
+            segment.last = float(records['timestamp'][-1])
+            segment.contracts = set(np.unique(records['contract']).tolist())
+        return segment
+
+    def _open_active(self):
+        active = self._segments[-1] if self._segments else None
+        if active is None or active.sealed or active.count >= self.segment_records:
+            if active is not None and not active.sealed:
+                self._seal(active)
+            number = int(os.path.basename(active.path)[8:-4]) + 1 if active is not None else 1
+            active = _Segment(os.path.join(self.root, f"signals-{number:08d}.seg"))
+            with open(active.path, 'wb') as f:
+                f.write(SEGMENT_HEADER.pack(MAGIC, VERSION, RECORD.size))
+            self._segments.append(active)
+        self._active = active
+        self._writer = open(active.path, 'ab')
+
+    def _seal(self, segment):
+        segment.sealed = True
+        segment.save_index()
+
+    def _roll(self):
+        self._writer.close()
+        self._seal(self._active)
+        self._open_active()
+        self._apply_retention()
+
+    def _apply_retention(self):
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * SECONDS_PER_DAY
+        while len(self._segments) > 1 and self._segments[0].sealed and (self._segments[0].last or 0) < cutoff:
+            segment = self._segments.pop(0)
+            for path in (segment.path, segment.path + INDEX_SUFFIX):
+                if os.path.exists(path):
+                    os.remove(path)
+            logger.info(f"Removed expired journal segment {segment.path}")
+
+    # Writing
+
+    def record(self, kind, contract_address, values=(), flags=0, timestamp=None):
+        """
+        Append one result.
+        Args:
+        - kind: int - Record kind (KIND_CONTRACT, KIND_LEVELS or KIND_STRATEGY).
+        - contract_address: str - Contract the result is about.
+        - values: sequence - Up to six numbers, in the order of VALUE_FIELDS[kind].
+        - flags: int - FLAG_* bits.
+        - timestamp: float - Epoch seconds (defaults to now).
+        """
+        values = _pad_values(values)
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if timestamp < self._last_timestamp:
+                timestamp = self._last_timestamp
+            self._last_timestamp = timestamp
+            contract_id = self._contract_id(contract_address)
+            RECORD.pack_into(self._buffer, self._buffered * RECORD.size, timestamp, contract_id, kind, flags, 0,
+                             *values)
+            self._buffered += 1
+            # Buffered records are indexed right away so scans and alert lookups see them after the flush they do
+            active = self._active
+            if active.first is None:
+                active.first = timestamp
+            active.last = timestamp
+            active.contracts.add(contract_id)
+            if flags & FLAG_ALERTED and self._last_alerted is not None:
+                self._last_alerted[(contract_id, kind)] = np.asarray(values)
+            if (self._buffered == BUFFER_RECORDS or self._active.count + self._buffered >= self.segment_records or
+                    time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._buffered:
+            self._writer.write(memoryview(self._buffer)[:self._buffered * RECORD.size])
+            self._writer.flush()
+            self._active.count += self._buffered
+            self._buffered = 0
+            if self._active.count >= self.segment_records:
+                self._roll()
+        self._last_flush = time.monotonic()
+
+    def flush(self, fsync=False):
+        """
+        Write buffered records to the active segment.
+        Args:
+        - fsync: bool - Also force them to stable storage.
+        """
+        with self._lock:
+            self._flush_locked()
+            if fsync:
+                os.fsync(self._writer.fileno())
+
+    def close(self):
+        """Flush and close the journal files."""
+        with self._lock:
+            if self._writer is None:
+                return
+            self._flush_locked()
+            self._writer.close()
+            self._contracts_file.close()
+            self._writer = None
+
+    # Reading
+
+    def _contract_filter(self, contracts):
+        if contracts is None:
+            return None
+        if isinstance(contracts, str):
+            contracts = [contracts]
+        return {self._contract_ids[address] for address in contracts if address in self._contract_ids}
+
+    def iter_scan(self, start=None, end=None, contracts=None, kinds=None):
+        """
+        Yield matching records segment by segment, oldest first, as structured arrays.
+        Only segments whose index overlaps the time range and holds one of the contracts are read.
+        Args:
+        - start: float - Earliest timestamp (inclusive).
+        - end: float - Latest timestamp (exclusive).
+        - contracts: str or list - Contract addresses to keep (all when None).
+        - kinds: int or list - Record kinds to keep (all when None).
+        Returns:
+        - generator: Arrays of RECORD_DTYPE records, copied out of the segment files.
+        """
+        with self._lock:
+            self._flush_locked()
+            segments = [(segment, segment.count) for segment in self._segments]
+            wanted = self._contract_filter(contracts)
+        if wanted is not None and not wanted:
+            return
+        kinds = None if kinds is None else np.atleast_1d(np.asarray(kinds, dtype=np.uint8))
+        wanted_ids = None if wanted is None else np.fromiter(wanted, dtype=np.uint32, count=len(wanted))
+        for segment, count in segments:
+            if not count or (start is not None and segment.last < start) or \
+                    (end is not None and segment.first >= end):
+                continue
+            if wanted is not None and wanted.isdisjoint(segment.contracts):
+                continue
+            records = segment.records()[:count]
+            times = records['timestamp']
+            lo = int(np.searchsorted(times, start, side='left')) if start is not None else 0
+            hi = int(np.searchsorted(times, end, side='left')) if end is not None else count
+            records = records[lo:hi]
+            mask = None
+            if wanted_ids is not None:
+                mask = np.isin(records['contract'], wanted_ids)
+            if kinds is not None:
+                kind_mask = np.isin(records['kind'], kinds)
+                mask = kind_mask if mask is None else mask & kind_mask
+            selected = records[mask] if mask is not None else np.array(records)
+            if len(selected):
+                yield selected
+
+    def scan(self, start=None, end=None, contracts=None, kinds=None):
+        """
+        Read matching records in time order.
+        Args:
+        - start: float - Earliest timestamp (inclusive).
+        - end: float - Latest timestamp (exclusive).
+        - contracts: str or list - Contract addresses to keep (all when None).
+        - kinds: int or list - Record kinds to keep (all when None).
+        Returns:
+        - np.ndarray: RECORD_DTYPE records.
+        """
+        chunks = list(self.iter_scan(start, end, contracts, kinds))
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=RECORD_DTYPE)
+
+    def decode(self, record):
+        """
+        Turn one record into a dict with named values.
+        Args:
+        - record: np.void - A RECORD_DTYPE record.
+        Returns:
+        - dict: timestamp, contract_address, kind name, flags and the kind's value fields.
+        """
+        return self._decode_row(record.tolist())
+
+    def _decode_row(self, row):
+        timestamp, contract_id, kind, flags, _, values = row
+        decoded = {'timestamp': timestamp, 'contract_address': self._contracts[contract_id],
+                   'kind': KIND_NAMES.get(kind, kind), 'flags': flags}
+        # tolist() leaves the values subarray as an ndarray
+        decoded.update(zip(VALUE_FIELDS.get(kind, ()), values.tolist()))
+        return decoded
+
+    def replay(self, handler, start=None, end=None, contracts=None, kinds=None):
+        """
+        Feed matching records, decoded, to a handler in time order.
+        Args:
+        - handler: callable - Called with each decoded record.
+        - start: float - Earliest timestamp (inclusive).
+        - end: float - Latest timestamp (exclusive).
+        - contracts: str or list - Contract addresses to replay (all when None).
+        - kinds: int or list - Record kinds to replay (all when None).
+        Returns:
+        - int: Number of records replayed.
+        """
+        replayed = 0
+        for chunk in self.iter_scan(start, end, contracts, kinds):
+            # tolist() converts a whole chunk to Python values at once, far faster than per-record field access
+            for row in chunk.tolist():
+                handler(self._decode_row(row))
+            replayed += len(chunk)
+        return replayed
+
+    def price_series(self, contract_address, start=None, end=None):
+        """
+        Prices journaled by strategy runs of one contract, ready for strategy_analysis or backtest_strategy.
+        Args:
+        - contract_address: str - Contract address.
+        - start: float - Earliest timestamp (inclusive).
+        - end: float - Latest timestamp (exclusive).
+        Returns:
+        - tuple: (timestamps float64 array, prices float64 array).
+        """
+        records = self.scan(start, end, contract_address, KIND_STRATEGY)
+        return records['timestamp'].copy(), records['values'][:, 0].copy()
+
+    def last_alerted(self, contract_address, kind=KIND_CONTRACT):
+        """
+        Values of the latest alerted record of a contract, surviving restarts.
+        Args:
+        - contract_address: str - Contract address.
+        - kind: int - Record kind.
+        Returns:
+        - np.ndarray: The record's values, or None if no alert was journaled.
+        """
+        with self._lock:
+            if self._last_alerted is None:
+                self._last_alerted = self._load_last_alerted()
+            contract_id = self._contract_ids.get(contract_address)
+            return self._last_alerted.get((contract_id, kind)) if contract_id is not None else None
+
+    def _load_last_alerted(self):
+        last = {}
+        for chunk in self.iter_scan():
+            alerted = chunk[(chunk['flags'] & FLAG_ALERTED) != 0]
+            if not len(alerted):
+                continue
+            keys = alerted['contract'].astype(np.int64) * 256 + alerted['kind']
+            # Index of the last occurrence of every (contract, kind) key
+            _, reversed_index = np.unique(keys[::-1], return_index=True)
+            for i in len(keys) - 1 - reversed_index:
+                last[(int(alerted['contract'][i]), int(alerted['kind'][i]))] = alerted['values'][i].copy()
+        return last
+
+    def is_duplicate_alert(self, contract_address, values, kind=KIND_CONTRACT):
+        """
+        Whether an alert with these values was already sent for the contract, e.g. before a restart.
+        Args:
+        - contract_address: str - Contract address.
+        - values: sequence - Values of the new result.
+        - kind: int - Record kind.
+        Returns:
+        - bool: True if the latest alerted record has the same values.
+        """
+        previous = self.last_alerted(contract_address, kind)
+        return previous is not None and bool(np.allclose(previous, _pad_values(values), rtol=1e-9, atol=0.0,
+                                                         equal_nan=True))
+
+    def stats(self):
+        """
+        Journal size summary.
+        Returns:
+        - dict: Segment count, records on disk and buffered, and known contracts.
+        """
+        with self._lock:
+            return {'segments': len(self._segments), 'records': sum(s.count for s in self._segments),
+                    'buffered': self._buffered, 'contracts': len(self._contracts)}
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_signal_journal():
+    """
+    Return the process-wide journal in JOURNAL_DIR, opening it on first use.
+    Returns:
+    - SignalJournal: The shared journal, or None when JOURNAL_ENABLED is off.
+    """
+    global _journal
+    if not get_settings().journal_enabled:
+        return None
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = SignalJournal()
+                atexit.register(_journal.close)
+    return _journal
+
+
+def record(kind, contract_address, values=(), flags=0):
+    """
+    Append a result to the shared journal; does nothing when journaling is disabled.
+    Args:
+    - kind: int - Record kind.
+    - contract_address: str - Contract the result is about.
+    - values: sequence - Values in the order of VALUE_FIELDS[kind].
+    - flags: int - FLAG_* bits.
+    """
+    journal = get_signal_journal()
+    if journal is not None:
+        try:
+            journal.record(kind, contract_address, values, flags)
+        except OSError as e:
+            logger.error(f"Failed to journal {KIND_NAMES.get(kind, kind)} result for {contract_address}: {e}")
+
+
+def flush():
+    """Write buffered records of the shared journal, if it is open."""
+    if _journal is not None:
+        _journal.flush()
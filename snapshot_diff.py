@@ -0,0 +1,188 @@
+from collections import namedtuple
+import logging
+import numpy as np
+from settings import get_settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Delta kinds
+NEW_HOLDER = 'new_holder'
+EXITED_HOLDER = 'exited_holder'
+BALANCE_CHANGE = 'balance_change'
+
+# A typed change for one token account. Amounts are UI amounts; change is relative to the old amount.
+Delta = namedtuple('Delta', ['kind', 'pubkey', 'old_amount', 'new_amount', 'change'])
+
+
+def account_fingerprint(account):
+    """
+    Reduce a jsonParsed token account to (raw amount, decimals, owner hash).
+    Args:
+    - account: dict - The 'account' object of a token-account entry.
+    Returns:
+    - tuple: The fingerprint, or None if the account is not a parsed token account.
+    """
+    try:
+        info = account['data']['parsed']['info']
+        token_amount = info['tokenAmount']
+        return int(token_amount['amount']), int(token_amount['decimals']), hash(info['owner'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class SnapshotDiffer:
+    """
+    Tracks token accounts of one contract as compact per-pubkey fingerprints and emits typed deltas.
+    Only (raw amount, decimals, owner hash) is kept per account, so memory is constant per holder and
+    each diff is a single linear pass.
+    """
+    __slots__ = ('_fingerprints', 'total_amount', 'initialized')
+
+    def __init__(self):
+        self._fingerprints = {}
+        self.total_amount = 0.0
+        self.initialized = False
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def balances(self):
+        """
+        Current UI balance of every tracked account.
+        Returns:
+        - np.ndarray: float64 balances.
+        """
+        return np.fromiter((self._ui(raw, decimals) for raw, decimals, _ in self._fingerprints.values()),
+                           dtype=np.float64, count=len(self._fingerprints))
+
+    @staticmethod
+    def _ui(raw, decimals):
+        return raw / 10 ** decimals
+
+    def _delta(self, pubkey, old, new):
+        if old is None:
+            return Delta(NEW_HOLDER, pubkey, 0.0, self._ui(new[0], new[1]), float('inf'))
+        if new is None:
+            return Delta(EXITED_HOLDER, pubkey, self._ui(old[0], old[1]), 0.0, -1.0)
+        if old[2] != new[2]:
+            # Owner changed: the account moved to a different holder
+            return None
+        old_amount, new_amount = self._ui(old[0], old[1]), self._ui(new[0], new[1])
+        change = (new_amount - old_amount) / old_amount if old_amount else float('inf')
+        return Delta(BALANCE_CHANGE, pubkey, old_amount, new_amount, change)
+
+    def diff(self, entries):
+        """
+        Replace the snapshot with a full getTokenAccountsByOwner result and return what changed.
+        The first call only records the baseline and returns no deltas.
+        Args:
+        - entries: list - Token-account entries ({'pubkey', 'account'}).
+        Returns:
+        - list: Delta records.
+        """
+        previous = self._fingerprints
+        current = {}
+        deltas = []
+        for entry in entries:
+            fingerprint = account_fingerprint(entry['account'])
+            if fingerprint is None:
+                continue
+            pubkey = entry['pubkey']
+            current[pubkey] = fingerprint
+            old = previous.get(pubkey)
+            if old != fingerprint:
+                deltas.extend(self._changes(pubkey, old, fingerprint))
+        for pubkey, old in previous.items():
+            if pubkey not in current:
+                deltas.append(self._delta(pubkey, old, None))
+
+        self._fingerprints = current
+        self.total_amount = sum(self._ui(raw, decimals) for raw, decimals, _ in current.values())
+        if not self.initialized:
+            self.initialized = True
+            return []
+        return deltas
+
+    def apply(self, entries):
+        """
+        Apply partial updates (e.g. websocket notifications); an entry with account=None removes the account.
+        Args:
+        - entries: list - Changed token-account entries.
+        Returns:
+        - list: Delta records.
+        """
+        deltas = []
+        for entry in entries:
+            pubkey = entry['pubkey']
+            old = self._fingerprints.get(pubkey)
+            new = account_fingerprint(entry['account']) if entry['account'] is not None else None
+            if old == new:
+                continue
+            if new is None:
+                del self._fingerprints[pubkey]
+            else:
+                self._fingerprints[pubkey] = new
+            if old is not None:
+                self.total_amount -= self._ui(old[0], old[1])
+            if new is not None:
+                self.total_amount += self._ui(new[0], new[1])
+            deltas.extend(self._changes(pubkey, old, new))
+        self.initialized = True
+        return deltas
+
+    def _changes(self, pubkey, old, new):
+        delta = self._delta(pubkey, old, new)
+        if delta is not None:
+            return [delta]
+        # Ownership moved: report it as the old holder exiting and a new one arriving
+        return [self._delta(pubkey, old, None), self._delta(pubkey, None, new)]
+
+    def significant(self, deltas, threshold=None):
+        """
+        Filter deltas down to those worth alerting on.
+        Balance changes qualify when they move the account by at least `threshold` of its old balance;
+        new and exited holders qualify when their balance is at least `threshold` of the tracked total.
+        Args:
+        - deltas: list - Delta records.
+        - threshold: float - Relative threshold (ALERT_THRESHOLD by default).
+        Returns:
+        - list: Significant Delta records.
+        """
+        threshold = get_settings().alert_threshold if threshold is None else threshold
+        selected = []
+        for delta in deltas:
+            if delta.kind == BALANCE_CHANGE:
+                if abs(delta.change) >= threshold:
+                    selected.append(delta)
+            else:
+                amount = delta.new_amount if delta.kind == NEW_HOLDER else delta.old_amount
+                if self._share(amount) >= threshold:
+                    selected.append(delta)
+        return selected
+
+    def _share(self, ui_amount):
+        return ui_amount / self.total_amount if self.total_amount > 0 else 1.0
+
+
+def format_deltas(contract_address, deltas, limit=10):
+    """
+    Format deltas as an alert message.
+    Args:
+    - contract_address: str - Contract the deltas belong to.
+    - deltas: list - Delta records.
+    - limit: int - Maximum number of deltas listed individually.
+    Returns:
+    - str: The message.
+    """
+    lines = [f"Holder changes for {contract_address}:"]
+    for delta in sorted(deltas, key=lambda d: abs(d.new_amount - d.old_amount), reverse=True)[:limit]:
+        if delta.kind == NEW_HOLDER:
+            lines.append(f"+ New holder {delta.pubkey}: {delta.new_amount:,.2f}")
+        elif delta.kind == EXITED_HOLDER:
+            lines.append(f"- Exited holder {delta.pubkey}: {delta.old_amount:,.2f}")
+        else:
+            lines.append(f"~ {delta.pubkey}: {delta.old_amount:,.2f} -> {delta.new_amount:,.2f} ({delta.change:+.1%})")
+    if len(deltas) > limit:
+        lines.append(f"... and {len(deltas) - limit} more")
+    return "\n".join(lines)
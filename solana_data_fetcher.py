@@ -1,14 +1,10 @@
-import requests
-from solana.rpc.api import Client
-from config import SOLANA_API_URL, SOLANA_API_KEY
+from rpc_batch import fetch_token_accounts_batch, token_accounts_params
+from rpc_router import get_rpc_router
 import logging
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Solana client setup
-solana_client = Client(SOLANA_API_URL)
-
 def fetch_solana_token_data(contract_address):
     """
     Fetch token data from Solana blockchain using contract address.
@@ -19,9 +15,7 @@ def fetch_solana_token_data(contract_address):
     """
     logger.info(f"Fetching data for contract: {contract_address}")
     try:
-        result = solana_client.get_token_accounts_by_owner(
-            contract_address, {'mint': 'mint_address_here'}
-        )
+        result = get_rpc_router().rpc_call('getTokenAccountsByOwner', token_accounts_params(contract_address))
         if result.get('result'):
             logger.info(f"Data fetched successfully for {contract_address}")
             return result['result']['value']
@@ -47,4 +41,18 @@ def fetch_contract_info(contract_address):
             return contract_data
         else:
             return None
-    e
+    except Exception as e:
+        logger.error(f"Error fetching contract info for {contract_address}: {e}")
+        return None
+
+def fetch_solana_token_data_batch(contract_addresses):
+    """
+    Fetch token data for many contracts in batched JSON-RPC round trips.
+    Args:
+    - contract_addresses: list - The contract addresses to fetch data for.
+    Returns:
+    - dict: Maps each address to its contract data, or None if that address failed.
+    """
+    logger.info(f"Fetching data for {len(contract_addresses)} contracts in batches")
+    results = fetch_token_accounts_batch(contract_addresses)
+    return {address: entry['data'] for address, entry in results.items()}
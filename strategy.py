@@ -1,5 +1,9 @@
 import numpy as np
 import logging
+import metrics
+import signal_journal
+from indicators import sma_series, macd_series, rsi_series
+from contract_state import ContractState
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -11,27 +15,20 @@ def moving_average(prices, window=14):
     - prices: list - Historical price data (e.g., closing prices).
     - window: int - The window size for the moving average.
     Returns:
-    - list: Calculated moving average values.
+    - np.ndarray: Calculated moving average values (one per complete window).
     """
-    return np.convolve(prices, np.ones(window), 'valid') / window
+    return sma_series(prices, window)[window - 1:]
 
 def relative_strength_index(prices, window=14):
     """
-    Calculate the Relative Strength Index (RSI) for a given window.
+    Calculate Wilder's Relative Strength Index (RSI) for a given window.
     Args:
     - prices: list - Historical price data.
     - window: int - The window size for calculating RSI.
     Returns:
-    - float: The RSI value for the given price data.
+    - float: The latest RSI value, or NaN if there are not more than window prices.
     """
-    delta = np.diff(prices)
-    gain = (delta.where(delta > 0, 0)).mean()
-    loss = (-delta.where(delta < 0, 0)).mean()
-    
-    rs = gain / loss if loss != 0 else 0
-    rsi = 100 - (100 / (1 + rs))
-    
-    return rsi
+    return rsi_series(prices, window)[-1] if len(prices) else np.nan
 
 def macd(prices, fast=12, slow=26, signal=9):
     """
@@ -42,24 +39,24 @@ def macd(prices, fast=12, slow=26, signal=9):
     - slow: int - The slow EMA window size.
     - signal: int - The signal line window size.
     Returns:
-    - dict: Contains the MACD line and Signal line.
+    - dict: Contains the MACD line and Signal line, aligned with prices (NaN while warming up).
     """
-    ema_fast = moving_average(prices, fast)
-    ema_slow = moving_average(prices, slow)
-    
-    macd_line = ema_fast - ema_slow
-    signal_line = moving_average(macd_line, signal)
-    
-    return {'macd': macd_line, 'signal': signal_line}
+    values = macd_series(prices, fast, slow, signal)
+    return {'macd': values['macd'], 'signal': values['signal']}
 
+@metrics.timed('strategy')
 def strategy_analysis(prices):
     """
     Apply multiple strategies and generate entry/exit signals.
     Args:
-    - prices: list - Historical price data.
+    - prices: list - Historical price data, or a ContractState whose price history is used without copying.
     Returns:
     - dict: Entry and exit signals based on strategies.
     """
+    contract_address = None
+    if isinstance(prices, ContractState):
+        contract_address = prices.address
+        prices = prices.prices.view()
     signals = {}
     
     # Moving Average Strategy
@@ -74,5 +71,13 @@ def strategy_analysis(prices):
     macd_values = macd(prices)
     signals['macd_entry'] = macd_values['macd'][-1] > macd_values['signal'][-1]  # MACD crossing above signal
     
-    logger.info(f"Strategy signals: {signals}")
+    if contract_address is not None:
+        flags = ((signal_journal.FLAG_SMA_ENTRY if signals['sma_entry'] else 0) |
+                 (signal_journal.FLAG_RSI_ENTRY if signals['rsi_entry'] else 0) |
+                 (signal_journal.FLAG_MACD_ENTRY if signals['macd_entry'] else 0))
+        signal_journal.record(signal_journal.KIND_STRATEGY, contract_address,
+                              (prices[-1], sma[-1], rsi_value, macd_values['macd'][-1], macd_values['signal'][-1]),
+                              flags)
+    
+    logger.debug(f"Strategy signals: {signals}")
     return signals
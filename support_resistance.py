@@ -0,0 +1,303 @@
+from collections import deque
+import logging
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Price grid resolution used when clustering pivots into levels
+DEFAULT_BINS = 200
+# Kernel half-width in bandwidths; the Gaussian is negligible beyond it
+KERNEL_RADIUS = 3.0
+
+
+# Batch mode: vectorized over a whole price history
+
+def _sliding_extreme(values, window, ufunc):
+    """
+    Trailing sliding min or max in O(n) (van Herk/Gil-Werman block scans), NaN-padded to the input length.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    out = np.full(n, np.nan)
+    if window <= 0 or n < window:
+        return out
+    fill = np.inf if ufunc is np.minimum else -np.inf
+    padded = np.concatenate([values, np.full((-n) % window, fill)]).reshape(-1, window)
+    prefix = ufunc.accumulate(padded, axis=1).ravel()
+    suffix = ufunc.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    starts = np.arange(n - window + 1)
+    out[window - 1:] = ufunc(suffix[starts], prefix[starts + window - 1])
+    return out
+
+
+def rolling_min_max(prices, window):
+    """
+    Trailing rolling minimum and maximum.
+    Args:
+    - prices: array-like - Price history, oldest first.
+    - window: int - Window size in ticks.
+    Returns:
+    - tuple: (mins, maxs) arrays aligned with prices (NaN until the window fills).
+    """
+    return _sliding_extreme(prices, window, np.minimum), _sliding_extreme(prices, window, np.maximum)
+
+
+def local_extrema(prices, order=5):
+    """
+    Find pivot lows and highs: ticks that are the minimum/maximum of the 2*order+1 ticks centred on them.
+    Args:
+    - prices: array-like - Price history, oldest first.
+    - order: int - Ticks on each side a pivot must dominate.
+    Returns:
+    - tuple: (low indices, high indices) as integer arrays.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    span = 2 * order + 1
+    if len(prices) < span:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    mins, maxs = rolling_min_max(prices, span)
+    # The trailing window ending at t + order is centred on t
+    centre = prices[order:len(prices) - order]
+    lows = np.flatnonzero(centre == mins[span - 1:]) + order
+    highs = np.flatnonzero(centre == maxs[span - 1:]) + order
+    return lows, highs
+
+
+def cluster_levels(pivot_prices, weights=None, bins=DEFAULT_BINS, bandwidth=None, max_levels=5):
+    """
+    Cluster pivot prices into price levels with a weighted histogram smoothed by a Gaussian kernel (a binned KDE).
+    Positive prices are clustered in log space, so levels of low-priced and high-priced tokens behave alike.
+    Args:
+    - pivot_prices: array-like - Prices of local extrema.
+    - weights: array-like - Optional weight per pivot (e.g. traded volume); defaults to 1.
+    - bins: int - Number of histogram bins over the pivot price range.
+    - bandwidth: float - Kernel bandwidth in (log-)price units (Scott's rule when omitted).
+    - max_levels: int - Maximum number of levels returned.
+    Returns:
+    - list: Levels sorted by price, each a dict with 'price', 'strength' (0-1, relative density) and 'touches'.
+    """
+    prices = np.asarray(pivot_prices, dtype=np.float64)
+    weights = np.ones(len(prices)) if weights is None else np.asarray(weights, dtype=np.float64)
+    valid = np.isfinite(prices) & np.isfinite(weights)
+    prices, weights = prices[valid], weights[valid]
+    if not len(prices):
+        return []
+    if weights.sum() <= 0:
+        weights = np.ones(len(prices))
+
+    use_log = prices.min() > 0
+    x = np.log(prices) if use_log else prices
+    lo, hi = x.min(), x.max()
+    if hi == lo:
+        return [{'price': float(prices[0]), 'strength': 1.0, 'touches': int(len(prices))}]
+
+    hist, edges = np.histogram(x, bins=bins, range=(lo, hi), weights=weights)
+    bin_width = edges[1] - edges[0]
+    if bandwidth is None:
+        bandwidth = 1.06 * x.std() * len(x) ** -0.2
+    bandwidth = max(bandwidth, bin_width)
+    sigma = bandwidth / bin_width
+    radius = int(np.ceil(KERNEL_RADIUS * sigma))
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+    density = np.convolve(hist, kernel, mode='full')[radius:radius + bins]
+
+    # Peaks of the smoothed density (edges count as peaks when the density falls away from them)
+    padded = np.concatenate(([-np.inf], density, [-np.inf]))
+    peaks = np.flatnonzero((density > padded[:-2]) & (density >= padded[2:]) & (density > 0))
+    peaks = peaks[np.argsort(density[peaks])[::-1][:max_levels]]
+    if not len(peaks):
+        return []
+
+    centres = (edges[peaks] + edges[peaks + 1]) / 2
+    # Each level is refined to the weighted mean of the pivots within one bandwidth of its peak
+    near = np.abs(x[:, None] - centres[None, :]) <= bandwidth
+    near_weights = near * weights[:, None]
+    totals = near_weights.sum(axis=0)
+    refined = np.where(totals > 0, (near_weights * x[:, None]).sum(axis=0) / np.where(totals > 0, totals, 1), centres)
+    level_prices = np.exp(refined) if use_log else refined
+    strengths = density[peaks] / density.max()
+
+    order = np.argsort(level_prices)
+    return [
+        {'price': float(level_prices[i]), 'strength': float(strengths[i]), 'touches': int(near[:, i].sum())}
+        for i in order
+    ]
+
+
+def _split_levels(levels, last_price, low, high):
+    supports = sorted((level for level in levels if level['price'] <= last_price),
+                      key=lambda level: level['price'], reverse=True)
+    resistances = sorted((level for level in levels if level['price'] > last_price),
+                         key=lambda level: level['price'])
+    return {
+        'support': supports[0]['price'] if supports else float(low),
+        'resistance': resistances[0]['price'] if resistances else float(high),
+        'supports': supports,
+        'resistances': resistances,
+    }
+
+
+def support_resistance_levels(prices, volumes=None, order=5, bins=DEFAULT_BINS, max_levels=5, window=None):
+    """
+    Detect support and resistance levels by clustering pivot highs and lows, weighted by volume.
+    Args:
+    - prices: array-like - Price history, oldest first.
+    - volumes: array-like - Optional volume per tick, used to weight pivots.
+    - order: int - Ticks on each side a pivot must dominate.
+    - bins: int - Histogram bins used for clustering.
+    - max_levels: int - Maximum number of levels detected.
+    - window: int - Only use the most recent window ticks (all when omitted).
+    Returns:
+    - dict: Nearest 'support' below and 'resistance' above the last price (window low/high when there is no level
+      on that side), plus all 'supports' and 'resistances' nearest first.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    volumes = None if volumes is None else np.asarray(volumes, dtype=np.float64)
+    if window is not None:
+        prices = prices[-window:]
+        volumes = None if volumes is None else volumes[-window:]
+    lows, highs = local_extrema(prices, order)
+    pivots = np.concatenate([lows, highs])
+    levels = cluster_levels(prices[pivots], None if volumes is None else volumes[pivots], bins=bins,
+                            max_levels=max_levels)
+    return _split_levels(levels, prices[-1], np.nanmin(prices), np.nanmax(prices))
+
+
+# Streaming mode: O(1) amortized update per tick
+
+def _push_extreme(queue, index, price, window, dominates):
+    """Push a tick onto a monotonic deque of (index, price) and drop ticks that left the window."""
+    while queue and dominates(price, queue[-1][1]):
+        queue.pop()
+    queue.append((index, price))
+    while queue[0][0] <= index - window:
+        queue.popleft()
+
+
+def _less_equal(a, b):
+    return a <= b
+
+
+def _greater_equal(a, b):
+    return a >= b
+
+
+class SupportResistanceTracker:
+    """
+    Streaming support/resistance: sliding-window low/high via monotonic deques, pivot detection as ticks arrive,
+    and levels clustered from the most recent pivots (recomputed lazily only after a new pivot).
+    Args:
+    - window: int - Window for the rolling low/high.
+    - order: int - Ticks on each side a pivot must dominate.
+    - max_pivots: int - Most recent pivots kept for clustering.
+    - bins: int - Histogram bins used for clustering.
+    - max_levels: int - Maximum number of levels detected.
+    """
+    __slots__ = ('window', 'order', 'bins', 'max_levels', 'count', 'last_price',
+                 '_window_min', '_window_max', '_centre_min', '_centre_max', '_recent', '_pivots', '_levels')
+
+    def __init__(self, window=200, order=5, max_pivots=256, bins=DEFAULT_BINS, max_levels=5):
+        self.window = window
+        self.order = order
+        self.bins = bins
+        self.max_levels = max_levels
+        self.count = 0
+        self.last_price = None
+        self._window_min = deque()
+        self._window_max = deque()
+        self._centre_min = deque()
+        self._centre_max = deque()
+        self._recent = deque(maxlen=2 * order + 1)
+        self._pivots = deque(maxlen=max_pivots)
+        self._levels = None
+
+    @classmethod
+    def from_history(cls, prices, volumes=None, **kwargs):
+        """
+        Build a tracker and replay a price history through it.
+        Args:
+        - prices: iterable - Historical price data, oldest first.
+        - volumes: iterable - Optional volume per tick.
+        - kwargs: Tracker parameters passed to the constructor.
+        Returns:
+        - SupportResistanceTracker: The warmed-up tracker.
+        """
+        tracker = cls(**kwargs)
+        if volumes is None:
+            for price in prices:
+                tracker.update(float(price))
+        else:
+            for price, volume in zip(prices, volumes):
+                tracker.update(float(price), float(volume))
+        return tracker
+
+    @property
+    def low(self):
+        """Lowest price in the current window."""
+        return self._window_min[0][1] if self._window_min else None
+
+    @property
+    def high(self):
+        """Highest price in the current window."""
+        return self._window_max[0][1] if self._window_max else None
+
+    def update(self, price, volume=1.0):
+        """
+        Feed one tick.
+        Args:
+        - price: float - Latest price.
+        - volume: float - Volume traded at this tick, used to weight pivots.
+        Returns:
+        - bool: True if the tick confirmed a new pivot.
+        """
+        index = self.count
+        self.count += 1
+        self.last_price = price
+        _push_extreme(self._window_min, index, price, self.window, _less_equal)
+        _push_extreme(self._window_max, index, price, self.window, _greater_equal)
+
+        span = 2 * self.order + 1
+        _push_extreme(self._centre_min, index, price, span, _less_equal)
+        _push_extreme(self._centre_max, index, price, span, _greater_equal)
+        self._recent.append((price, volume))
+        if self.count < span:
+            return False
+
+        # The tick `order` steps back is now centred in a full window
+        centre_price, centre_volume = self._recent[self.order]
+        pivot = False
+        if centre_price == self._centre_min[0][1]:
+            self._pivots.append((centre_price, centre_volume))
+            pivot = True
+        if centre_price == self._centre_max[0][1]:
+            self._pivots.append((centre_price, centre_volume))
+            pivot = True
+        if pivot:
+            self._levels = None
+        return pivot
+
+    def levels(self):
+        """
+        Clustered levels from the retained pivots.
+        Returns:
+        - list: Levels as returned by cluster_levels.
+        """
+        if self._levels is None:
+            if self._pivots:
+                pivots = np.array(self._pivots, dtype=np.float64)
+                self._levels = cluster_levels(pivots[:, 0], pivots[:, 1], bins=self.bins, max_levels=self.max_levels)
+            else:
+                self._levels = []
+        return self._levels
+
+    def snapshot(self):
+        """
+        Current support and resistance relative to the last price.
+        Returns:
+        - dict: Same shape as support_resistance_levels, or None before the first tick.
+        """
+        if self.last_price is None:
+            return None
+        return _split_levels(self.levels(), self.last_price, self.low, self.high)
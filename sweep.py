@@ -0,0 +1,139 @@
+import itertools
+import math
+import os
+import shutil
+import tempfile
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from backtest import backtest_strategy, sma_macd_strategy
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# One row per (contract, parameter set) job
+RESULT_DTYPE = np.dtype([
+    ('contract', np.int32),
+    ('params', np.int32),
+    ('final_equity', np.float64),
+    ('total_return', np.float64),
+    ('max_drawdown', np.float64),
+    ('num_trades', np.int32),
+    ('win_rate', np.float64),
+])
+
+# Per-worker view of the shared price file, set by _attach_prices
+_prices = None
+_offsets = None
+
+
+def parameter_grid(**axes):
+    """
+    Expand parameter axes into a list of parameter sets.
+    Args:
+    - axes: Keyword arguments mapping a strategy parameter to the values to try (e.g. sma_window=[10, 14, 20]).
+    Returns:
+    - list: One dict per combination.
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(axes[name] for name in names))]
+
+
+def _attach_prices(path, total_length, offsets):
+    global _prices, _offsets
+    _prices = np.memmap(path, dtype=np.float64, mode='r', shape=(total_length,))
+    _offsets = offsets
+    # Thousands of backtests per worker would otherwise log one INFO line each
+    logging.getLogger('backtest').setLevel(logging.WARNING)
+
+
+def _run_jobs(jobs, param_sets, strategy, initial_balance, fee_rate):
+    rows = []
+    for contract_index, params_index in jobs:
+        start, length = _offsets[contract_index]
+        prices = _prices[start:start + length]
+        summary = backtest_strategy(contract_index, prices, strategy=strategy, initial_balance=initial_balance,
+                                    fee_rate=fee_rate, **param_sets[params_index])['summary']
+        rows.append((contract_index, params_index, summary['final_equity'], summary['total_return'],
+                     summary['max_drawdown'], summary['num_trades'], summary['win_rate']))
+    return rows
+
+
+def run_parameter_sweep(price_series, param_sets, strategy=sma_macd_strategy, max_workers=None, chunk_size=None,
+                        initial_balance=1000, fee_rate=0.0, on_result=None):
+    """
+    Backtest every (contract x parameter set) combination across a process pool.
+    Prices are written once to a memory-mapped file that every worker maps read-only, so no price data is
+    pickled per task.
+    Args:
+    - price_series: dict - Contract address -> price array.
+    - param_sets: list - Strategy keyword-argument dicts (see parameter_grid).
+    - strategy: callable - Module-level strategy function accepted by backtest_strategy.
+    - max_workers: int - Worker processes (defaults to the CPU count).
+    - chunk_size: int - Jobs per task (defaults to about four tasks per worker).
+    - initial_balance: float - Starting balance per backtest.
+    - fee_rate: float - Proportional fee per fill.
+    - on_result: callable - Optional callback receiving each result row as it arrives.
+    Returns:
+    - dict: 'contracts' (list of addresses), 'params' (param_sets) and 'table' (structured array of RESULT_DTYPE).
+    """
+    contracts = list(price_series)
+    max_workers = max_workers or os.cpu_count() or 1
+    jobs = [(c, p) for c in range(len(contracts)) for p in range(len(param_sets))]
+    table = np.zeros(len(jobs), dtype=RESULT_DTYPE)
+    if not jobs:
+        return {'contracts': contracts, 'params': param_sets, 'table': table}
+    chunk_size = chunk_size or max(1, math.ceil(len(jobs) / (max_workers * 4)))
+
+    workdir = tempfile.mkdtemp(prefix='alphascout-sweep-')
+    try:
+        offsets = []
+        total_length = sum(len(prices) for prices in price_series.values())
+        path = os.path.join(workdir, 'prices.f64')
+        shared = np.memmap(path, dtype=np.float64, mode='w+', shape=(max(1, total_length),))
+        position = 0
+        for contract in contracts:
+            prices = np.asarray(price_series[contract], dtype=np.float64)
+            shared[position:position + len(prices)] = prices
+            offsets.append((position, len(prices)))
+            position += len(prices)
+        shared.flush()
+        del shared
+
+        filled = 0
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_prices,
+                                 initargs=(path, max(1, total_length), offsets)) as executor:
+            futures = [
+                executor.submit(_run_jobs, jobs[i:i + chunk_size], param_sets, strategy, initial_balance, fee_rate)
+                for i in range(0, len(jobs), chunk_size)
+            ]
+            for future in as_completed(futures):
+                for row in future.result():
+                    table[filled] = row
+                    filled += 1
+                    if on_result is not None:
+                        on_result(contracts[row[0]], param_sets[row[1]], row)
+        logger.info(f"Parameter sweep finished: {len(contracts)} contracts x {len(param_sets)} parameter sets")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {'contracts': contracts, 'params': param_sets, 'table': table}
+
+
+def sweep_results_frame(results):
+    """
+    Expand a sweep result table into a DataFrame with contract addresses and parameter columns.
+    Args:
+    - results: dict - Output of run_parameter_sweep.
+    Returns:
+    - pd.DataFrame: One row per job, sorted by total return.
+    """
+    # Imported here so running a sweep does not pay for pandas unless a frame is requested
+    import pandas as pd
+
+    table = results['table']
+    frame = pd.DataFrame(table)
+    frame['contract'] = np.asarray(results['contracts'], dtype=object)[table['contract']]
+    params = pd.DataFrame(results['params']).iloc[table['params']].reset_index(drop=True)
+    frame = pd.concat([frame.drop(columns='params'), params], axis=1)
+    return frame.sort_values('total_return', ascending=False, ignore_index=True)
@@ -1,25 +1,16 @@
-import requests
 import logging
-from config import BOT_TOKEN, CHAT_ID, SEND_ALERTS
+from alert_dispatcher import get_alert_dispatcher
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-def send_telegram_alert(message):
+def send_telegram_alert(message, contract_address=None):
     """
-    Send a Telegram alert to the specified chat ID.
+    Queue a Telegram alert for the configured chat; delivery happens in the background.
     Args:
     - message: str - The message to send.
+    - contract_address: str - Contract the alert is about, used to coalesce repeated alerts.
+    Returns:
+    - bool: True if the alert was queued.
     """
-    if SEND_ALERTS and CHAT_ID:
-        try:
-            url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-            payload = {'chat_id': CHAT_ID, 'text': message}
-            response = requests.post(url, data=payload)
-            
-            if response.status_code == 200:
-                logger.info(f"Alert sent to Telegram chat {CHAT_ID}")
-            else:
-                logger.error(f"Failed to send alert. Response: {response.text}")
-        except Exception as e:
-            logger.error(f"Error sending Telegram alert: {e}")
+    return get_alert_dispatcher().submit(message, contract_address)
@@ -0,0 +1,88 @@
+import json
+import os
+import sys
+import tempfile
+import pytest
+
+# Tests import the application modules and benchmarks/ helpers from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Analysis and strategy calls journal their results; keep those records out of the working tree
+os.environ.setdefault('JOURNAL_DIR', tempfile.mkdtemp(prefix='alphascout-journal-'))
+
+from benchmarks.fake_rpc import FakeSolanaRpc
+from settings import reload_settings
+
+
+class FlakyRpc(FakeSolanaRpc):
+    """
+    FakeSolanaRpc answering chosen requests (numbered from 1 in arrival order) with 503, and calls for chosen
+    owners with a JSON-RPC error.
+    """
+
+    def __init__(self, *args, fail_requests=(), bad_owners=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_requests = set(fail_requests)
+        self.bad_owners = set(bad_owners)
+
+    def accounts(self, owner):
+        """Token accounts served for an owner, decoded."""
+        return json.loads(self.accounts_json(owner))
+
+    def _reply(self, call):
+        if (call.get('params') or [None])[0] in self.bad_owners:
+            error = json.dumps({'code': -32602, 'message': 'Invalid param'})
+            return '{"jsonrpc":"2.0","id":' + json.dumps(call.get('id')) + ',"error":' + error + '}'
+        return super()._reply(call)
+
+    def handle(self, body):
+        with self._lock:
+            failed = self.requests + 1 in self.fail_requests
+            if failed:
+                self.requests += 1
+        if failed:
+            return 503, b'{"error":"service unavailable"}'
+        return super().handle(body)
+
+
+@pytest.fixture
+def rpc_servers():
+    """Start FlakyRpc servers on demand: rpc_servers(latency=..., fail_requests=...); all are stopped afterwards."""
+    servers = []
+
+    def start(**kwargs):
+        kwargs.setdefault('accounts_per_owner', 20)
+        servers.append(FlakyRpc(**kwargs).start())
+        return servers[-1]
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def fake_rpc():
+    """Local fake Solana JSON-RPC server."""
+    with FakeSolanaRpc(accounts_per_owner=50, seed=1) as rpc:
+        yield rpc
+
+
+@pytest.fixture
+def app_env(monkeypatch, tmp_path, fake_rpc):
+    """
+    Point the settings at the fake RPC and a scratch directory, the way benchmarks.suite.configure_environment
+    does, and restore them afterwards.
+    """
+    monkeypatch.setenv('SOLANA_API_URL', fake_rpc.url)
+    monkeypatch.setenv('CACHE_ENABLED', '0')
+    for name, directory in (('CACHE_DIR', 'cache'), ('HISTORY_DIR', 'history'), ('JOURNAL_DIR', 'journal'),
+                            ('TX_HISTORY_DIR', 'tx_history')):
+        monkeypatch.setenv(name, str(tmp_path / directory))
+    monkeypatch.setenv('WATCHLIST_PATH', str(tmp_path / 'watchlist.json'))
+    monkeypatch.setenv('API_RATE_LIMIT', str(10 ** 9))
+    monkeypatch.setenv('SEND_ALERTS', '0')
+    monkeypatch.setenv('METRICS_ENABLED', '0')
+    monkeypatch.setenv('HTTP_MAX_RETRIES', '0')
+    reload_settings()
+    yield tmp_path
+    monkeypatch.undo()
+    reload_settings()
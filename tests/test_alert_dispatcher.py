@@ -0,0 +1,141 @@
+import time
+import pytest
+import alert_dispatcher
+from alert_dispatcher import AlertDispatcher, MESSAGE_SEPARATOR, TELEGRAM_MAX_MESSAGE_LENGTH, batch_messages
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        self.text = str(body)
+
+    def json(self):
+        if self.body is None:
+            raise ValueError("no JSON body")
+        return self.body
+
+
+class FakeTelegram:
+    """Stands in for the transport: records every sendMessage and answers from a script, then with 200."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def post(self, url, data=None, endpoint=None, max_retries=None):
+        self.sent.append((time.monotonic(), url, dict(data)))
+        return self.responses.pop(0) if self.responses else FakeResponse(200, {'ok': True})
+
+    def texts(self):
+        return [data['text'] for _, _, data in self.sent]
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    telegram = FakeTelegram()
+    monkeypatch.setattr(alert_dispatcher, 'get_transport', lambda: telegram)
+    return telegram
+
+
+def dispatcher(**kwargs):
+    kwargs.setdefault('coalesce_window', 0.05)
+    kwargs.setdefault('min_interval', 0)
+    kwargs.setdefault('max_retries', 2)
+    return AlertDispatcher(bot_token='TOKEN', chat_id='42', enabled=True, **kwargs)
+
+
+def deliver(alerts, *submissions):
+    for message, contract_address in submissions:
+        assert alerts.submit(message, contract_address)
+    assert alerts.flush(timeout=10)
+    alerts.close(timeout=5)
+    return alerts.stats()
+
+
+def test_batches_fill_messages_up_to_the_limit():
+    # Two alerts and the separator fill a message exactly; the third starts the next one
+    half = (TELEGRAM_MAX_MESSAGE_LENGTH - len(MESSAGE_SEPARATOR)) // 2
+    messages = ['a' * half, 'b' * half, 'c' * half]
+    assert len(MESSAGE_SEPARATOR.join(messages[:2])) == TELEGRAM_MAX_MESSAGE_LENGTH
+    assert batch_messages(messages) == [messages[:2], messages[2:]]
+    assert batch_messages(['a' * (half + 1), 'b' * half]) == [['a' * (half + 1)], ['b' * half]]
+
+    # An alert longer than a message is truncated to fit
+    [[truncated], [short]] = batch_messages(['x' * 5000, 'y'])
+    assert len(truncated) == TELEGRAM_MAX_MESSAGE_LENGTH and truncated.endswith('...')
+    assert short == 'y'
+    assert batch_messages([]) == []
+
+
+def test_every_batch_fits_in_one_message():
+    lengths = [1, 4096, 17, 2000, 2095, 5000, 0, 4093, 3, 1024, 1024, 1024, 1024]
+    messages = [str(i % 10) * length for i, length in enumerate(lengths)]
+    batches = batch_messages(messages)
+    assert all(len(MESSAGE_SEPARATOR.join(batch)) <= TELEGRAM_MAX_MESSAGE_LENGTH for batch in batches)
+    assert [message[:1] for batch in batches for message in batch] == [message[:1] for message in messages]
+
+
+def test_alerts_within_the_window_are_coalesced(telegram):
+    stats = deliver(dispatcher(coalesce_window=0.2),
+                    ('A v1', 'MintA'), ('B', 'MintB'), ('A v2', 'MintA'), ('note 1', None), ('note 2', None))
+
+    # The latest alert per contract, in order of first arrival; alerts without a contract are all kept
+    assert telegram.texts() == [MESSAGE_SEPARATOR.join(['A v2', 'B', 'note 1', 'note 2'])]
+    _, url, data = telegram.sent[0]
+    assert url == 'https://api.telegram.org/botTOKEN/sendMessage'
+    assert data['chat_id'] == '42'
+    assert (stats['submitted'], stats['coalesced'], stats['messages_sent'], stats['alerts_sent']) == (5, 1, 1, 4)
+
+
+def test_long_batches_are_split_across_messages(telegram):
+    half = (TELEGRAM_MAX_MESSAGE_LENGTH - len(MESSAGE_SEPARATOR)) // 2
+    alerts = [(letter * half, f"Mint{letter}") for letter in 'abc']
+    stats = deliver(dispatcher(coalesce_window=0.2), *alerts)
+
+    assert telegram.texts() == [MESSAGE_SEPARATOR.join(['a' * half, 'b' * half]), 'c' * half]
+    assert (stats['messages_sent'], stats['alerts_sent']) == (2, 3)
+
+
+def test_messages_are_paced_per_chat(telegram):
+    half = (TELEGRAM_MAX_MESSAGE_LENGTH - len(MESSAGE_SEPARATOR)) // 2
+    alerts = [(str(i) * half, f"Mint{i}") for i in range(6)]
+    deliver(dispatcher(coalesce_window=0.2, min_interval=0.1), *alerts)
+
+    sent_at = [at for at, _, _ in telegram.sent]
+    assert len(sent_at) == 3
+    assert all(later - earlier >= 0.09 for earlier, later in zip(sent_at, sent_at[1:]))
+
+
+def test_rate_limited_sends_wait_for_retry_after(telegram):
+    telegram.responses = [FakeResponse(429, {'ok': False, 'parameters': {'retry_after': 0.2}}),
+                          FakeResponse(429, None, headers={'Retry-After': '0.1'})]
+    stats = deliver(dispatcher(), ('alert', 'Mint'))
+
+    sent_at = [at for at, _, _ in telegram.sent]
+    assert telegram.texts() == ['alert'] * 3
+    # retry_after from the JSON body, then from the header when the body has none
+    assert sent_at[1] - sent_at[0] >= 0.2
+    assert sent_at[2] - sent_at[1] >= 0.1
+    assert (stats['rate_limited'], stats['messages_sent'], stats['failed']) == (2, 1, 0)
+
+
+def test_gives_up_after_retries_and_on_client_errors(telegram):
+    telegram.responses = [FakeResponse(429, {'parameters': {'retry_after': 0}})] * 3
+    stats = deliver(dispatcher(max_retries=2), ('alert', 'Mint'))
+    assert len(telegram.sent) == 3
+    assert (stats['rate_limited'], stats['messages_sent'], stats['failed']) == (3, 0, 1)
+
+    telegram.sent = []
+    telegram.responses = [FakeResponse(400, {'ok': False, 'description': 'chat not found'})]
+    stats = deliver(dispatcher(), ('alert', 'Mint'))
+    assert len(telegram.sent) == 1
+    assert (stats['messages_sent'], stats['failed']) == (0, 1)
+
+
+def test_disabled_dispatcher_sends_nothing(telegram):
+    alerts = AlertDispatcher(bot_token='TOKEN', chat_id='', enabled=True)
+    assert not alerts.enabled
+    assert not alerts.submit('alert', 'Mint')
+    assert not telegram.sent
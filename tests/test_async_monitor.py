@@ -0,0 +1,171 @@
+import asyncio
+import async_monitor
+from async_monitor import AsyncContractMonitor, TOKEN_ACCOUNT_OWNER_OFFSET, TOKEN_ACCOUNT_SIZE
+from benchmarks.fake_ws import FakeSolanaWebsocket
+from benchmarks.synthetic import make_token_accounts
+from snapshot_diff import BALANCE_CHANGE, NEW_HOLDER, Delta
+
+
+def token_account(pubkey, holder, amount):
+    return {'pubkey': pubkey, 'account': {'data': {'parsed': {'info': {
+        'mint': 'Mint', 'owner': holder, 'tokenAmount': {'amount': str(int(amount * 10 ** 6)), 'decimals': 6,
+                                                         'uiAmount': amount}}}}}}
+
+
+class FakePoll:
+    """Stands in for the batched HTTP fetch: serves the next snapshot on every call, then keeps the last one."""
+
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+        self.calls = 0
+
+    def __call__(self, contract_addresses, **kwargs):
+        snapshot = self.snapshots[min(self.calls, len(self.snapshots) - 1)]
+        self.calls += 1
+        return {address: {'data': list(snapshot[address]), 'error': None} for address in contract_addresses}
+
+
+async def eventually(predicate, timeout=5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "condition not reached in time"
+        await asyncio.sleep(0.01)
+
+
+SNAPSHOT = {'OwnerA': [token_account('A1', 'HolderA', 1.0)], 'OwnerB': [token_account('B1', 'HolderB', 2.0)]}
+
+
+def test_subscribes_catches_up_and_dispatches_notifications(monkeypatch):
+    changed = dict(SNAPSHOT, OwnerA=[token_account('A1', 'HolderA', 5.0)])
+    poll = FakePoll(SNAPSHOT, changed)
+    monkeypatch.setattr(async_monitor, 'fetch_token_accounts_batch', poll)
+    updates = []
+
+    async def scenario():
+        async with FakeSolanaWebsocket() as server:
+            monitor = AsyncContractMonitor(['OwnerA', 'OwnerB'], lambda *update: updates.append(update),
+                                           ws_url=server.url, rpc_url='http://rpc.invalid')
+            task = asyncio.ensure_future(monitor.run())
+            await eventually(lambda: monitor.connected and poll.calls == 2)
+            assert server.subscribed() == {'OwnerA', 'OwnerB'}
+            for params in server.subscribe_requests:
+                assert params[0] == async_monitor.TOKEN_PROGRAM_ID
+                assert params[1]['filters'][0] == {'dataSize': TOKEN_ACCOUNT_SIZE}
+                assert params[1]['filters'][1]['memcmp']['offset'] == TOKEN_ACCOUNT_OWNER_OFFSET
+
+            # The change made between the initial snapshot and the subscription came in through the catch-up poll
+            await eventually(lambda: len(updates) == 1)
+            assert updates[0] == ('OwnerA', [Delta(BALANCE_CHANGE, 'A1', 1.0, 5.0, 4.0)])
+
+            new_holder = token_account('B2', 'HolderC', 3.0)
+            await server.notify('OwnerB', new_holder)
+            await eventually(lambda: len(updates) == 2)
+            assert updates[1] == ('OwnerB', [Delta(NEW_HOLDER, 'B2', 0.0, 3.0, float('inf'))])
+
+            # A notification repeating the known state is not an update
+            await server.notify('OwnerB', new_holder)
+            await server.notify('OwnerA', token_account('A1', 'HolderA', 4.0))
+            await eventually(lambda: len(updates) == 3)
+            assert updates[2] == ('OwnerA', [Delta(BALANCE_CHANGE, 'A1', 5.0, 4.0, -0.2)])
+
+            monitor.stop()
+            await asyncio.wait_for(task, timeout=5)
+            assert not monitor.connected
+
+    asyncio.run(scenario())
+
+
+def test_reconnects_with_backoff_and_resubscribes(monkeypatch):
+    poll = FakePoll(SNAPSHOT)
+    monkeypatch.setattr(async_monitor, 'fetch_token_accounts_batch', poll)
+    updates = []
+
+    async def scenario():
+        async with FakeSolanaWebsocket(refuse_connections=2) as server:
+            monitor = AsyncContractMonitor(['OwnerA', 'OwnerB'], lambda *update: updates.append(update),
+                                           ws_url=server.url, rpc_url='http://rpc.invalid')
+            fallback_polls = []
+
+            async def poll_for(duration):
+                # Fallback polling, without waiting out the backoff in real time
+                fallback_polls.append(duration)
+                await monitor.poll_once()
+            monitor._poll_for = poll_for
+
+            task = asyncio.ensure_future(monitor.run())
+            await eventually(lambda: monitor.connected)
+            # Two refused connections: the backoff doubled in between
+            assert server.connections == 3
+            assert fallback_polls == [1.0, 2.0]
+
+            await server.drop_connections()
+            await eventually(lambda: server.connections == 4 and monitor.connected)
+            # The dropped connection had subscribed, so the backoff started over
+            assert fallback_polls == [1.0, 2.0, 1.0]
+            assert server.subscribed() == {'OwnerA', 'OwnerB'}
+            assert len(server.subscribe_requests) == 4
+            # Initial snapshot, three fallback polls and a catch-up poll after each subscribe
+            await eventually(lambda: poll.calls == 6)
+
+            # Notifications flow over the new connection
+            await server.notify('OwnerA', token_account('A1', 'HolderA', 0.5))
+            await eventually(lambda: updates == [('OwnerA', [Delta(BALANCE_CHANGE, 'A1', 1.0, 0.5, -0.5)])])
+
+            monitor.stop()
+            await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(scenario())
+
+
+def test_backoff_is_capped(monkeypatch):
+    monkeypatch.setattr(async_monitor, 'fetch_token_accounts_batch', FakePoll(SNAPSHOT))
+
+    async def scenario():
+        async with FakeSolanaWebsocket(refuse_connections=6) as server:
+            monitor = AsyncContractMonitor(['OwnerA', 'OwnerB'], lambda *update: None, ws_url=server.url,
+                                           rpc_url='http://rpc.invalid', max_reconnect_delay=5.0)
+            fallback_polls = []
+
+            async def poll_for(duration):
+                fallback_polls.append(duration)
+                await asyncio.sleep(0)
+            monitor._poll_for = poll_for
+
+            task = asyncio.ensure_future(monitor.run())
+            await eventually(lambda: monitor.connected)
+            assert fallback_polls == [1.0, 2.0, 4.0, 5.0, 5.0, 5.0]
+            monitor.stop()
+            await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(scenario())
+
+
+def poll_replies(monitor, replies, monkeypatch):
+    """Run poll_once with fetch_token_accounts_batch answering from a list of canned replies."""
+    monkeypatch.setattr(async_monitor, 'fetch_token_accounts_batch',
+                        lambda contract_addresses, rpc_url=None: replies.pop(0))
+    return asyncio.run(monitor.poll_once())
+
+
+def test_poll_once_skips_empty_and_missing_replies(monkeypatch):
+    updates = []
+    monitor = AsyncContractMonitor(['Mint'], lambda address, deltas: updates.append((address, deltas)),
+                                   ws_url='ws://unused')
+    accounts = make_token_accounts(20, seed=5)
+    replies = [
+        {'Mint': {'data': accounts, 'error': None}},
+        {'Mint': {'data': [], 'error': None}},
+        {'Mint': {'data': None, 'error': None}},
+        {'Mint': {'data': None, 'error': 'timeout'}},
+        {'Mint': {'data': accounts[:15], 'error': None}},
+    ]
+
+    # The first reply sets the baseline; empty, missing and failed replies neither dispatch nor reset it
+    for _ in range(4):
+        assert poll_replies(monitor, replies, monkeypatch) == 0
+    assert not updates
+    assert len(monitor.snapshot('Mint')) == 20
+
+    assert poll_replies(monitor, replies, monkeypatch) == 1
+    assert len(updates[0][1]) == 5
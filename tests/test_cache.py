@@ -0,0 +1,156 @@
+import threading
+import time
+import pytest
+import cache
+from cache import TwoTierCache, MISSING
+
+
+class Clock:
+    """Stands in for time.time so entries can be aged without sleeping."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'time', clock)
+    return clock
+
+
+def memory_cache(**kwargs):
+    kwargs.setdefault('ttl', 60)
+    return TwoTierCache(enabled=True, use_disk=False, **kwargs)
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.001)
+
+
+def test_concurrent_misses_share_one_load():
+    contract_cache = memory_cache()
+    release = threading.Event()
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        release.wait(5)
+        return [key]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(contract_cache.get_or_load('Mint', loader)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # Every caller but the one loading is waiting on the same flight before the load finishes
+    wait_for(lambda: contract_cache.stats()['coalesced'] == 7)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert loads == ['Mint']
+    assert results == [['Mint']] * 8
+    assert contract_cache.get_or_load('Mint', loader) == ['Mint']
+    assert loads == ['Mint']
+    stats = contract_cache.stats()
+    assert (stats['loads'], stats['coalesced'], stats['hits']) == (1, 7, 1)
+
+
+def test_a_failed_load_reaches_every_waiter_and_is_not_cached():
+    contract_cache = memory_cache()
+    release = threading.Event()
+
+    def loader(key):
+        release.wait(5)
+        raise RuntimeError("rpc down")
+
+    errors = []
+
+    def load():
+        try:
+            contract_cache.get_or_load('Mint', loader)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=load) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: contract_cache.stats()['coalesced'] == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 4 and len({id(error) for error in errors}) == 1
+    assert contract_cache.get('Mint') is MISSING
+    assert contract_cache.get_or_load('Mint', lambda key: 'loaded') == 'loaded'
+
+
+def test_expired_entries_are_reloaded(clock):
+    contract_cache = memory_cache(ttl=60)
+    loads = []
+
+    def loader(key):
+        loads.append(clock.now)
+        return len(loads)
+
+    assert contract_cache.get_or_load('Mint', loader) == 1
+    clock.now += 59
+    assert contract_cache.get_or_load('Mint', loader) == 1
+    clock.now += 1
+    assert contract_cache.get('Mint') is MISSING
+    assert contract_cache.get_or_load('Mint', loader) == 2
+    assert loads == [1000.0, 1060.0]
+    assert contract_cache.stats()['expirations'] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    contract_cache = memory_cache(max_entries=3)
+    for key in ('A', 'B', 'C'):
+        contract_cache.set(key, key.lower())
+    # Reading A makes B the least recently used
+    assert contract_cache.get('A') == 'a'
+    contract_cache.set('D', 'd')
+
+    assert contract_cache.get('B') is MISSING
+    assert [contract_cache.get(key) for key in ('A', 'C', 'D')] == ['a', 'c', 'd']
+    stats = contract_cache.stats()
+    assert (stats['evictions'], stats['size']) == (1, 3)
+
+
+def test_stats_count_hits_misses_and_disk_hits(clock):
+    class DictDiskTier:
+        def __init__(self):
+            self.entries = {}
+
+        def load_entry(self, key):
+            return self.entries.get(key)
+
+        def save_entry(self, key, data, timestamp=None):
+            self.entries[key] = (timestamp, data)
+
+    disk = DictDiskTier()
+    TwoTierCache(ttl=60, enabled=True, disk_tier=disk).set('Mint', [1])
+    contract_cache = TwoTierCache(ttl=60, enabled=True, disk_tier=disk)
+
+    assert contract_cache.get('Mint') == [1]
+    assert contract_cache.get('Mint') == [1]
+    assert contract_cache.get('Other') is MISSING
+    stats = contract_cache.stats()
+    assert (stats['disk_hits'], stats['hits'], stats['misses'], stats['size']) == (1, 1, 1, 1)
+    assert stats['hit_rate'] == pytest.approx(2 / 3)
+
+
+def test_disabled_cache_stores_nothing_but_still_coalesces():
+    contract_cache = TwoTierCache(enabled=False)
+    assert contract_cache.disk_tier is None
+    contract_cache.set('Mint', [1])
+    assert contract_cache.get('Mint') is MISSING
+    assert contract_cache.get_or_load('Mint', lambda key: [2]) == [2]
+    assert contract_cache.stats()['size'] == 0
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from analysis import analyze_token_data
+from benchmarks.synthetic import make_token_accounts
+from contract_state import ContractState, GrowableColumn, as_balances
+from strategy import strategy_analysis
+from utils import process_token_data
+
+
+def nested_ui_amounts(accounts):
+    return [entry['account']['data']['parsed']['info']['tokenAmount']['uiAmount'] for entry in accounts]
+
+
+def nested_owners(accounts):
+    return [entry['account']['data']['parsed']['info']['owner'] for entry in accounts]
+
+
+@pytest.fixture
+def accounts():
+    return make_token_accounts(500, seed=4)
+
+
+def test_state_columns_match_the_nested_json(accounts):
+    accounts[3]['account']['data']['parsed']['info']['tokenAmount']['uiAmount'] = None
+    state = ContractState('Mint')
+    assert state.load(accounts)
+
+    expected = np.array(nested_ui_amounts(accounts), dtype=np.float64)
+    np.testing.assert_array_equal(state.balances, expected)
+    assert state.owners() == nested_owners(accounts)
+    np.testing.assert_array_equal(as_balances(accounts), expected)
+    np.testing.assert_array_equal(process_token_data(accounts), expected)
+    assert process_token_data(state) is state.balances
+
+    # The same fetched list is not parsed twice; a new fetch replaces the columns
+    assert not state.load(accounts)
+    later = make_token_accounts(200, seed=5)
+    assert state.load(later)
+    np.testing.assert_array_equal(state.balances, nested_ui_amounts(later))
+    assert state.owners() == nested_owners(later)
+
+
+def test_owner_dictionary_is_rebuilt_once_departed_owners_dominate():
+    state = ContractState('Mint')
+    for seed in range(6):
+        fetched = make_token_accounts(100, seed=seed)
+        state.load(fetched)
+        assert state.owners() == nested_owners(fetched)
+        # Every fetch brings 100 new owners; the table is reset before it grows past twice that plus one fetch
+        assert len(state.owner_table) <= 300
+
+
+def test_stages_agree_on_states_and_raw_data(accounts):
+    import main
+
+    state = ContractState('Mint')
+    state.load(accounts)
+    assert main.analyze_contract_data(state) == main.analyze_contract_data(accounts)
+
+    rng = np.random.default_rng(2)
+    prices = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.02, 120)))
+    state.append_prices(np.arange(len(prices)) * 60, prices)
+    np.testing.assert_array_equal(state.price_history()['price'], prices)
+    assert strategy_analysis(state) == strategy_analysis(list(prices))
+
+    balance_state = ContractState('Mint')
+    balance_state.load(np.array(nested_ui_amounts(accounts)))
+    assert analyze_token_data(balance_state) == analyze_token_data(accounts)
+
+
+def test_growable_column_matches_concatenation():
+    column = GrowableColumn(np.float64, capacity=2)
+    expected = []
+    rng = np.random.default_rng(0)
+    for size in [1, 0, 3, 10, 1, 100]:
+        values = rng.normal(size=size)
+        if size == 1:
+            column.append(values[0])
+        else:
+            column.extend(values)
+        expected.extend(values)
+        np.testing.assert_array_equal(column.view(), expected)
+    view = column.view()
+    assert not view.flags.writeable
+    assert np.shares_memory(view, column.view())
+
+
+def test_append_prices_replaces_bars_already_stored():
+    state = ContractState('Mint')
+    assert state.append_prices([60, 120, 180], [1.0, 2.0, 3.0], [5.0, 6.0, 7.0]) == 3
+    # The last bar was rebuilt with more transfers
+    assert state.append_prices([180, 240, 300], [3.5, 4.0, 5.0], [8.0, 1.0, 1.0]) == 3
+    history = state.price_history()
+    np.testing.assert_array_equal(history['timestamp'], [60, 120, 180, 240, 300])
+    np.testing.assert_array_equal(history['price'], [1.0, 2.0, 3.5, 4.0, 5.0])
+    np.testing.assert_array_equal(history['volume'], [5.0, 6.0, 8.0, 1.0, 1.0])
+
+    # A backfilled gap is inserted in order, and the stored bars it does not touch are kept
+    assert state.append_prices([90, 240], [1.5, 4.5]) == 2
+    history = state.price_history()
+    np.testing.assert_array_equal(history['timestamp'], [60, 90, 120, 180, 240, 300])
+    np.testing.assert_array_equal(history['price'], [1.0, 1.5, 2.0, 3.5, 4.5, 5.0])
+    np.testing.assert_array_equal(history['volume'], [5.0, np.nan, 6.0, 8.0, np.nan, 1.0])
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import holder_metrics
+from holder_metrics import HolderDistribution, holder_metrics as batch_metrics
+from snapshot_diff import BALANCE_CHANGE, EXITED_HOLDER, NEW_HOLDER, Delta
+
+
+def assert_matches_batch(distribution, balances):
+    expected = batch_metrics(balances)
+    actual = distribution.metrics()
+    assert actual['holders'] == expected['holders']
+    assert actual['total'] == pytest.approx(expected['total'], rel=1e-9)
+    assert actual['gini'] == pytest.approx(expected['gini'], abs=1e-9)
+    assert actual['hhi'] == pytest.approx(expected['hhi'], rel=1e-9, abs=1e-15)
+    assert actual['top_shares'] == pytest.approx(expected['top_shares'], rel=1e-9)
+    assert actual['buckets'] == expected['buckets']
+
+
+def random_balance(rng):
+    # Heavy-tailed, and rounded so that equal balances are common
+    return float(np.round(rng.lognormal(mean=3.0, sigma=2.5), 2)) or 0.01
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_updates_match_batch_metrics(seed, monkeypatch):
+    # Small blocks, so inserts and removals also split blocks and empty them
+    monkeypatch.setattr(holder_metrics, 'BLOCK_SIZE', 8)
+    rng = np.random.default_rng(seed)
+    accounts = {f"A{i}": random_balance(rng) for i in range(int(rng.integers(0, 60)))}
+    distribution = HolderDistribution(list(accounts.values()))
+    assert_matches_batch(distribution, list(accounts.values()))
+    next_account = len(accounts)
+
+    for step in range(400):
+        deltas = []
+        for _ in range(int(rng.integers(1, 6))):
+            action = rng.random()
+            if action < 0.35 or not accounts:
+                pubkey, next_account = f"A{next_account}", next_account + 1
+                accounts[pubkey] = random_balance(rng)
+                deltas.append(Delta(NEW_HOLDER, pubkey, 0.0, accounts[pubkey], float('inf')))
+            elif action < 0.6:
+                pubkey = rng.choice(sorted(accounts))
+                deltas.append(Delta(EXITED_HOLDER, pubkey, accounts.pop(pubkey), 0.0, -1.0))
+            else:
+                pubkey = rng.choice(sorted(accounts))
+                old, new = accounts[pubkey], random_balance(rng)
+                accounts[pubkey] = new
+                deltas.append(Delta(BALANCE_CHANGE, pubkey, old, new, (new - old) / old))
+        distribution.apply_deltas(deltas)
+        if step % 10 == 0:
+            assert_matches_batch(distribution, list(accounts.values()))
+            np.testing.assert_array_equal(distribution.sorted_balances(), np.sort(list(accounts.values())))
+
+    assert_matches_batch(distribution, list(accounts.values()))
+
+
+def test_non_positive_balances_are_not_holders():
+    distribution = HolderDistribution([0.0, -1.0, np.nan, 5.0, 5.0, 10.0])
+    assert_matches_batch(distribution, [0.0, -1.0, np.nan, 5.0, 5.0, 10.0])
+    distribution.add(0.0)
+    assert not distribution.remove(7.0)
+    assert distribution.remove(5.0)
+    assert_matches_batch(distribution, [5.0, 10.0])
+
+    for value in (5.0, 10.0):
+        assert distribution.remove(value)
+    assert distribution.metrics() == batch_metrics([])
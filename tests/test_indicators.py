@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from indicators import IndicatorEngine, macd_series, rsi_series, sma_series
+
+
+def random_prices(length, seed):
+    rng = np.random.default_rng(seed)
+    return 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.02, length)))
+
+
+def stream(prices, **kwargs):
+    """Feed prices through an IndicatorEngine; returns each output as an array with NaN where it was None."""
+    engine = IndicatorEngine(**kwargs)
+    rows = [engine.update(float(price)) for price in prices]
+    return {name: np.array([np.nan if row[name] is None else row[name] for row in rows], dtype=np.float64)
+            for name in ('sma', 'rsi', 'macd', 'signal')}
+
+
+def assert_series_equal(streamed, batch):
+    # The warm-up positions must line up exactly; the values may differ by floating-point rounding only
+    np.testing.assert_array_equal(np.isnan(streamed), np.isnan(batch))
+    np.testing.assert_allclose(streamed, batch, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('length', [0, 1, 5, 14, 15, 26, 34, 35, 300])
+def test_engine_matches_batch_series(seed, length):
+    prices = random_prices(length, seed)
+    streamed = stream(prices)
+    macd = macd_series(prices)
+
+    assert_series_equal(streamed['sma'], sma_series(prices))
+    assert_series_equal(streamed['rsi'], rsi_series(prices))
+    assert_series_equal(streamed['macd'], macd['macd'])
+    assert_series_equal(streamed['signal'], macd['signal'])
+
+
+@pytest.mark.parametrize('sma_window, rsi_window, fast, slow, signal', [(5, 3, 3, 7, 4), (20, 21, 8, 21, 5)])
+def test_engine_matches_batch_series_with_custom_windows(sma_window, rsi_window, fast, slow, signal):
+    prices = random_prices(200, seed=7)
+    streamed = stream(prices, sma_window=sma_window, rsi_window=rsi_window, fast=fast, slow=slow, signal=signal)
+    macd = macd_series(prices, fast, slow, signal)
+
+    assert_series_equal(streamed['sma'], sma_series(prices, sma_window))
+    assert_series_equal(streamed['rsi'], rsi_series(prices, rsi_window))
+    assert_series_equal(streamed['macd'], macd['macd'])
+    assert_series_equal(streamed['signal'], macd['signal'])
+
+
+def test_warm_up_lengths():
+    streamed = stream(random_prices(60, seed=3))
+    # SMA needs window prices, RSI window changes, MACD the slow EMA and the signal line signal MACD values
+    assert np.flatnonzero(~np.isnan(streamed['sma']))[0] == 13
+    assert np.flatnonzero(~np.isnan(streamed['rsi']))[0] == 14
+    assert np.flatnonzero(~np.isnan(streamed['macd']))[0] == 25
+    assert np.flatnonzero(~np.isnan(streamed['signal']))[0] == 33
+
+
+def test_rsi_flat_and_rising_prices():
+    # No losses: RSI is 50 while prices are flat and 100 once they only rise, in both modes
+    prices = np.concatenate([np.full(20, 10.0), np.linspace(10.0, 12.0, 20)])
+    streamed = stream(prices)
+    assert_series_equal(streamed['rsi'], rsi_series(prices))
+    assert streamed['rsi'][19] == 50.0
+    assert streamed['rsi'][-1] == 100.0
+
+
+def test_from_history_matches_replay():
+    prices = random_prices(100, seed=11)
+    engine = IndicatorEngine.from_history(prices)
+    macd = macd_series(prices)
+    assert engine.sma.value == pytest.approx(sma_series(prices)[-1])
+    assert engine.rsi.value == pytest.approx(rsi_series(prices)[-1])
+    assert engine.macd.macd == pytest.approx(macd['macd'][-1])
+    assert engine.macd.signal == pytest.approx(macd['signal'][-1])
+    assert engine.signals() == {
+        'sma_entry': bool(prices[-1] > sma_series(prices)[-1]),
+        'rsi_entry': bool(rsi_series(prices)[-1] < 30),
+        'macd_entry': bool(macd['macd'][-1] > macd['signal'][-1]),
+    }
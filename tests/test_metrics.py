@@ -0,0 +1,33 @@
+import metrics
+from settings import reload_settings
+
+
+def test_settings_are_read_when_metrics_are_recorded(app_env, monkeypatch):
+    assert not metrics.is_enabled()
+    assert metrics.span('fetch', 'Mint') is metrics._NULL_SPAN
+
+    # Settings changed after the first use take effect without re-importing the module
+    export_path = app_env / 'metrics' / 'alphascout.prom'
+    monkeypatch.setenv('METRICS_ENABLED', '1')
+    monkeypatch.setenv('METRICS_PER_CONTRACT', '0')
+    monkeypatch.setenv('METRICS_EXPORT_PATH', str(export_path))
+    reload_settings()
+    assert metrics.is_enabled()
+    with metrics.span('fetch', 'Mint') as span:
+        assert span.labels == {'stage': 'fetch'}
+    metrics.count('test_settings_total')
+    assert metrics.write_textfile() == str(export_path)
+    assert 'alphascout_test_settings_total 1' in export_path.read_text()
+    assert metrics.start_http_server() is None
+
+
+def test_configure_overrides_the_settings(app_env, monkeypatch):
+    monkeypatch.setattr(metrics, '_enabled', None)
+    monkeypatch.setattr(metrics, '_per_contract', None)
+    metrics.configure(enabled=True, per_contract=True)
+    assert metrics.is_enabled()
+    with metrics.span('fetch', 'Mint') as span:
+        assert span.labels == {'stage': 'fetch', 'contract': 'Mint'}
+
+    metrics.configure(enabled=False)
+    assert not metrics.is_enabled()
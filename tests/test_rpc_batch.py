@@ -0,0 +1,71 @@
+import rpc_router
+import transport
+from rpc_batch import fetch_token_accounts_batch
+from rpc_router import RpcRouter
+from transport import Transport
+
+
+def test_failed_chunk_only_fails_its_addresses(rpc_servers, monkeypatch):
+    monkeypatch.setattr(transport, '_transport', Transport(max_retries=0))
+    server = rpc_servers(fail_requests={2})
+    addresses = [f"Owner{i}" for i in range(10)]
+
+    results = fetch_token_accounts_batch(addresses, batch_size=4, rpc_url=server.url)
+
+    assert list(results) == addresses
+    failed = [address for address, entry in results.items() if entry['error'] is not None]
+    assert failed == addresses[4:8]
+    assert all(results[address]['data'] is None for address in failed)
+    for address in addresses[:4] + addresses[8:]:
+        assert results[address]['data'] == server.accounts(address)
+    assert server.requests == 3
+
+
+def test_error_reply_only_fails_its_address(rpc_servers, monkeypatch):
+    monkeypatch.setattr(transport, '_transport', Transport(max_retries=0))
+    server = rpc_servers(bad_owners={'Owner2'})
+    addresses = [f"Owner{i}" for i in range(5)] + ['Owner2']
+
+    results = fetch_token_accounts_batch(addresses, batch_size=10, rpc_url=server.url)
+
+    # Duplicates are fetched once, in one round trip
+    assert list(results) == addresses[:5]
+    assert server.requests == 1
+    assert 'Invalid param' in results['Owner2']['error']
+    assert results['Owner2']['data'] is None
+    assert all(results[address] == {'data': server.accounts(address), 'error': None}
+               for address in addresses if address != 'Owner2')
+
+
+def test_transport_retries_failed_chunks(rpc_servers, monkeypatch):
+    monkeypatch.setattr(transport, '_transport', Transport(max_retries=2, backoff_base=0.0))
+    server = rpc_servers(fail_requests={1, 3, 4})
+    addresses = [f"Owner{i}" for i in range(8)]
+
+    results = fetch_token_accounts_batch(addresses, batch_size=4, rpc_url=server.url)
+
+    assert all(entry['error'] is None for entry in results.values())
+    assert all(results[address]['data'] == server.accounts(address) for address in addresses)
+    # Two chunks: the first retried once, the second twice
+    assert server.requests == 5
+
+
+def test_router_fails_batches_over_to_a_healthy_endpoint(rpc_servers, monkeypatch):
+    down, up = rpc_servers(error_rate=1.0), rpc_servers()
+    router = RpcRouter([down.url, up.url], transport=Transport(max_retries=0), hedge=False, failure_threshold=1,
+                       reset_timeout=60.0)
+    monkeypatch.setattr(rpc_router, '_router', router)
+    monkeypatch.setattr(rpc_router.random, 'random', lambda: 1.0)
+    addresses = [f"Owner{i}" for i in range(12)]
+
+    try:
+        results = fetch_token_accounts_batch(addresses, batch_size=4)
+    finally:
+        router.close()
+
+    assert all(entry['error'] is None for entry in results.values())
+    assert all(results[address]['data'] == up.accounts(address) for address in addresses)
+    # The first chunk tried the failing endpoint and opened its circuit; the rest went straight to the healthy one
+    assert down.requests == 1
+    assert up.requests == 3
+    assert router.stats()[down.url.split('//')[1]]['state'] == rpc_router.OPEN
@@ -0,0 +1,143 @@
+import threading
+import time
+import pytest
+import requests
+import rpc_router
+from rpc_batch import token_accounts_params
+from rpc_router import CLOSED, HALF_OPEN, OPEN, NoHealthyEndpointError, RpcRouter
+from transport import Transport
+
+
+@pytest.fixture(autouse=True)
+def no_exploration(monkeypatch):
+    # Calls always go to the best-scored endpoint, so each test controls the routing
+    monkeypatch.setattr(rpc_router.random, 'random', lambda: 1.0)
+
+
+def make_router(servers, **kwargs):
+    kwargs.setdefault('hedge', False)
+    return RpcRouter([server.url for server in servers], transport=Transport(max_retries=0), **kwargs)
+
+
+def health(router, server):
+    return next(endpoint for endpoint in router.endpoints if endpoint.url == server.url)
+
+
+def call(router, owner='Owner'):
+    return router.rpc_call('getTokenAccountsByOwner', token_accounts_params(owner))
+
+
+def test_failover_to_the_next_endpoint(rpc_servers):
+    down, up = rpc_servers(error_rate=1.0), rpc_servers()
+    router = make_router([down, up], failure_threshold=3, reset_timeout=60.0)
+    try:
+        for i in range(6):
+            assert call(router, f"Owner{i}")['result']['value']
+    finally:
+        router.close()
+
+    # The failing endpoint keeps the best score until its circuit opens, then gets no more requests
+    assert down.requests == 3
+    assert up.requests == 6
+    assert health(router, down).state == OPEN
+    assert health(router, up).state == CLOSED
+
+
+def test_circuit_open_half_open_closed(rpc_servers):
+    flaky, steady = rpc_servers(error_rate=1.0), rpc_servers(latency=0.01)
+    router = make_router([flaky, steady], failure_threshold=2, reset_timeout=0.2)
+    try:
+        call(router)
+        call(router)
+        assert health(router, flaky).state == OPEN
+        requests = flaky.requests
+        call(router)
+        assert flaky.requests == requests
+
+        # Half-open after the reset timeout: one trial request, which fails and reopens the circuit at once
+        time.sleep(0.25)
+        for _ in range(3):
+            call(router)
+        assert flaky.requests == requests + 1
+        assert health(router, flaky).state == OPEN
+
+        # A successful trial closes the circuit again
+        flaky.error_rate = 0.0
+        time.sleep(0.25)
+        call(router)
+        assert flaky.requests == requests + 2
+        assert health(router, flaky).state == CLOSED
+        assert health(router, flaky).failures == 0
+    finally:
+        router.close()
+
+
+def test_failover_skips_a_half_open_endpoint_whose_trial_was_taken(rpc_servers):
+    down, probe = rpc_servers(error_rate=1.0, latency=0.3), rpc_servers()
+    router = make_router([down, probe], failure_threshold=5, reset_timeout=0.0)
+    # The probe's circuit is open but due for its trial; its latency ranks it after the untried endpoint
+    probe_health = health(router, probe)
+    probe_health.state = OPEN
+    probe_health.latency = 1.0
+    errors = []
+
+    def failing_call():
+        try:
+            call(router)
+        except requests.HTTPError as e:
+            errors.append(e)
+
+    caller = threading.Thread(target=failing_call)
+    try:
+        caller.start()
+        time.sleep(0.1)
+        # While the call waits on the failing endpoint, another call takes the probe's single trial
+        with router._lock:
+            assert probe_health.state == HALF_OPEN
+            router._claim(probe_health)
+        caller.join()
+    finally:
+        router.close()
+
+    # The failover found the trial taken, so the probe got no second request
+    assert len(errors) == 1
+    assert probe.requests == 0
+    assert down.requests == 1
+
+
+def test_every_circuit_open_raises(rpc_servers):
+    down = rpc_servers(error_rate=1.0)
+    router = make_router([down], failure_threshold=1, reset_timeout=60.0)
+    try:
+        # The last failed response is returned when every endpoint failed
+        with pytest.raises(requests.HTTPError):
+            call(router)
+        with pytest.raises(NoHealthyEndpointError):
+            call(router)
+    finally:
+        router.close()
+    assert down.requests == 1
+
+
+def test_hedged_request_wins_when_the_primary_stalls(rpc_servers):
+    first, second = rpc_servers(latency=0.02), rpc_servers(latency=0.02)
+    router = make_router([first, second], hedge=True, hedge_min_delay=0.01)
+    try:
+        # Warm both endpoints up so each has a latency estimate
+        call(router)
+        call(router)
+        primary = min(router.endpoints, key=rpc_router.EndpointHealth.score)
+        stalled = first if primary.url == first.url else second
+        other = second if stalled is first else first
+        stalled.latency = 1.0
+
+        start = time.perf_counter()
+        assert call(router)['result']['value']
+        elapsed = time.perf_counter() - start
+    finally:
+        router.close()
+
+    assert elapsed < 0.5
+    assert health(router, other).hedges == 1
+    assert health(router, other).hedge_wins == 1
+    assert health(router, stalled).hedge_wins == 0
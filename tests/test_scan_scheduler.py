@@ -0,0 +1,92 @@
+import math
+import pytest
+from scan_scheduler import ScanScheduler
+
+NOW = 1_000_000.0
+
+
+def scheduler(path=None, calls_per_minute=10 ** 6, **kwargs):
+    kwargs.setdefault('min_interval', 5.0)
+    kwargs.setdefault('max_interval', 3600.0)
+    kwargs.setdefault('hot_activity', 0.05)
+    return ScanScheduler(path=path, calls_per_minute=calls_per_minute, **kwargs)
+
+
+def test_intervals_follow_activity():
+    schedule = scheduler()
+    for address in ('Hot', 'Dormant', 'New'):
+        schedule.add(address, due=NOW)
+
+    # New contracts start halfway between hot and dormant: the geometric mean of the two intervals
+    assert schedule.record('New', now=NOW) == pytest.approx(math.sqrt(5.0 * 3600.0))
+    for _ in range(10):
+        hot = schedule.record('Hot', activity=1.0, now=NOW)
+    assert hot == pytest.approx(5.0)
+    for _ in range(60):
+        dormant = schedule.record('Dormant', activity=0.0, now=NOW)
+    assert dormant == pytest.approx(3600.0, rel=1e-3)
+
+    entries = schedule.entries()
+    assert entries['Hot']['next_due'] == pytest.approx(NOW + 5.0)
+    assert entries['Hot']['scans'] == 10
+    assert entries['Hot']['score'] > entries['New']['score'] > entries['Dormant']['score']
+
+
+def test_intervals_stretch_to_fit_the_rpc_budget():
+    # 100 hot contracts at a 5s interval want 20 calls/s; a budget of 4 calls/s stretches every interval 5x
+    schedule = scheduler(calls_per_minute=240, hot_activity=0.0)
+    for i in range(100):
+        schedule.add(f"Mint{i}", due=NOW)
+    assert schedule.record('Mint0', now=NOW) == pytest.approx(25.0)
+
+    # Removing contracts frees budget for the rest
+    for i in range(50, 100):
+        schedule.remove(f"Mint{i}")
+    assert schedule.record('Mint1', now=NOW) == pytest.approx(12.5)
+    for i in range(2, 50):
+        schedule.remove(f"Mint{i}")
+    assert schedule.record('Mint1', now=NOW) == pytest.approx(5.0)
+
+
+def test_stretched_intervals_are_capped_at_the_dormant_interval():
+    schedule = scheduler(calls_per_minute=1, hot_activity=0.0, max_interval=60.0)
+    for i in range(10):
+        schedule.add(f"Mint{i}", due=NOW)
+    assert schedule.record('Mint0', now=NOW) == 60.0
+
+
+def test_next_batch_pops_due_contracts_most_overdue_first():
+    schedule = scheduler()
+    schedule.add('Late', due=NOW - 30)
+    schedule.add('Later', due=NOW - 60)
+    schedule.add('Future', due=NOW + 30)
+    schedule.add('Removed', due=NOW - 90)
+    schedule.remove('Removed')
+
+    assert schedule.next_batch(10, now=NOW) == ['Later', 'Late']
+    assert schedule.next_batch(10, now=NOW) == []
+    assert schedule.seconds_until_due(now=NOW) == pytest.approx(30.0)
+    assert schedule.next_batch(10, now=NOW + 30) == ['Future']
+    assert schedule.seconds_until_due(now=NOW) is None
+
+
+def test_next_batch_is_admitted_against_the_budget():
+    # One call per second with a one-call burst: only the first due contract fits right now
+    schedule = scheduler(calls_per_minute=60)
+    for i in range(5):
+        schedule.add(f"Mint{i}", due=NOW - i)
+    assert schedule.next_batch(5, now=NOW) == ['Mint4']
+
+
+def test_schedule_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'watchlist.json')
+    schedule = scheduler(path)
+    for i in range(3):
+        schedule.add(f"Mint{i}", due=NOW + i)
+    schedule.record('Mint0', activity=1.0, now=NOW)
+    schedule.save()
+
+    restored = scheduler(path)
+    assert restored.entries() == schedule.entries()
+    assert restored.next_batch(10, now=NOW + 2) == ['Mint1', 'Mint2']
+    assert restored.next_batch(10, now=NOW + 3600) == ['Mint0']
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from contract_state import ContractState
+from screening import SIGNALS, align_prices, screen_prices, screen_states
+from strategy import strategy_analysis
+
+
+def random_histories(count, seed, max_length=300):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, max_length, count)
+    # Drifting down makes RSI entries (RSI < 30) occur alongside the SMA and MACD ones
+    return [100.0 * np.exp(np.cumsum(rng.normal(-0.004, 0.03, length))) for length in lengths]
+
+
+def loop_signals(histories, sma_window=14):
+    """The per-contract loop screening replaces; strategy_analysis needs a full SMA window, before that nothing fires."""
+    return np.array([[len(history) >= sma_window and bool(strategy_analysis(list(history))[name]) for name in SIGNALS]
+                     for history in histories])
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matrix_signals_match_strategy_analysis(seed):
+    histories = random_histories(200, seed)
+    result = screen_prices(align_prices(histories))
+
+    expected = loop_signals(histories)
+    assert expected.any(axis=0).all()
+    np.testing.assert_array_equal(result['signals'], expected)
+
+
+def test_gaps_inside_a_history_are_forward_filled():
+    histories = random_histories(20, seed=9)
+    gapped = align_prices(histories)
+    filled = []
+    rng = np.random.default_rng(1)
+    for row, history in zip(gapped, histories):
+        history = history.copy()
+        # Knock out prices between the first and the latest; the loop sees the previous price repeated instead
+        for hole in sorted(rng.integers(1, len(history) - 1, 5)) if len(history) > 2 else []:
+            row[len(row) - len(history) + hole] = np.nan
+            history[hole] = history[hole - 1]
+        filled.append(history)
+
+    np.testing.assert_array_equal(screen_prices(gapped)['signals'], loop_signals(filled))
+
+
+def test_candidates_are_ranked_by_signals_then_rsi():
+    histories = random_histories(300, seed=3)
+    addresses = [f"Mint{i}" for i in range(len(histories))]
+    result = screen_prices(align_prices(histories), addresses, min_signals=1)
+
+    scores = result['signals'].sum(axis=1)
+    candidates = result['candidates']
+    assert sorted(c['row'] for c in candidates) == list(np.flatnonzero(scores >= 1))
+    keys = [(-c['score'], c['rsi'] if not np.isnan(c['rsi']) else np.inf) for c in candidates]
+    assert keys == sorted(keys)
+    assert all(c['address'] == addresses[c['row']] for c in candidates)
+    assert screen_prices(align_prices(histories), addresses, top=5)['candidates'] == candidates[:5]
+
+
+def test_states_screen_like_their_price_matrix():
+    histories = random_histories(30, seed=4)
+    states = []
+    for i, history in enumerate(histories):
+        state = ContractState(f"Mint{i}")
+        state.append_prices(np.arange(len(history)) * 60, history)
+        states.append(state)
+
+    result = screen_states(states)
+    np.testing.assert_array_equal(result['signals'], loop_signals(histories))
+    assert {c['address'] for c in result['candidates']} <= {state.address for state in states}
+
+
+def test_empty_and_degenerate_matrices():
+    assert screen_prices(np.empty((0, 0)))['candidates'] == []
+    result = screen_prices(align_prices([[1.0], [2.0, 3.0]]))
+    assert not result['signals'].any()
+    with pytest.raises(ValueError):
+        screen_prices(np.zeros(5))
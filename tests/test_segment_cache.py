@@ -0,0 +1,129 @@
+import os
+import time
+import numpy as np
+import pytest
+import segment_cache
+from benchmarks.synthetic import make_token_accounts
+from cache import TwoTierCache, MISSING
+from contract_state import ContractState
+from segment_cache import SegmentStore, extract_balances
+
+
+@pytest.fixture
+def accounts():
+    return make_token_accounts(200, seed=3)
+
+
+def test_load_balances_is_a_view_into_the_segment(tmp_path, accounts):
+    store = SegmentStore(str(tmp_path / 'contracts.seg'), ttl=60)
+    store.save_entry('Mint', accounts)
+
+    timestamp, balances = store.load_balances('Mint')
+    assert time.time() - timestamp < 60
+    np.testing.assert_array_equal(balances, extract_balances(accounts))
+    assert not balances.flags.writeable
+    assert isinstance(memoryview(balances.base).obj, segment_cache.mmap.mmap)
+    assert store.load_balances('Other') is None
+
+
+def test_load_balances_skips_stale_entries(tmp_path, accounts):
+    store = SegmentStore(str(tmp_path / 'contracts.seg'), ttl=60)
+    store.save_entry('Mint', accounts, timestamp=time.time() - 120)
+    assert store.load_balances('Mint') is None
+    assert store.load_entry('Mint') is None
+
+
+def test_cache_balances_feed_contract_state_and_analysis(tmp_path, accounts):
+    import main
+
+    path = str(tmp_path / 'contracts.seg')
+    TwoTierCache(ttl=60, enabled=True, disk_tier=SegmentStore(path, ttl=60)).set('Mint', accounts)
+    # A fresh memory tier, as after a restart: the hit comes from the segment
+    cache = TwoTierCache(ttl=60, enabled=True, disk_tier=SegmentStore(path, ttl=60))
+    balances = cache.get_balances('Mint')
+    assert isinstance(balances, np.ndarray)
+    assert cache.stats()['disk_hits'] == 1
+    assert cache.get_balances('Other') is MISSING
+
+    from_view, from_accounts = ContractState('Mint'), ContractState('Mint')
+    from_view.load(balances)
+    from_accounts.load(accounts)
+    assert np.shares_memory(from_view.balances, balances)
+    assert main.analyze_contract_data(from_view) == main.analyze_contract_data(from_accounts)
+
+
+def test_get_or_load_can_return_balances(tmp_path, accounts):
+    path = str(tmp_path / 'contracts.seg')
+    SegmentStore(path, ttl=60).save_entry('Mint', accounts)
+    cache = TwoTierCache(ttl=60, enabled=True, disk_tier=SegmentStore(path, ttl=60))
+    loaded = []
+
+    data = cache.get_or_load('Mint', loaded.append, balances=True)
+    np.testing.assert_array_equal(data, extract_balances(accounts))
+    assert not loaded
+    assert cache.get_or_load('Mint', loaded.append) == accounts
+
+
+def test_fetch_returns_accounts_unless_balances_are_asked_for(tmp_path, accounts, monkeypatch):
+    import main
+
+    path = str(tmp_path / 'contracts.seg')
+    SegmentStore(path, ttl=60).save_entry('Mint', accounts)
+    SegmentStore(path, ttl=60).save_entry('Other', accounts[:10])
+    monkeypatch.setattr(main, '_contract_cache', TwoTierCache(ttl=60, enabled=True,
+                                                              disk_tier=SegmentStore(path, ttl=60)))
+
+    assert main.fetch_contract_data('Mint') == accounts
+    assert main.fetch_contracts_data(['Other']) == {'Other': accounts[:10]}
+    # A fresh memory tier, so the analysis lookups are answered from the segment
+    monkeypatch.setattr(main, '_contract_cache', TwoTierCache(ttl=60, enabled=True,
+                                                              disk_tier=SegmentStore(path, ttl=60)))
+    np.testing.assert_array_equal(main.fetch_contract_data('Mint', balances=True), extract_balances(accounts))
+    np.testing.assert_array_equal(main.fetch_contracts_data(['Other'], balances=True)['Other'],
+                                  extract_balances(accounts[:10]))
+
+def test_rewrites_compact_once_superseded_records_pass_the_ratio(tmp_path, accounts, monkeypatch):
+    monkeypatch.setattr(segment_cache, 'COMPACT_MIN_BYTES', 0)
+    store = SegmentStore(str(tmp_path / 'contracts.seg'), ttl=60, compact_ratio=0.5)
+    store.save_entry('Other', accounts[:10])
+    store.save_entry('Mint', accounts)
+    _, first = store.load_balances('Mint')
+    record_size = os.path.getsize(store.path)
+
+    for _ in range(10):
+        store.save_entry('Mint', accounts)
+        assert store.dead_bytes() <= 0.5 * os.path.getsize(store.path)
+    assert os.path.getsize(store.path) < 3 * record_size
+    assert sorted(store.keys()) == ['Mint', 'Other']
+    np.testing.assert_array_equal(store.load_balances('Other')[1], extract_balances(accounts[:10]))
+    # Views taken before a compaction still read the replaced file
+    np.testing.assert_array_equal(first, extract_balances(accounts))
+
+
+def test_open_compacts_a_segment_full_of_superseded_records(tmp_path, accounts, monkeypatch):
+    monkeypatch.setattr(segment_cache, 'COMPACT_MIN_BYTES', 0)
+    path = str(tmp_path / 'contracts.seg')
+    store = SegmentStore(path, ttl=60, compact_ratio=0)
+    for _ in range(4):
+        store.save_entry('Mint', accounts)
+    store.close()
+    size = os.path.getsize(path)
+
+    store = SegmentStore(path, ttl=60, compact_ratio=0.5)
+    assert os.path.getsize(path) == size // 4
+    assert store.dead_bytes() == 0
+    assert store.load_entry('Mint')[1] == accounts
+
+
+def test_appends_after_a_truncated_tail_stay_readable(tmp_path, accounts):
+    path = str(tmp_path / 'contracts.seg')
+    store = SegmentStore(path, ttl=60)
+    store.save_entry('Mint', accounts)
+    store.close()
+    with open(path, 'ab') as f:
+        f.write(b'ASG1 partial record')
+
+    store = SegmentStore(path, ttl=60)
+    store.save_entry('Other', accounts[:5])
+    assert store.load_entry('Other')[1] == accounts[:5]
+    assert sorted(SegmentStore(path, ttl=60).keys()) == ['Mint', 'Other']
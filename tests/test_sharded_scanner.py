@@ -0,0 +1,69 @@
+import os
+import sys
+from sharded_scanner import HashRing, ShardedScanner
+from scan_scheduler import ScanScheduler
+from signal_journal import SignalJournal
+from settings import reload_settings
+
+
+def test_shards_started_from_main_get_their_own_cache_and_journal(app_env, monkeypatch):
+    # Spawned shards re-import the parent's __main__ as __mp_main__ before the worker applies its overrides,
+    # which is what happens when the scanner is started by running main.py
+    import main
+    monkeypatch.setitem(sys.modules, '__main__', main)
+    monkeypatch.setenv('CACHE_ENABLED', '1')
+    reload_settings()
+    addresses = [f"Shard{i:04d}" for i in range(20)]
+
+    with ShardedScanner(2, scheduler=ScanScheduler(path=None), batch_size=5) as scanner:
+        scanned = scanner.sweep(addresses, timeout=120)
+    assert set(scanned) == set(addresses)
+
+    cache_dir, journal_dir = app_env / 'cache', app_env / 'journal'
+    assert not list(cache_dir.glob('*.json'))
+    assert not (journal_dir / 'contracts.txt').exists()
+    for shard_id, owned in HashRing([0, 1]).assign(addresses).items():
+        assert {path.stem for path in (cache_dir / f"shard-{shard_id}").glob('*.json')} == set(owned)
+        journal = SignalJournal(root=os.path.join(journal_dir, f"shard-{shard_id}"))
+        try:
+            journaled = {journal.decode(record)['contract_address'] for record in journal.scan()}
+            assert journaled == set(owned)
+            assert journal.stats()['contracts'] == len(owned)
+        finally:
+            journal.close()
+
+
+def started(scanner):
+    """Wait until every worker has imported the application and is ready for batches."""
+    while not all(shard.ready for shard in scanner._shards.values()):
+        scanner._poll(0.5)
+    return scanner
+
+
+def test_sweep_survives_a_worker_dying(app_env):
+    addresses = [f"Shard{i:04d}" for i in range(20)]
+
+    with started(ShardedScanner(2, scheduler=ScanScheduler(path=None), batch_size=5, respawn=False)) as scanner:
+        # Shard 0 dies before it picks up its batches, so they are still in flight when the sweep reaps it
+        crashed = scanner._shards[0].process
+        crashed.kill()
+        crashed.join()
+        scanned = scanner.sweep(addresses, timeout=120)
+        stats = scanner.stats()
+
+    assert set(scanned) == set(addresses)
+    assert list(stats['shards']) == [1]
+    assert stats['requeued'] == len(HashRing([0, 1]).assign(addresses)[0])
+
+
+def test_sweep_returns_when_the_last_worker_dies(app_env):
+    addresses = [f"Shard{i:04d}" for i in range(10)]
+
+    with started(ShardedScanner(1, scheduler=ScanScheduler(path=None), batch_size=5, respawn=False)) as scanner:
+        crashed = scanner._shards[0].process
+        crashed.kill()
+        crashed.join()
+        scanned = scanner.sweep(addresses, timeout=120)
+        assert not scanner.stats()['shards']
+
+    assert scanned == {}
@@ -0,0 +1,154 @@
+import json
+import os
+import time
+import signal_journal
+from signal_journal import (CONTRACTS_FILE, FLAG_ALERTED, INDEX_SUFFIX, KIND_CONTRACT, KIND_STRATEGY, RECORD,
+                            SEGMENT_HEADER, SignalJournal)
+
+
+def open_journal(root, **kwargs):
+    kwargs.setdefault('segment_records', 4)
+    kwargs.setdefault('flush_interval', 3600.0)
+    kwargs.setdefault('retention_days', 0)
+    return SignalJournal(root=str(root), **kwargs)
+
+
+def segment_files(root):
+    return sorted(name for name in os.listdir(root) if name.endswith('.seg'))
+
+
+def addresses(journal, records):
+    return [journal.decode(record)['contract_address'] for record in records]
+
+
+def test_segments_roll_and_seal(tmp_path):
+    journal = open_journal(tmp_path)
+    for i in range(10):
+        journal.record(KIND_STRATEGY, 'MintA' if i % 2 else 'MintB', (float(i),), timestamp=1000.0 + i)
+    journal.flush()
+
+    assert segment_files(tmp_path) == [f"signals-{n:08d}.seg" for n in (1, 2, 3)]
+    for n, (first, last) in ((1, (1000.0, 1003.0)), (2, (1004.0, 1007.0))):
+        with open(tmp_path / f"signals-{n:08d}.seg{INDEX_SUFFIX}") as f:
+            assert json.load(f) == {'count': 4, 'first': first, 'last': last, 'contracts': [0, 1]}
+    # The active segment has no index until it is sealed
+    assert not (tmp_path / f"signals-00000003.seg{INDEX_SUFFIX}").exists()
+    assert os.path.getsize(tmp_path / 'signals-00000003.seg') == SEGMENT_HEADER.size + 2 * RECORD.size
+    assert journal.stats() == {'segments': 3, 'records': 10, 'buffered': 0, 'contracts': 2}
+
+    assert journal.scan()['values'][:, 0].tolist() == [float(i) for i in range(10)]
+    assert journal.scan(start=1003.0, end=1007.0)['timestamp'].tolist() == [1003.0, 1004.0, 1005.0, 1006.0]
+    assert journal.price_series('MintA', start=1004.0)[1].tolist() == [5.0, 7.0, 9.0]
+    journal.close()
+
+    # Reopened, the sealed segments are read from their index and writing continues in the active one
+    reopened = open_journal(tmp_path)
+    reopened.record(KIND_STRATEGY, 'MintA', (10.0,), timestamp=1010.0)
+    reopened.record(KIND_STRATEGY, 'MintA', (11.0,), timestamp=1011.0)
+    reopened.flush()
+    assert segment_files(tmp_path) == [f"signals-{n:08d}.seg" for n in (1, 2, 3, 4)]
+    assert reopened.stats() == {'segments': 4, 'records': 12, 'buffered': 0, 'contracts': 2}
+    assert reopened.scan()['values'][:, 0].tolist() == [float(i) for i in range(12)]
+    reopened.close()
+
+
+def test_timestamps_never_go_backwards(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record(KIND_STRATEGY, 'MintA', (1.0,), timestamp=2000.0)
+    journal.record(KIND_STRATEGY, 'MintA', (2.0,), timestamp=1000.0)
+    assert journal.scan()['timestamp'].tolist() == [2000.0, 2000.0]
+    journal.close()
+
+
+def test_reopen_after_a_partial_write(tmp_path):
+    journal = open_journal(tmp_path, segment_records=100)
+    for i in range(5):
+        journal.record(KIND_STRATEGY, f"Mint{i % 3}", (float(i),), timestamp=1000.0 + i)
+    journal.close()
+
+    # A crash mid-write: half a record in the active segment and an unterminated contract line
+    segment = tmp_path / 'signals-00000001.seg'
+    with open(segment, 'ab') as f:
+        f.write(b'\x01' * (RECORD.size // 2))
+    with open(tmp_path / CONTRACTS_FILE, 'a') as f:
+        f.write('MintPart')
+
+    reopened = open_journal(tmp_path, segment_records=100)
+    assert os.path.getsize(segment) == SEGMENT_HEADER.size + 5 * RECORD.size
+    assert (tmp_path / CONTRACTS_FILE).read_text() == 'Mint0\nMint1\nMint2\n'
+    assert reopened.stats()['records'] == 5
+
+    # New records land at their real offsets and new contracts get the next id
+    reopened.record(KIND_STRATEGY, 'MintNew', (5.0,), timestamp=1005.0)
+    reopened.record(KIND_STRATEGY, 'Mint1', (6.0,), timestamp=1006.0)
+    reopened.close()
+
+    journal = open_journal(tmp_path, segment_records=100)
+    records = journal.scan()
+    assert records['values'][:, 0].tolist() == [float(i) for i in range(7)]
+    assert addresses(journal, records) == ['Mint0', 'Mint1', 'Mint2', 'Mint0', 'Mint1', 'MintNew', 'Mint1']
+    assert (tmp_path / CONTRACTS_FILE).read_text() == 'Mint0\nMint1\nMint2\nMintNew\n'
+    journal.close()
+
+
+def test_segment_shorter_than_its_header_is_reset(tmp_path):
+    journal = open_journal(tmp_path)
+    for i in range(4):
+        journal.record(KIND_STRATEGY, 'MintA', (float(i),), timestamp=1000.0 + i)
+    journal.close()
+    # The crash hit right after the next segment was created
+    active = tmp_path / 'signals-00000002.seg'
+    with open(active, 'r+b') as f:
+        f.truncate(3)
+
+    reopened = open_journal(tmp_path)
+    assert os.path.getsize(active) == SEGMENT_HEADER.size
+    reopened.record(KIND_STRATEGY, 'MintA', (4.0,), timestamp=1004.0)
+    assert reopened.scan()['values'][:, 0].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    reopened.close()
+
+
+def test_expired_segments_are_removed(tmp_path):
+    journal = open_journal(tmp_path, segment_records=2, retention_days=1)
+    old = time.time() - 3 * signal_journal.SECONDS_PER_DAY
+    journal.record(KIND_STRATEGY, 'MintA', (1.0,), timestamp=old)
+    journal.record(KIND_STRATEGY, 'MintA', (2.0,), timestamp=old + 1)
+    # Sealing the old segment applied the retention at once
+    assert segment_files(tmp_path) == ['signals-00000002.seg']
+    assert not (tmp_path / f"signals-00000001.seg{INDEX_SUFFIX}").exists()
+
+    now = time.time()
+    journal.record(KIND_STRATEGY, 'MintA', (3.0,), timestamp=now)
+    journal.record(KIND_STRATEGY, 'MintA', (4.0,), timestamp=now + 1)
+    journal.record(KIND_STRATEGY, 'MintA', (5.0,), timestamp=now + 2)
+    journal.flush()
+    assert segment_files(tmp_path) == ['signals-00000002.seg', 'signals-00000003.seg']
+    assert journal.scan()['values'][:, 0].tolist() == [3.0, 4.0, 5.0]
+    journal.close()
+
+
+def test_duplicate_alerts_are_recognised_across_a_reopen(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.record(KIND_CONTRACT, 'MintA', (1.0, 2.0, 3.0), FLAG_ALERTED, timestamp=1000.0)
+    # Not alerted (e.g. the send failed), so it does not count as the last alert
+    journal.record(KIND_CONTRACT, 'MintA', (9.0, 9.0, 9.0), 0, timestamp=1001.0)
+    journal.record(KIND_CONTRACT, 'MintB', (4.0,), FLAG_ALERTED, timestamp=1002.0)
+    journal.record(KIND_CONTRACT, 'MintB', (5.0,), FLAG_ALERTED, timestamp=1003.0)
+    journal.record(KIND_CONTRACT, 'MintC', (6.0,), 0, timestamp=1004.0)
+    journal.close()
+
+    reopened = open_journal(tmp_path)
+    assert reopened.is_duplicate_alert('MintA', (1.0, 2.0, 3.0))
+    assert not reopened.is_duplicate_alert('MintA', (9.0, 9.0, 9.0))
+    assert not reopened.is_duplicate_alert('MintA', (1.0, 2.0, 3.0 + 1e-6))
+    assert reopened.is_duplicate_alert('MintB', (5.0,))
+    assert not reopened.is_duplicate_alert('MintB', (4.0,))
+    assert not reopened.is_duplicate_alert('MintC', (6.0,))
+    assert not reopened.is_duplicate_alert('MintD', (6.0,))
+    assert not reopened.is_duplicate_alert('MintA', (1.0, 2.0, 3.0), kind=KIND_STRATEGY)
+
+    # Alerts recorded after the reopen update the lookup
+    reopened.record(KIND_CONTRACT, 'MintA', (9.0, 9.0, 9.0), FLAG_ALERTED, timestamp=1005.0)
+    assert reopened.is_duplicate_alert('MintA', (9.0, 9.0, 9.0))
+    assert not reopened.is_duplicate_alert('MintA', (1.0, 2.0, 3.0))
+    reopened.close()
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from support_resistance import SupportResistanceTracker, local_extrema, rolling_min_max, support_resistance_levels
+
+
+def random_market(length, seed):
+    rng = np.random.default_rng(seed)
+    # Rounded prices so equal highs/lows (ties) occur, as they do with real tick sizes
+    prices = np.round(100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, length))), 1)
+    volumes = rng.lognormal(0.0, 1.0, length)
+    return prices, volumes
+
+
+def assert_levels_equal(streamed, batch):
+    assert [level['touches'] for level in streamed] == [level['touches'] for level in batch]
+    # Pivots are summed in a different order, so densities may differ in the last bits
+    assert [level['price'] for level in streamed] == pytest.approx([level['price'] for level in batch], rel=1e-9)
+    assert [level['strength'] for level in streamed] == pytest.approx([level['strength'] for level in batch],
+                                                                       rel=1e-9)
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('window', [1, 5, 50])
+def test_tracker_window_low_high_match_rolling_min_max(seed, window):
+    prices, _ = random_market(300, seed)
+    mins, maxs = rolling_min_max(prices, window)
+    tracker = SupportResistanceTracker(window=window)
+    for i, price in enumerate(prices):
+        tracker.update(float(price))
+        if i >= window - 1:
+            assert (tracker.low, tracker.high) == (mins[i], maxs[i])
+        else:
+            assert (tracker.low, tracker.high) == (prices[:i + 1].min(), prices[:i + 1].max())
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('order', [1, 3, 5])
+def test_tracker_confirms_the_batch_pivots(seed, order):
+    prices, _ = random_market(400, seed)
+    lows, highs = local_extrema(prices, order)
+    tracker = SupportResistanceTracker(order=order)
+    # A pivot at tick t is confirmed once tick t + order arrives
+    confirmed = [i - order for i, price in enumerate(prices) if tracker.update(float(price))]
+    assert confirmed == sorted(set(lows) | set(highs))
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('length', [1, 10, 11, 60, 500])
+def test_tracker_snapshot_matches_batch_levels(seed, length):
+    prices, volumes = random_market(length, seed)
+    tracker = SupportResistanceTracker.from_history(prices, volumes, window=length, max_pivots=2 * length)
+    streamed = tracker.snapshot()
+    batch = support_resistance_levels(prices, volumes)
+
+    assert (streamed['support'], streamed['resistance']) == pytest.approx((batch['support'], batch['resistance']),
+                                                                         rel=1e-9)
+    assert_levels_equal(streamed['supports'], batch['supports'])
+    assert_levels_equal(streamed['resistances'], batch['resistances'])
+
+
+def test_levels_cluster_repeated_pivots():
+    # A range-bound series bouncing between 10 and 12 yields a support near 10 and a resistance near 12
+    prices = np.tile(np.concatenate([np.linspace(10.0, 12.0, 10), np.linspace(12.0, 10.0, 10)[1:-1]]), 10)
+    levels = support_resistance_levels(np.append(prices, 11.0))
+    assert levels['support'] == pytest.approx(10.0, rel=0.01)
+    assert levels['resistance'] == pytest.approx(12.0, rel=0.01)
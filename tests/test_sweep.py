@@ -0,0 +1,46 @@
+import numpy as np
+from backtest import backtest_strategy
+from sweep import parameter_grid, run_parameter_sweep, sweep_results_frame
+
+
+def random_prices(length, seed):
+    rng = np.random.default_rng(seed)
+    return 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.03, length)))
+
+
+def test_sweep_matches_serial_backtests():
+    price_series = {f"Mint{i}": random_prices(length, seed=i) for i, length in enumerate([400, 250, 30, 1])}
+    param_sets = parameter_grid(sma_window=[5, 14], fast=[6, 12], slow=[26], signal=[9])
+    streamed = []
+
+    results = run_parameter_sweep(price_series, param_sets, max_workers=2, chunk_size=3, fee_rate=0.001,
+                                  on_result=lambda contract, params, row: streamed.append((contract, params)))
+
+    table = results['table']
+    assert len(table) == len(streamed) == len(price_series) * len(param_sets)
+    assert sorted(zip(table['contract'], table['params'])) == [
+        (c, p) for c in range(len(price_series)) for p in range(len(param_sets))]
+    for row in table:
+        contract = results['contracts'][row['contract']]
+        summary = backtest_strategy(contract, price_series[contract], fee_rate=0.001,
+                                    **param_sets[row['params']])['summary']
+        # Same code on the same float64 prices: the worker results must be identical, not just close
+        assert row['final_equity'] == summary['final_equity']
+        assert row['total_return'] == summary['total_return']
+        assert row['max_drawdown'] == summary['max_drawdown']
+        assert row['num_trades'] == summary['num_trades']
+        assert row['win_rate'] == summary['win_rate']
+
+
+def test_results_frame_names_contracts_and_parameters():
+    price_series = {'A': random_prices(120, seed=1), 'B': random_prices(120, seed=2)}
+    param_sets = parameter_grid(sma_window=[5, 20])
+    frame = sweep_results_frame(run_parameter_sweep(price_series, param_sets, max_workers=1))
+
+    assert sorted(zip(frame['contract'], frame['sma_window'])) == [('A', 5), ('A', 20), ('B', 5), ('B', 20)]
+    assert list(frame['total_return']) == sorted(frame['total_return'], reverse=True)
+
+
+def test_empty_sweep():
+    results = run_parameter_sweep({}, parameter_grid(sma_window=[5]))
+    assert len(results['table']) == 0
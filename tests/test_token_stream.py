@@ -0,0 +1,66 @@
+import json
+import numpy as np
+import pytest
+import transport
+from benchmarks.synthetic import make_token_accounts
+from token_stream import fetch_token_balances, parse_ui_amounts
+from transport import Transport
+
+
+def response_body(accounts):
+    return json.dumps({'jsonrpc': '2.0', 'id': 1, 'result': {'context': {'slot': 1}, 'value': accounts}}).encode()
+
+
+def decoded_balances(body):
+    """Today's approach: decode the whole response, then walk every account for its uiAmount."""
+    accounts = json.loads(body)['result']['value']
+    return [entry['account']['data']['parsed']['info']['tokenAmount']['uiAmount'] for entry in accounts]
+
+
+def chunked(body, size):
+    return (body[i:i + size] for i in range(0, len(body), size))
+
+
+@pytest.fixture
+def accounts():
+    accounts = make_token_accounts(300, seed=5)
+    # Null balances (uninitialized amounts) and exponent notation both occur in real responses
+    accounts[7]['account']['data']['parsed']['info']['tokenAmount']['uiAmount'] = None
+    accounts[8]['account']['data']['parsed']['info']['tokenAmount']['uiAmount'] = 1e-06
+    accounts[9]['account']['data']['parsed']['info']['tokenAmount']['uiAmount'] = 2.5e+21
+    return accounts
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 63, 64, 65, 4096, 1 << 30])
+def test_scanner_matches_full_decode(accounts, chunk_size):
+    body = response_body(accounts)
+    expected = [value for value in decoded_balances(body) if value is not None]
+
+    balances = parse_ui_amounts(chunked(body, chunk_size), use_ijson=False)
+
+    assert balances.dtype == np.float64
+    np.testing.assert_array_equal(balances, expected)
+
+
+def test_ijson_matches_full_decode(accounts):
+    pytest.importorskip('ijson')
+    body = response_body(accounts)
+    expected = [value for value in decoded_balances(body) if value is not None]
+    np.testing.assert_array_equal(parse_ui_amounts(chunked(body, 100), use_ijson=True), expected)
+
+
+def test_empty_result():
+    assert len(parse_ui_amounts([response_body([])], use_ijson=False)) == 0
+
+
+def test_streamed_balances_analyze_like_account_lists(rpc_servers, monkeypatch):
+    import main
+
+    monkeypatch.setattr(transport, '_transport', Transport(max_retries=0))
+    server = rpc_servers(bad_owners={'Broken'})
+
+    balances = fetch_token_balances('Owner1', rpc_url=server.url)
+
+    np.testing.assert_array_equal(balances, decoded_balances(response_body(server.accounts('Owner1'))))
+    assert main.analyze_contract_data(balances) == main.analyze_contract_data(server.accounts('Owner1'))
+    assert fetch_token_balances('Broken', rpc_url=server.url) is None
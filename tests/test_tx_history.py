@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+import transport
+from benchmarks.fake_rpc import FakeSolanaRpc
+from contract_state import ContractState
+from historical_store import HistoricalStore
+from transport import Transport
+from tx_history import TransactionHistoryIngester, transfers_to_bars
+
+MINT = 'MintA'
+
+
+@pytest.fixture(autouse=True)
+def direct_transport(monkeypatch):
+    monkeypatch.setattr(transport, '_transport', Transport(max_retries=0))
+
+
+def ingester(server, directory, max_transactions):
+    """A fresh ingester over the same directory, as after a restart."""
+    return TransactionHistoryIngester(server.url, str(directory / 'tx'), max_transactions=max_transactions,
+                                      page_size=40, batch_size=16, workers=2,
+                                      store=HistoricalStore(str(directory / 'history')))
+
+
+def full_history(server, tmp_path):
+    """Transfers of the whole history, ingested in one unbounded run."""
+    reference = ingester(server, tmp_path / 'reference', 10 ** 6)
+    assert reference.ingest(MINT)['complete']
+    return reference.load_transfers(MINT)
+
+
+def test_reruns_resume_backfill_from_the_checkpoint(rpc_servers, tmp_path):
+    server = rpc_servers(transactions_per_address=250)
+
+    first = ingester(server, tmp_path, 100).ingest(MINT)
+    assert (first['signatures'], first['complete']) == (100, False)
+    checkpoint = ingester(server, tmp_path, 100).load_checkpoint(MINT)
+    assert checkpoint['newest'] == FakeSolanaRpc.signature(MINT, 249)
+    assert checkpoint['oldest'] == FakeSolanaRpc.signature(MINT, 150)
+
+    second = ingester(server, tmp_path, 100).ingest(MINT)
+    assert (second['signatures'], second['complete']) == (100, False)
+    assert ingester(server, tmp_path, 100).load_checkpoint(MINT)['oldest'] == FakeSolanaRpc.signature(MINT, 50)
+    third = ingester(server, tmp_path, 100).ingest(MINT)
+    assert (third['signatures'], third['complete']) == (50, True)
+
+    # Nothing new: one empty signature page and no transaction bodies
+    requests = server.requests
+    assert ingester(server, tmp_path, 100).ingest(MINT)['signatures'] == 0
+    assert server.requests == requests + 1
+    np.testing.assert_array_equal(ingester(server, tmp_path, 100).load_transfers(MINT),
+                                  full_history(server, tmp_path))
+
+
+def test_new_transactions_over_budget_leave_a_gap_filled_by_later_runs(rpc_servers, tmp_path):
+    server = rpc_servers(transactions_per_address=100)
+    assert ingester(server, tmp_path, 1000).ingest(MINT)['complete']
+
+    server.transactions_per_address = 350
+    assert ingester(server, tmp_path, 100).ingest(MINT)['signatures'] == 100
+    checkpoint = ingester(server, tmp_path, 100).load_checkpoint(MINT)
+    assert checkpoint['newest'] == FakeSolanaRpc.signature(MINT, 349)
+    assert checkpoint['gaps'] == [[FakeSolanaRpc.signature(MINT, 250), FakeSolanaRpc.signature(MINT, 99)]]
+
+    assert ingester(server, tmp_path, 100).ingest(MINT)['signatures'] == 100
+    assert ingester(server, tmp_path, 100).load_checkpoint(MINT)['gaps'] == [
+        [FakeSolanaRpc.signature(MINT, 150), FakeSolanaRpc.signature(MINT, 99)]]
+    assert ingester(server, tmp_path, 100).ingest(MINT)['signatures'] == 50
+    assert ingester(server, tmp_path, 100).load_checkpoint(MINT)['gaps'] == []
+    np.testing.assert_array_equal(ingester(server, tmp_path, 100).load_transfers(MINT),
+                                  full_history(server, tmp_path))
+
+
+def test_failed_transaction_batches_are_retried_next_run(rpc_servers, tmp_path):
+    # Requests 1-3 list the signatures; request 4 is one of the transaction batches
+    server = rpc_servers(transactions_per_address=100, fail_requests={4})
+
+    first = ingester(server, tmp_path, 1000).ingest(MINT)
+    assert first['complete'] and first['retry'] > 0
+    retry = ingester(server, tmp_path, 1000).load_checkpoint(MINT)['retry']
+    assert len(retry) == first['retry']
+
+    second = ingester(server, tmp_path, 1000).ingest(MINT)
+    assert (second['signatures'], second['transactions'], second['retry']) == (0, len(retry), 0)
+    np.testing.assert_array_equal(ingester(server, tmp_path, 1000).load_transfers(MINT),
+                                  full_history(server, tmp_path))
+
+
+def test_state_bars_match_the_stored_history_across_runs(rpc_servers, tmp_path):
+    # Transactions land every 30s in 60s bars, so the 101st opens a bar the 102nd lands in
+    server = rpc_servers(transactions_per_address=101)
+    state = ContractState(MINT)
+    assert ingester(server, tmp_path, 1000).ingest(MINT, state=state)['complete']
+
+    server.transactions_per_address = 102
+    assert ingester(server, tmp_path, 1000).ingest(MINT, state=state)['signatures'] == 1
+    history = state.price_history()
+    expected = transfers_to_bars(full_history(server, tmp_path), 60)
+    for column, values in zip(('timestamp', 'price', 'volume'), expected):
+        np.testing.assert_array_equal(history[column], values)
@@ -0,0 +1,134 @@
+import json
+import re
+from array import array
+import logging
+import numpy as np
+from rpc_batch import token_accounts_params
+from transport import get_transport
+from rpc_router import get_rpc_router
+
+try:
+    import ijson
+except ImportError:  # Optional: the built-in scanner below handles the same responses
+    ijson = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Path of every balance in a getTokenAccountsByOwner response, in ijson prefix notation
+UI_AMOUNT_PREFIX = 'result.value.item.account.data.parsed.info.tokenAmount.uiAmount'
+# Matches "uiAmount": <number|null> but not "uiAmountString"
+UI_AMOUNT_PATTERN = re.compile(rb'"uiAmount"\s*:\s*(null|-?[0-9][0-9.eE+-]*)')
+# Bytes kept between chunks so a field split across a chunk boundary is still matched
+SCAN_OVERLAP = 64
+# Response bytes kept to report JSON-RPC errors, which carry no balances
+HEAD_BYTES = 65536
+STREAM_CHUNK_SIZE = 65536
+
+
+class _ChunkReader:
+    """File-like wrapper over an iterable of byte chunks, for ijson."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _scan_ui_amounts(chunks, out):
+    """Chunked regex scan for uiAmount values; keeps a small overlap between chunks."""
+    tail = b''
+    for chunk in chunks:
+        buffer = tail + chunk
+        consumed = 0
+        for match in UI_AMOUNT_PATTERN.finditer(buffer):
+            # A number touching the end of the buffer may continue in the next chunk
+            if match.end() == len(buffer):
+                break
+            value = match.group(1)
+            if value != b'null':
+                out.append(float(value))
+            consumed = match.end()
+        tail = buffer[max(consumed, len(buffer) - SCAN_OVERLAP):]
+    match = UI_AMOUNT_PATTERN.search(tail)
+    if match is not None and match.group(1) != b'null':
+        out.append(float(match.group(1)))
+
+
+def parse_ui_amounts(chunks, use_ijson=None):
+    """
+    Extract every uiAmount of a getTokenAccountsByOwner response while it is being read.
+    Only the balances are kept, in a compact array('d'); the account objects are never built.
+    Args:
+    - chunks: iterable - Response body as byte chunks (e.g. response.iter_content()).
+    - use_ijson: bool - Force (True) or disable (False) the ijson parser; defaults to using it when installed.
+    Returns:
+    - np.ndarray: float64 balances (a zero-copy view of the array('d') buffer). Null balances are skipped.
+    """
+    out = array('d')
+    use_ijson = ijson is not None if use_ijson is None else use_ijson
+    if use_ijson and ijson is None:
+        raise ImportError("ijson is not installed")
+    if use_ijson:
+        for value in ijson.items(_ChunkReader(chunks), UI_AMOUNT_PREFIX, use_float=True):
+            if value is not None:
+                out.append(value)
+    else:
+        _scan_ui_amounts(chunks, out)
+    return np.frombuffer(out, dtype=np.float64) if len(out) else np.empty(0, dtype=np.float64)
+
+
+def _head_recorder(chunks, head):
+    for chunk in chunks:
+        if len(head) < HEAD_BYTES:
+            head.extend(chunk[:HEAD_BYTES - len(head)])
+        yield chunk
+
+
+def fetch_token_balances(contract_address, rpc_url=None, rate_limiter=None):
+    """
+    Fetch token balances for a contract, parsing the response as it streams in.
+    Args:
+    - contract_address: str - Address whose token accounts are requested.
+    - rpc_url: str - JSON-RPC endpoint (routed across RPC_ENDPOINTS when omitted).
+    - rate_limiter: TokenBucket - Optional limiter charged one token for the call.
+    Returns:
+    - np.ndarray: float64 balances, or None if the RPC returned an error.
+    """
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+    payload = {'jsonrpc': '2.0', 'id': 1, 'method': 'getTokenAccountsByOwner',
+               'params': token_accounts_params(contract_address)}
+    if rpc_url is None:
+        response = get_rpc_router().post(endpoint='rpc.getTokenAccountsByOwner', json=payload, stream=True)
+    else:
+        response = get_transport().post(rpc_url, json=payload, endpoint='rpc.getTokenAccountsByOwner', stream=True)
+    try:
+        response.raise_for_status()
+        head = bytearray()
+        balances = parse_ui_amounts(_head_recorder(response.iter_content(STREAM_CHUNK_SIZE), head))
+    finally:
+        response.close()
+
+    if not len(balances) and len(head) < HEAD_BYTES:
+        # Small bodies without balances are either empty results or JSON-RPC errors
+        try:
+            error = json.loads(bytes(head)).get('error')
+        except (ValueError, AttributeError):
+            error = None
+        if error is not None:
+            logger.error(f"Streaming fetch for {contract_address} failed: {error}")
+            return None
+    logger.info(f"Streamed {len(balances)} balances for {contract_address}")
+    return balances
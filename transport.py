@@ -0,0 +1,194 @@
+import random
+import threading
+import time
+import logging
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+import metrics
+from settings import get_settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class EndpointStats:
+    """
+    Request counters for a single endpoint.
+    """
+    __slots__ = ('requests', 'errors', 'retries', 'total_latency', 'max_latency')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'avg_latency': self.total_latency / self.requests if self.requests else 0.0,
+            'max_latency': self.max_latency,
+        }
+
+
+class Transport:
+    """
+    Pooled HTTP transport with keep-alive connections, timeouts, jittered retries and per-endpoint stats.
+    Options left as None take their HTTP_* setting.
+    Args:
+    - connect_timeout: float - Seconds to establish a connection.
+    - read_timeout: float - Seconds to wait for a response.
+    - max_retries: int - Retries on connection errors and RETRY_STATUSES responses.
+    - backoff_base: float - Base delay for exponential backoff.
+    - backoff_max: float - Maximum single backoff delay.
+    - pool_size: int - Keep-alive connections kept per host.
+    - proxy_url: str - Optional proxy for all requests.
+    """
+
+    def __init__(self, connect_timeout=None, read_timeout=None, max_retries=None, backoff_base=None, backoff_max=None,
+                 pool_size=None, proxy_url=None):
+        settings = get_settings()
+        self.timeout = (settings.http_connect_timeout if connect_timeout is None else connect_timeout,
+                        settings.http_read_timeout if read_timeout is None else read_timeout)
+        self.max_retries = settings.http_max_retries if max_retries is None else max_retries
+        self.backoff_base = settings.http_backoff_base if backoff_base is None else backoff_base
+        self.backoff_max = settings.http_backoff_max if backoff_max is None else backoff_max
+        pool_size = settings.http_pool_size if pool_size is None else pool_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if proxy_url:
+            self.session.proxies = {'http': proxy_url, 'https': proxy_url}
+
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._rpc_id = 0
+
+    def _backoff(self, attempt, response=None):
+        if response is not None and response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after is not None:
+                try:
+                    return min(float(retry_after), self.backoff_max)
+                except ValueError:
+                    pass
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _record(self, endpoint, latency, error, retried):
+        with self._stats_lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = EndpointStats()
+            stats.requests += 1
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+            if error:
+                stats.errors += 1
+            if retried:
+                stats.retries += 1
+        metrics.observe('http_request_duration_seconds', latency, endpoint=endpoint)
+        metrics.count('http_requests_total', endpoint=endpoint, outcome='error' if error else 'ok')
+
+    def request(self, method, url, endpoint=None, max_retries=None, **kwargs):
+        """
+        Send an HTTP request, retrying transient failures with jittered exponential backoff.
+        Args:
+        - method: str - HTTP method.
+        - url: str - Target URL.
+        - endpoint: str - Label used for stats (defaults to the URL host; pass one for URLs carrying secrets).
+        - max_retries: int - Overrides the transport's retry count for this request (0 lets the caller retry).
+        - kwargs: Extra arguments forwarded to requests.Session.request.
+        Returns:
+        - requests.Response: The final response (possibly an unsuccessful one once retries are exhausted).
+        """
+        endpoint = endpoint or urlsplit(url).netloc
+        kwargs.setdefault('timeout', self.timeout)
+        max_retries = self.max_retries if max_retries is None else max_retries
+
+        for attempt in range(max_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                retry = attempt < max_retries
+                self._record(endpoint, time.perf_counter() - start, True, attempt > 0)
+                if not retry:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"Request to {endpoint} failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            failed = response.status_code in RETRY_STATUSES or response.status_code >= 400
+            self._record(endpoint, time.perf_counter() - start, failed, attempt > 0)
+            if response.status_code in RETRY_STATUSES and attempt < max_retries:
+                delay = self._backoff(attempt, response)
+                logger.warning(f"Request to {endpoint} returned {response.status_code}, retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def rpc_call(self, method, params=None, rpc_url=None):
+        """
+        Make a single Solana JSON-RPC call.
+        Args:
+        - method: str - JSON-RPC method name (e.g. getTokenAccountsByOwner).
+        - params: list - Method parameters.
+        - rpc_url: str - JSON-RPC endpoint (SOLANA_API_URL by default).
+        Returns:
+        - dict: The decoded JSON-RPC response ({'result': ...} or {'error': ...}).
+        """
+        rpc_url = rpc_url or get_settings().solana_api_url
+        with self._stats_lock:
+            self._rpc_id += 1
+            request_id = self._rpc_id
+        payload = {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params or []}
+        response = self.post(rpc_url, json=payload, endpoint=f"rpc.{method}")
+        response.raise_for_status()
+        return response.json()
+
+    def stats(self):
+        """
+        Snapshot of per-endpoint counters.
+        Returns:
+        - dict: Maps endpoint labels to request count, errors, retries and latency.
+        """
+        with self._stats_lock:
+            return {endpoint: stats.as_dict() for endpoint, stats in self._stats.items()}
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """
+    Return the process-wide shared transport, creating it on first use.
+    Returns:
+    - Transport: The shared transport.
+    """
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                settings = get_settings()
+                if settings.use_proxy and not settings.proxy_url:
+                    logger.warning("USE_PROXY is set without PROXY_URL; connecting directly.")
+                _transport = Transport(proxy_url=settings.proxy_url if settings.use_proxy else None)
+    return _transport
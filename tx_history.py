@@ -0,0 +1,420 @@
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+from settings import get_settings
+from transport import get_transport
+from rpc_router import get_rpc_router
+from historical_store import get_history_store
+import metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Compact decoded transfer (40 bytes): signature hash, slot, block time, tokens moved and SOL price per token
+TRANSFER_DTYPE = np.dtype([('signature', '<u8'), ('slot', '<u8'), ('block_time', '<i8'), ('amount', '<f8'),
+                           ('price', '<f8')])
+LAMPORTS_PER_SOL = 10 ** 9
+# Largest page getSignaturesForAddress accepts
+MAX_PAGE_SIZE = 1000
+CHECKPOINT_SUFFIX = '.checkpoint.json'
+TRANSFERS_SUFFIX = '.transfers'
+TRANSACTION_OPTIONS = {'encoding': 'json', 'maxSupportedTransactionVersion': 0, 'commitment': 'finalized'}
+
+
+class RpcError(RuntimeError):
+    """Raised when a JSON-RPC call returns an error object."""
+
+
+def signature_hash(signature):
+    """
+    64-bit hash identifying a transaction in transfer records.
+    Args:
+    - signature: str - Transaction signature.
+    Returns:
+    - int: Stable hash.
+    """
+    return int.from_bytes(hashlib.blake2b(signature.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _ui_amount(balance):
+    amount = balance.get('uiTokenAmount') or {}
+    value = amount.get('uiAmount')
+    if value is None:
+        raw = amount.get('amount')
+        value = int(raw) / 10 ** amount.get('decimals', 0) if raw else 0.0
+    return float(value)
+
+
+def decode_transfer(transaction, mint):
+    """
+    Reduce a getTransaction result to the movement of one token. Only the balance fields of meta are read.
+    The amount is the sum of the token balance increases; the price is the fee payer's SOL change (fee excluded)
+    per token it received or sent, when the two moved in opposite directions (a swap).
+    Args:
+    - transaction: dict - getTransaction result.
+    - mint: str - Token mint address.
+    Returns:
+    - tuple: (slot, block_time, amount, price in SOL or NaN), or None if the transaction failed or did not move
+      the token.
+    """
+    if not transaction:
+        return None
+    meta = transaction.get('meta') or {}
+    if meta.get('err') is not None:
+        return None
+    deltas = {}
+    owners = {}
+    for sign, field in ((-1.0, 'preTokenBalances'), (1.0, 'postTokenBalances')):
+        for balance in meta.get(field) or ():
+            if balance.get('mint') != mint:
+                continue
+            index = balance.get('accountIndex')
+            deltas[index] = deltas.get(index, 0.0) + sign * _ui_amount(balance)
+            owners[index] = balance.get('owner')
+    amount = sum(delta for delta in deltas.values() if delta > 0)
+    if amount <= 0:
+        return None
+
+    price = math.nan
+    keys = ((transaction.get('transaction') or {}).get('message') or {}).get('accountKeys') or []
+    payer = keys[0] if keys else None
+    # jsonParsed encodes account keys as objects
+    payer = payer.get('pubkey') if isinstance(payer, dict) else payer
+    payer_tokens = sum(delta for index, delta in deltas.items() if owners.get(index) == payer)
+    pre, post = meta.get('preBalances') or (), meta.get('postBalances') or ()
+    if payer_tokens and pre and post:
+        lamports = post[0] - pre[0] + (meta.get('fee') or 0)
+        if lamports * payer_tokens < 0:
+            price = -lamports / LAMPORTS_PER_SOL / payer_tokens
+    return transaction.get('slot') or 0, transaction.get('blockTime') or 0, amount, price
+
+
+def transfers_to_bars(transfers, bar_seconds=None):
+    """
+    Aggregate transfers into fixed-width bars: volume is the tokens moved, price the volume-weighted swap price.
+    Args:
+    - transfers: np.ndarray - TRANSFER_DTYPE records.
+    - bar_seconds: int - Bar width (TX_BAR_SECONDS by default).
+    Returns:
+    - tuple: (bar start timestamps int64, prices float64 (NaN without swaps), volumes float64), in time order.
+    """
+    if not len(transfers):
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+    bar_seconds = bar_seconds or get_settings().tx_bar_seconds
+    starts = transfers['block_time'] // bar_seconds * bar_seconds
+    timestamps, inverse = np.unique(starts, return_inverse=True)
+    amounts = transfers['amount']
+    priced = np.isfinite(transfers['price'])
+    volumes = np.bincount(inverse, weights=amounts, minlength=len(timestamps))
+    priced_volume = np.bincount(inverse, weights=np.where(priced, amounts, 0.0), minlength=len(timestamps))
+    value = np.bincount(inverse, weights=np.where(priced, transfers['price'] * amounts, 0.0),
+                        minlength=len(timestamps))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        prices = np.where(priced_volume > 0, value / priced_volume, np.nan)
+    return timestamps, prices, volumes
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class TransactionHistoryIngester:
+    """
+    Incremental, bounded ingestion of a token's transaction history into price/volume bars.
+    Each run pages getSignaturesForAddress newest first from the head down to the previous run's head, then fills
+    gaps a run left when it hit its budget, then backfills older history, spending at most max_transactions
+    signatures in total. Transaction bodies are fetched in concurrent JSON-RPC batches and reduced to compact
+    transfer records, which are appended to a per-contract file; the bars they touch are rebuilt and merged into
+    the historical store. The cursors are checkpointed last, so an interrupted run is simply redone.
+    Options left as None take their TX_* setting.
+    Args:
+    - rpc_url: str - JSON-RPC endpoint (can point at a local stub server); routed across RPC_ENDPOINTS when omitted.
+    - directory: str - Directory for transfer records and checkpoints.
+    - max_transactions: int - Signatures ingested per run (MAX_TRANSACTION_HISTORY).
+    - page_size: int - Signatures per getSignaturesForAddress page.
+    - batch_size: int - getTransaction calls per JSON-RPC batch.
+    - workers: int - Batches fetched concurrently.
+    - bar_seconds: int - Bar width.
+    - store: HistoricalStore - Destination of the bars (the shared store by default).
+    - rate_limiter: TokenBucket - Optional limiter charged one token per RPC call.
+    """
+
+    def __init__(self, rpc_url=None, directory=None, max_transactions=None, page_size=None, batch_size=None,
+                 workers=None, bar_seconds=None, store=None, rate_limiter=None):
+        settings = get_settings()
+        self.rpc_url = rpc_url
+        self.directory = directory = directory or settings.tx_history_dir
+        self.max_transactions = max(1, max_transactions or settings.max_transaction_history)
+        self.page_size = min(MAX_PAGE_SIZE, max(1, page_size or settings.tx_page_size))
+        self.batch_size = max(1, batch_size or settings.tx_batch_size)
+        self.bar_seconds = max(1, bar_seconds or settings.tx_bar_seconds)
+        self.store = store
+        self.rate_limiter = rate_limiter
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers or settings.tx_fetch_workers),
+                                            thread_name_prefix='tx-history')
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, address, suffix):
+        return os.path.join(self.directory, address + suffix)
+
+    def _lock(self, address):
+        with self._locks_guard:
+            return self._locks.setdefault(address, threading.Lock())
+
+    # RPC
+
+    def _post(self, payload, endpoint, rate_limiter):
+        if rate_limiter is not None:
+            for _ in payload if isinstance(payload, list) else (payload,):
+                rate_limiter.acquire()
+        if self.rpc_url is None:
+            response = get_rpc_router().post(endpoint=endpoint, json=payload)
+        else:
+            response = get_transport().post(self.rpc_url, json=payload, endpoint=endpoint)
+        response.raise_for_status()
+        return response.json()
+
+    def _signature_page(self, address, before, until, limit, rate_limiter):
+        options = {'limit': limit, 'commitment': 'finalized'}
+        if before:
+            options['before'] = before
+        if until:
+            options['until'] = until
+        payload = {'jsonrpc': '2.0', 'id': 1, 'method': 'getSignaturesForAddress', 'params': [address, options]}
+        reply = self._post(payload, 'rpc.getSignaturesForAddress', rate_limiter)
+        if reply.get('error') is not None:
+            raise RpcError(str(reply['error']))
+        return reply.get('result') or []
+
+    def _walk(self, address, before, until, budget, rate_limiter):
+        """
+        Page signatures from `before` (the head when None) down to `until` (genesis when None).
+        Returns:
+        - tuple: (signature entries newest first, True if the walk reached `until` or genesis).
+        """
+        entries = []
+        while len(entries) < budget:
+            limit = min(self.page_size, budget - len(entries))
+            try:
+                page = self._signature_page(address, before, until, limit, rate_limiter)
+            except (requests.RequestException, RpcError, ValueError) as e:
+                logger.error(f"Listing signatures of {address} failed: {e}")
+                return entries, False
+            entries.extend(page)
+            if len(page) < limit:
+                return entries, True
+            before = page[-1]['signature']
+        return entries, False
+
+    def _fetch_batch(self, signatures, rate_limiter):
+        """Fetch transaction bodies. Returns (signature -> transaction or None if pruned, failed signatures)."""
+        payload = [{'jsonrpc': '2.0', 'id': i, 'method': 'getTransaction', 'params': [signature, TRANSACTION_OPTIONS]}
+                   for i, signature in enumerate(signatures)]
+        try:
+            replies = self._post(payload, 'rpc.getTransaction', rate_limiter)
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Fetching {len(signatures)} transactions failed: {e}")
+            return {}, list(signatures)
+        if isinstance(replies, dict):
+            logger.error(f"Transaction batch rejected: {replies.get('error')}")
+            return {}, list(signatures)
+        by_id = {reply.get('id'): reply for reply in replies if isinstance(reply, dict)}
+        found, failed = {}, []
+        for i, signature in enumerate(signatures):
+            reply = by_id.get(i)
+            if reply is None or reply.get('error') is not None:
+                failed.append(signature)
+            else:
+                found[signature] = reply.get('result')
+        return found, failed
+
+    # Checkpoints and records
+
+    def load_checkpoint(self, address):
+        """
+        Ingestion cursors of a contract.
+        Args:
+        - address: str - Contract (token mint) address.
+        Returns:
+        - dict: 'newest' signature, 'gaps' ([before, until] pairs), 'oldest' signature, 'complete' flag and 'retry'
+          signatures whose bodies could not be fetched.
+        """
+        path = self._path(address, CHECKPOINT_SUFFIX)
+        checkpoint = {'newest': None, 'gaps': [], 'oldest': None, 'complete': False, 'retry': []}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    checkpoint.update(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+        return checkpoint
+
+    def load_transfers(self, address):
+        """
+        Every transfer record ingested for a contract, without duplicates, in slot order.
+        Args:
+        - address: str - Contract (token mint) address.
+        Returns:
+        - np.ndarray: TRANSFER_DTYPE records.
+        """
+        path = self._path(address, TRANSFERS_SUFFIX)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=TRANSFER_DTYPE)
+        # A crash mid-append can leave a partial record at the end
+        count = os.path.getsize(path) // TRANSFER_DTYPE.itemsize
+        records = np.fromfile(path, dtype=TRANSFER_DTYPE, count=count)
+        # Transactions re-ingested after an interrupted run appear twice
+        _, first = np.unique(records['signature'], return_index=True)
+        records = records[first]
+        return records[np.argsort(records['slot'], kind='stable')]
+
+    # Ingestion
+
+    def ingest(self, address, mint=None, state=None, rate_limiter=None):
+        """
+        Ingest new (and, budget permitting, older) transactions of a contract.
+        Args:
+        - address: str - Address whose history is paged (usually the token mint).
+        - mint: str - Token whose transfers are decoded (defaults to address).
+        - state: ContractState - Optional state whose price history gets the newer bars appended.
+        - rate_limiter: TokenBucket - Limiter for this run (the ingester's by default).
+        Returns:
+        - dict: Signatures listed, transactions fetched, transfers decoded, bars updated, bodies left to retry and
+          whether the full history has been walked.
+        """
+        mint = mint or address
+        rate_limiter = rate_limiter or self.rate_limiter
+        with self._lock(address), metrics.span('tx_history', address):
+            checkpoint = self.load_checkpoint(address)
+            budget = self.max_transactions
+            entries = []
+
+            # 1. Transactions since the previous run's head
+            head, reached = self._walk(address, None, checkpoint['newest'], budget, rate_limiter)
+            if head:
+                if checkpoint['newest'] is not None and not reached:
+                    # Budget ran out above the previous head; fill the gap in later runs
+                    checkpoint['gaps'].insert(0, [head[-1]['signature'], checkpoint['newest']])
+                if checkpoint['oldest'] is None:
+                    checkpoint['oldest'] = head[-1]['signature']
+                    checkpoint['complete'] = reached
+                checkpoint['newest'] = head[0]['signature']
+            entries.extend(head)
+            budget -= len(head)
+
+            # 2. Gaps left by earlier runs, newest first
+            while checkpoint['gaps'] and budget > 0:
+                before, until = checkpoint['gaps'][0]
+                gap, reached = self._walk(address, before, until, budget, rate_limiter)
+                entries.extend(gap)
+                budget -= len(gap)
+                if reached:
+                    checkpoint['gaps'].pop(0)
+                elif gap:
+                    checkpoint['gaps'][0][0] = gap[-1]['signature']
+                else:
+                    break
+
+            # 3. Older history
+            if not checkpoint['complete'] and checkpoint['oldest'] is not None and budget > 0:
+                older, reached = self._walk(address, checkpoint['oldest'], None, budget, rate_limiter)
+                entries.extend(older)
+                if older:
+                    checkpoint['oldest'] = older[-1]['signature']
+                checkpoint['complete'] = reached
+
+            # Failed transactions moved nothing; their bodies are not worth fetching
+            signatures = list(dict.fromkeys(checkpoint['retry'] +
+                                            [entry['signature'] for entry in entries if entry.get('err') is None]))
+            transactions, retry = self._fetch_all(signatures, rate_limiter)
+            checkpoint['retry'] = retry[:self.max_transactions]
+
+            decoded = []
+            for signature, transaction in transactions.items():
+                transfer = decode_transfer(transaction, mint)
+                if transfer is not None:
+                    decoded.append((signature_hash(signature),) + transfer)
+            records = np.array(decoded, dtype=TRANSFER_DTYPE)
+            bars = self._store_transfers(address, records)
+            if state is not None:
+                # A fresh state is seeded with the whole stored history; otherwise the bars rebuilt by this run replace
+                # the state's copies of them (the last bar may have gained transfers) or are added
+                state.append_prices(*(bars if len(state.timestamps) else
+                                      transfers_to_bars(self.load_transfers(address), self.bar_seconds)))
+            _write_atomic(self._path(address, CHECKPOINT_SUFFIX), json.dumps(checkpoint))
+
+        metrics.count('tx_signatures_total', len(entries))
+        metrics.count('tx_transfers_total', len(records))
+        logger.info(f"Ingested {len(entries)} signatures ({len(records)} transfers, {len(bars[0])} bars) "
+                    f"for {address}")
+        return {'signatures': len(entries), 'transactions': len(transactions), 'transfers': len(records),
+                'bars': len(bars[0]), 'retry': len(checkpoint['retry']), 'complete': checkpoint['complete']}
+
+    def _fetch_all(self, signatures, rate_limiter):
+        chunks = [signatures[i:i + self.batch_size] for i in range(0, len(signatures), self.batch_size)]
+        transactions, retry = {}, []
+        for found, failed in self._executor.map(lambda chunk: self._fetch_batch(chunk, rate_limiter), chunks):
+            transactions.update(found)
+            retry.extend(failed)
+        return transactions, retry
+
+    def _store_transfers(self, address, records):
+        """Append transfer records and rebuild the bars they touch. Returns (timestamps, prices, volumes)."""
+        if not len(records):
+            return transfers_to_bars(records, self.bar_seconds)
+        with open(self._path(address, TRANSFERS_SUFFIX), 'ab') as f:
+            f.write(records.tobytes())
+        # Bars touched by this run are rebuilt from every stored transfer, since earlier runs may have filled them
+        touched = np.unique(records['block_time'] // self.bar_seconds * self.bar_seconds)
+        transfers = self.load_transfers(address)
+        transfers = transfers[np.isin(transfers['block_time'] // self.bar_seconds * self.bar_seconds, touched)]
+        timestamps, prices, volumes = transfers_to_bars(transfers, self.bar_seconds)
+
+        # Imported here so importing tx_history does not pay for pandas until transfers are stored
+        import pandas as pd
+
+        frame = pd.DataFrame({'timestamp': timestamps, 'price': prices, 'volume': volumes})
+        first, last = (pd.Timestamp(int(t), unit='s').date().isoformat() for t in (timestamps[0], timestamps[-1]))
+        # Transfers cover only the walked part of each day, so no day is marked as fully fetched
+        (self.store or get_history_store()).merge(address, frame, first, last, mark_covered=False)
+        return timestamps, prices, volumes
+
+    def close(self):
+        """Stop the fetch threads."""
+        self._executor.shutdown(wait=False)
+
+
+_ingester = None
+_ingester_lock = threading.Lock()
+
+
+def get_tx_ingester():
+    """
+    Return the process-wide ingester writing to TX_HISTORY_DIR, creating it on first use.
+    Returns:
+    - TransactionHistoryIngester: The shared ingester.
+    """
+    global _ingester
+    if _ingester is None:
+        with _ingester_lock:
+            if _ingester is None:
+                _ingester = TransactionHistoryIngester()
+    return _ingester
@@ -1,7 +1,9 @@
 import os
 import json
 import time
-from config import CACHE_ENABLED, CACHE_DIR, CACHE_TIMEOUT
+import tempfile
+from settings import get_settings
+from contract_state import as_balances
 from datetime import datetime
 import logging
 
@@ -9,57 +11,78 @@ import logging
 logger = logging.getLogger(__name__)
 
 # Function to load and save cache data
-def load_cache_data(contract_address):
+def load_cache_entry(contract_address):
     """
-    Load cached contract data from a file if cache is enabled.
+    Load a cached contract entry, including the time it was written, if cache is enabled.
     Args:
     - contract_address: str - Contract address to check the cache for.
     Returns:
-    - dict: Cached contract data or None.
+    - tuple: (timestamp, data) for a fresh entry, or None.
     """
-    if CACHE_ENABLED:
-        cache_file = os.path.join(CACHE_DIR, f"{contract_address}.json")
+    settings = get_settings()
+    if settings.cache_enabled:
+        cache_file = os.path.join(settings.cache_dir, f"{contract_address}.json")
         if os.path.exists(cache_file):
-            with open(cache_file, "r") as f:
-                cached_data = json.load(f)
-                if time.time() - cached_data['timestamp'] < CACHE_TIMEOUT:
-                    logger.info(f"Cache hit for {contract_address}.")
-                    return cached_data['data']
-                else:
-                    logger.info(f"Cache expired for {contract_address}.")
+            try:
+                with open(cache_file, "r") as f:
+                    cached_data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Unreadable cache file for {contract_address}: {e}")
+                return None
+            if time.time() - cached_data['timestamp'] < settings.cache_timeout:
+                logger.info(f"Cache hit for {contract_address}.")
+                return cached_data['timestamp'], cached_data['data']
+            else:
+                logger.info(f"Cache expired for {contract_address}.")
         else:
             logger.info(f"No cache found for {contract_address}.")
     return None
 
-def save_cache_data(contract_address, data):
+def load_cache_data(contract_address):
+    """
+    Load cached contract data from a file if cache is enabled.
+    Args:
+    - contract_address: str - Contract address to check the cache for.
+    Returns:
+    - dict: Cached contract data or None.
+    """
+    entry = load_cache_entry(contract_address)
+    return entry[1] if entry is not None else None
+
+def save_cache_data(contract_address, data, timestamp=None):
     """
-    Save contract data to cache.
+    Save contract data to cache. The file is written atomically so readers never see a partial entry.
     Args:
     - contract_address: str - Contract address to save the data for.
     - data: dict - Contract data to be cached.
+    - timestamp: float - Time the data was fetched (defaults to now).
     """
-    if CACHE_ENABLED:
-        if not os.path.exists(CACHE_DIR):
-            os.makedirs(CACHE_DIR)
-        cache_file = os.path.join(CACHE_DIR, f"{contract_address}.json")
+    settings = get_settings()
+    if settings.cache_enabled:
+        cache_dir = settings.cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_file = os.path.join(cache_dir, f"{contract_address}.json")
         cache_data = {
-            'timestamp': time.time(),
+            'timestamp': timestamp if timestamp is not None else time.time(),
             'data': data
         }
-        with open(cache_file, "w") as f:
-            json.dump(cache_data, f)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=f".{contract_address}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(cache_data, f)
+            os.replace(tmp_path, cache_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
         logger.info(f"Cache saved for {contract_address}.")
 
 def process_token_data(contract_data):
     """
     Process raw contract data into a more usable format.
     Args:
-    - contract_data: list - Raw data from Solana API.
+    - contract_data: list - Raw data from Solana API, balances already extracted by token_stream, or a ContractState.
     Returns:
-    - list: Processed data.
+    - np.ndarray: float64 balances (extracted balances and loaded states are returned without copying).
     """
-    processed_data = []
-    for entry in contract_data:
-        token_amount = entry['account']['data']['parsed']['info']['tokenAmount']['uiAmount']
-        processed_data.append(float(token_amount))
-    return processed_data
+    return as_balances(contract_data)